@@ -0,0 +1,106 @@
+"""
+Buffer audio preallocati per la pipeline di cattura.
+
+La cattura scrive piccoli blocchi in un ring buffer mono float32 di dimensione
+fissa; il dispatcher legge finestre (anche con overlap) come view zero-copy.
+"""
+import threading
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Ring buffer mono float32 con memoria "specchiata" (ogni finestra è contigua)"""
+
+    def __init__(self, capacity_frames):
+        self.capacity = int(capacity_frames)
+        # Ogni campione viene scritto due volte (i e i + capacity): così qualunque
+        # finestra lunga <= capacity è una slice contigua, senza concatenate.
+        self._data = np.zeros(self.capacity * 2, dtype=np.float32)
+        self._mono = np.empty(0, dtype=np.float32)  # scratch per il downmix
+        self._lock = threading.Lock()
+        self.write_pos = 0  # Posizione ASSOLUTA: campioni scritti dall'avvio
+
+    def write(self, block):
+        """Scrive un blocco (frames x canali oppure mono), downmix senza allocazioni"""
+        frames = block.shape[0]
+        if block.ndim > 1:
+            if self._mono.shape[0] < frames:
+                self._mono = np.empty(frames, dtype=np.float32)
+            mono = self._mono[:frames]
+            np.mean(block, axis=1, out=mono)
+        else:
+            mono = block
+
+        with self._lock:
+            if frames > self.capacity:
+                # Blocco più lungo del buffer: conserva solo la coda
+                mono = mono[-self.capacity:]
+                self.write_pos += frames - self.capacity
+                frames = self.capacity
+
+            start = self.write_pos % self.capacity
+            first = min(frames, self.capacity - start)
+            self._data[start:start + first] = mono[:first]
+            self._data[start + self.capacity:start + self.capacity + first] = mono[:first]
+            rest = frames - first
+            if rest:
+                self._data[:rest] = mono[first:]
+                self._data[self.capacity:self.capacity + rest] = mono[first:]
+            self.write_pos += frames
+
+    def contains(self, start, num_frames):
+        """True se la finestra [start, start + num_frames) è ancora nel buffer"""
+        return (start >= 0 and num_frames <= self.capacity
+                and start >= self.write_pos - self.capacity
+                and start + num_frames <= self.write_pos)
+
+    def view(self, start, num_frames):
+        """Ritorna una view zero-copy della finestra assoluta richiesta"""
+        with self._lock:
+            if not self.contains(start, num_frames):
+                raise ValueError(
+                    f"Window [{start}, {start + num_frames}) not available "
+                    f"(write_pos={self.write_pos}, capacity={self.capacity})"
+                )
+            offset = start % self.capacity
+            return self._data[offset:offset + num_frames]
+
+    def reset(self):
+        with self._lock:
+            self.write_pos = 0
+
+
+class Pcm16Converter:
+    """Float32 (frame x canali) -> PCM16 mono little-endian in buffer riutilizzati.
+    Downmix, scala, clipping (niente wrap-around sui picchi) e quantizzazione senza temporanei"""
+
+    def __init__(self):
+        self._mono = np.empty(0, dtype=np.float32)
+        self._pcm = np.empty(0, dtype="<i2")
+
+    def convert(self, block):
+        """Ritorna una view int16 sul buffer interno: valida fino alla chiamata successiva"""
+        frames = block.shape[0]
+        if self._mono.shape[0] < frames:
+            self._mono = np.empty(frames, dtype=np.float32)
+            self._pcm = np.empty(frames, dtype="<i2")
+        mono = self._mono[:frames]
+        pcm = self._pcm[:frames]
+        if block.ndim > 1 and block.shape[1] > 1:
+            # Somma dei canali colonna per colonna (np.mean su assi corti è molto più lento)
+            channels = block.shape[1]
+            np.add(block[:, 0], block[:, 1], out=mono)
+            for c in range(2, channels):
+                np.add(mono, block[:, c], out=mono)
+            np.multiply(mono, 32767.0 / channels, out=mono)
+        else:
+            np.multiply(block.reshape(frames), 32767.0, out=mono)
+        np.minimum(mono, 32767.0, out=mono)
+        np.maximum(mono, -32768.0, out=mono)
+        np.copyto(pcm, mono, casting="unsafe")  # Troncamento verso zero, come astype
+        return pcm
+
+    def to_bytes(self, block):
+        """PCM16 come bytes: l'unica copia, per chi tiene il frame oltre la chiamata"""
+        return self.convert(block).tobytes()
@@ -0,0 +1,399 @@
+"""
+Sorgenti audio per la cattura.
+
+Tutte espongono l'API dei microfoni di soundcard usata dalla pipeline:
+
+    with source.recorder(samplerate=16000) as rec:
+        block = rec.record(numframes=8000)  # float32 (frame x canali)
+
+Backend:
+  - soundcard: device veri (loopback o microfoni), importato solo se serve
+  - file:  WAV (FLAC e altri con soundfile), a tempo reale, accelerato o il
+           più veloce possibile (speed=0), anche in loop
+  - synth: toni, rumore o "parlato" sintetico (raffiche modulate con pause)
+
+Le sorgenti si scelgono per nome, nello stesso campo dei device:
+    "file:registrazioni/meeting.wav?speed=2&loop=1"
+    "synth:speech?seconds=60&seed=3"   "synth:tone?freq=440"   "synth:noise"
+Qualunque altro nome è un device soundcard. AUDIO_SOURCES (separate da virgola)
+aggiunge sorgenti all'elenco della GUI, es. AUDIO_SOURCES=synth:speech.
+"""
+import math
+import os
+import time
+import wave
+from abc import ABC, abstractmethod
+from urllib.parse import parse_qsl
+
+import numpy as np
+
+AUDIO_SOURCES = [s.strip() for s in os.getenv("AUDIO_SOURCES", "").split(",") if s.strip()]
+FILE_PREFIX = "file:"
+SYNTH_PREFIX = "synth:"
+
+
+# --- Device soundcard ---
+
+def _soundcard():
+    import soundcard  # Su server senza audio l'import stesso può fallire
+    return soundcard
+
+
+def find_soundcard(name=None):
+    """Device per nome (esatto, poi parziale); altrimenti il loopback dell'uscita predefinita"""
+    sc = _soundcard()
+    mics = sc.all_microphones(include_loopback=True)
+    if name:
+        for m in mics:
+            if m.name == name:
+                return m
+        for m in mics:
+            if name in m.name:
+                return m
+    default = sc.default_speaker()
+    for m in mics:
+        if m.isloopback and m.id == default.id:
+            return m
+    for m in mics:
+        if m.isloopback and m.name == default.name:
+            return m
+    for m in mics:
+        if "Loopback" in m.name or "Stereo Mix" in m.name:
+            return m
+    return None
+
+
+def list_sources():
+    """(nomi, predefinito) per la GUI: loopback soundcard più le sorgenti di AUDIO_SOURCES"""
+    names = []
+    default = None
+    try:
+        sc = _soundcard()
+        default_id = sc.default_speaker().id
+        for m in sc.all_microphones(include_loopback=True):
+            if m.isloopback:
+                names.append(m.name)
+                if m.id == default_id:
+                    default = m.name
+    except Exception as e:
+        print(f"Soundcard devices unavailable: {e}")
+    names.extend(AUDIO_SOURCES)
+    return names, default or (names[0] if names else None)
+
+
+def open_source(name, on_end=None):
+    """Sorgente per nome ("file:...", "synth:..." o device soundcard); None se non trovata"""
+    if name and name.startswith((FILE_PREFIX, SYNTH_PREFIX)):
+        prefix, _, rest = name.partition(":")
+        target, _, query = rest.partition("?")
+        params = dict(parse_qsl(query))
+        speed = float(params.get("speed", 1.0))
+        seconds = float(params["seconds"]) if "seconds" in params else None
+        if prefix + ":" == FILE_PREFIX:
+            return FileSource(target, speed=speed, loop=params.get("loop", "0") == "1", on_end=on_end, name=name)
+        return SyntheticSource(
+            target or "speech", seconds=seconds, speed=speed,
+            freq=float(params.get("freq", 220.0)), level=float(params.get("level", 0.3)),
+            seed=int(params.get("seed", 0)), on_end=on_end, name=name,
+        )
+    return find_soundcard(name)
+
+
+# --- File audio ---
+
+class Resampler:
+    """Ricampionamento polifase in streaming (rapporto razionale L/M) con filtro passa-basso
+    anti-alias (sinc finestrata Kaiser): niente frequenze sopra la nuova Nyquist ripiegate
+    nella banda del parlato. Blocchi (frame x canali) in ingresso, stesso formato in uscita"""
+
+    def __init__(self, rate_in, rate_out, half_taps=16, beta=8.0):
+        g = math.gcd(int(rate_in), int(rate_out))
+        self.up = int(rate_out) // g
+        self.down = int(rate_in) // g
+        self.taps = 2 * half_taps + 1  # Campioni di ingresso per ogni uscita
+        self._delay = half_taps * self.up  # Ritardo del filtro (compensato: uscita allineata)
+        if self.up != self.down:
+            length = 2 * half_taps * self.up + 1
+            cutoff = 0.45 / max(self.up, self.down)  # Poco sotto la Nyquist più bassa (cicli/campione)
+            n = np.arange(length) - self._delay
+            h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+            h *= self.up / h.sum()  # Guadagno unitario dopo l'inserimento di zeri
+            padded = np.zeros(self.up * self.taps)
+            padded[:length] = h
+            # Un filtro per fase, già rovesciato: uscita = prodotto scalare con la finestra di ingresso
+            self._filters = padded.reshape(self.taps, self.up).T[:, ::-1].copy()
+        self._history = None  # Ultimi campioni di ingresso ancora necessari
+        self._first = 0  # Indice assoluto del primo campione in _history
+        self._next_out = 0  # Indice assoluto della prossima uscita
+        self._frames_in = 0
+
+    def process(self, block):
+        if self.up == self.down:
+            return block
+        block = np.asarray(block, dtype=np.float32)
+        if self._history is None:
+            # Prima dell'inizio del file: zeri
+            self._history = np.zeros((self.taps - 1, block.shape[1]), dtype=np.float32)
+            self._first = -(self.taps - 1)
+        self._frames_in += len(block)
+        x = np.concatenate([self._history, block])
+        last = self._first + len(x) - 1
+        # Uscite n che richiedono solo ingressi già arrivati: (delay + n * down) // up <= last
+        end = -(-((last + 1) * self.up - self._delay) // self.down)
+        n = np.arange(self._next_out, max(end, self._next_out))
+        pos = self._delay + n * self.down
+        centers = pos // self.up
+        phases = pos - centers * self.up
+        windows = np.lib.stride_tricks.sliding_window_view(x, self.taps, axis=0)
+        out = np.einsum("nct,nt->nc", windows[centers - self.taps + 1 - self._first], self._filters[phases])
+        if len(n):
+            self._next_out = n[-1] + 1
+        # Tiene solo i campioni che servono alla prossima uscita
+        keep_from = (self._delay + self._next_out * self.down) // self.up - self.taps + 1
+        self._history = x[keep_from - self._first:]
+        self._first = keep_from
+        return out.astype(np.float32)
+
+    def flush(self):
+        """Uscite rimaste alla fine del file (coda del filtro)"""
+        if self.up == self.down or self._history is None:
+            return np.zeros((0, 1), dtype=np.float32)
+        total = -(-self._frames_in * self.up // self.down)
+        emitted = self._next_out
+        out = self.process(np.zeros((self.taps, self._history.shape[1]), dtype=np.float32))
+        return out[:max(0, total - emitted)]
+
+
+def _decode_pcm(raw, width):
+    """PCM little-endian 8/16/24/32 bit -> float32"""
+    if width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if width == 2:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    if width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        return ints.astype(np.float32) / 8388608.0
+    if width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise ValueError(f"Unsupported sample width {width}")
+
+
+def _wav_blocks(path, block_seconds):
+    """WAV PCM a blocchi con la sola libreria standard -> (rate, iteratore di float32 frame x canali)"""
+    wf = wave.open(path, "rb")
+    channels = wf.getnchannels()
+    width = wf.getsampwidth()
+    rate = wf.getframerate()
+
+    def blocks():
+        with wf:
+            while True:
+                raw = wf.readframes(max(1, int(rate * block_seconds)))
+                if not raw:
+                    break
+                yield _decode_pcm(raw, width).reshape(-1, channels)
+    return rate, blocks()
+
+
+def iter_audio_blocks(path, sample_rate=16000, block_seconds=0.5):
+    """File audio letto a blocchi -> float32 (frame x canali) a sample_rate, senza caricarlo tutto.
+    FLAC & co. richiedono soundfile"""
+    try:
+        import soundfile
+    except ImportError:
+        soundfile = None
+    if soundfile is not None:
+        rate = soundfile.info(path).samplerate
+        blocks = soundfile.blocks(path, blocksize=max(1, int(rate * block_seconds)), dtype="float32", always_2d=True)
+    elif path.lower().endswith(".wav"):
+        rate, blocks = _wav_blocks(path, block_seconds)
+    else:
+        raise ImportError(f"soundfile is required to read {os.path.basename(path)} (pip install soundfile)")
+
+    resampler = Resampler(rate, sample_rate)
+    for block in blocks:
+        out = resampler.process(block)
+        if len(out):
+            yield out
+    tail = resampler.flush()
+    if len(tail):
+        yield tail
+
+
+def load_audio(path, sample_rate=16000):
+    """File audio -> float32 (frame x canali) a sample_rate (in memoria solo il risultato)"""
+    blocks = list(iter_audio_blocks(path, sample_rate))
+    return np.concatenate(blocks) if blocks else np.zeros((0, 1), dtype=np.float32)
+
+
+# --- Sorgenti a ritmo controllato ---
+
+class _Recorder:
+    """Recorder comune: ogni blocco è disponibile dopo la sua durata / speed (speed 0: subito)"""
+
+    def __init__(self, source, samplerate, read):
+        self.source = source
+        self.samplerate = samplerate
+        self._read = read  # numframes -> (blocco, ultimo blocco?)
+        self._ended = False
+        self.frames = 0
+
+    def __enter__(self):
+        self._t0 = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def record(self, numframes):
+        if self._ended:
+            # Sorgente finita: silenzio a tempo reale, come un device muto
+            time.sleep(numframes / self.samplerate)
+            return np.zeros((numframes, self.source.channels), dtype=np.float32)
+        block, last = self._read(numframes)
+        self.frames += len(block)
+        if self.source.speed > 0:
+            delay = self._t0 + self.frames / (self.samplerate * self.source.speed) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        if last:
+            self._ended = True
+            if self.source.on_end:
+                self.source.on_end()
+        return block
+
+
+class _PacedSource(ABC):
+    """Base delle sorgenti non soundcard (stessi attributi usati dalla GUI)"""
+
+    isloopback = False
+    channels = 1
+
+    def __init__(self, speed=1.0, on_end=None, name=""):
+        self.speed = speed
+        self.on_end = on_end  # Chiamato all'ultimo blocco (file finito / durata raggiunta)
+        self.name = name
+        self.id = name
+
+    def recorder(self, samplerate, **kwargs):
+        return _Recorder(self, samplerate, self._reader(samplerate))
+
+    @abstractmethod
+    def _reader(self, samplerate):
+        """Ritorna read(numframes) -> (blocco, ultimo) per la sorgente a samplerate"""
+
+
+class FileSource(_PacedSource):
+    """File audio riprodotto a velocità speed (0 = il più veloce possibile), opzionalmente in loop.
+    audio: array già caricato (frame x canali a 16 kHz) al posto del file"""
+
+    def __init__(self, path=None, speed=1.0, loop=False, on_end=None, name=None, audio=None, sample_rate=16000):
+        super().__init__(speed, on_end, name or f"{FILE_PREFIX}{path}")
+        self.path = path
+        self.loop = loop
+        self._audio = {}  # sample rate -> audio
+        if audio is not None:
+            self._audio[sample_rate] = audio
+            self.channels = audio.shape[1]
+
+    def load(self, samplerate):
+        audio = self._audio.get(samplerate)
+        if audio is None:
+            audio = self._audio[samplerate] = load_audio(self.path, samplerate)
+            self.channels = audio.shape[1]
+        return audio
+
+    @property
+    def duration(self):
+        """Secondi di audio (None se in loop)"""
+        if self.loop:
+            return None
+        for rate, audio in self._audio.items():
+            return len(audio) / rate
+        return len(self.load(16000)) / 16000
+
+    def _reader(self, samplerate):
+        audio = self.load(samplerate)
+        pos = 0
+
+        def read(numframes):
+            nonlocal pos
+            if self.loop:
+                block = np.take(audio, np.arange(pos, pos + numframes), axis=0, mode="wrap")
+                pos = (pos + numframes) % len(audio)
+                return block, False
+            block = audio[pos:pos + numframes]
+            pos += len(block)
+            return block, pos >= len(audio)
+        return read
+
+
+class SyntheticSource(_PacedSource):
+    """Audio generato: "speech" (raffiche armoniche modulate a ritmo sillabico con pause),
+    "tone", "noise" o "silence", sempre con un lieve rumore di fondo. seconds=None: infinito"""
+
+    KINDS = ("speech", "tone", "noise", "silence")
+
+    def __init__(self, kind="speech", seconds=None, speed=1.0, freq=220.0, level=0.3, noise_level=0.003,
+                 channels=1, seed=0, on_end=None, name=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown synthetic source '{kind}' ({', '.join(self.KINDS)})")
+        super().__init__(speed, on_end, name or f"{SYNTH_PREFIX}{kind}")
+        self.kind = kind
+        self.seconds = seconds
+        self.freq = freq
+        self.level = level
+        self.noise_level = noise_level
+        self.channels = channels
+        self.seed = seed
+
+    @property
+    def duration(self):
+        return self.seconds
+
+    def _reader(self, samplerate):
+        rng = np.random.default_rng(self.seed)  # Stesso seed, stesso audio
+        total = int(self.seconds * samplerate) if self.seconds else None
+        pos = 0
+        segment = {"end": 0, "start": 0, "speech": False, "f0": self.freq}
+
+        def next_segment():
+            speech = not segment["speech"]
+            length = rng.uniform(0.4, 2.5) if speech else rng.uniform(0.2, 1.2)
+            segment.update(start=segment["end"], end=segment["end"] + int(length * samplerate), speech=speech,
+                           f0=self.freq * rng.uniform(0.8, 1.25))
+
+        def speech_block(n):
+            out = np.zeros(n, dtype=np.float64)
+            i = 0
+            while i < n:
+                if pos + i >= segment["end"]:
+                    next_segment()
+                m = min(n - i, segment["end"] - (pos + i))
+                if segment["speech"]:
+                    t = (pos + i - segment["start"] + np.arange(m)) / samplerate
+                    envelope = 0.5 * (1 - np.cos(2 * np.pi * 4.0 * t))  # ~4 sillabe al secondo
+                    f0 = segment["f0"]
+                    voice = sum(np.sin(2 * np.pi * k * f0 * t) / k for k in (1, 2, 3)) / 1.8
+                    out[i:i + m] = self.level * envelope * voice
+                i += m
+            return out
+
+        def read(numframes):
+            nonlocal pos
+            n = numframes if total is None else max(0, min(numframes, total - pos))
+            if self.kind == "speech":
+                mono = speech_block(n)
+            elif self.kind == "tone":
+                mono = self.level * np.sin(2 * np.pi * self.freq * (pos + np.arange(n)) / samplerate)
+            elif self.kind == "noise":
+                mono = rng.standard_normal(n) * (self.level / 3)
+            else:
+                mono = np.zeros(n)
+            mono = mono + rng.standard_normal(n) * self.noise_level
+            pos += n
+            block = np.repeat(mono.astype(np.float32)[:, None], self.channels, axis=1)
+            return block, total is not None and pos >= total
+        return read
@@ -0,0 +1,215 @@
+"""
+Auto-scaling dei worker di trascrizione.
+
+ResizableThreadPool è un pool di thread (API compatibile con ThreadPoolExecutor
+per submit/shutdown) il cui numero di worker può cambiare a sessione avviata.
+WorkerAutoscaler misura il real-time factor (tempo di elaborazione / durata
+audio) di ogni job, la profondità della coda e la saturazione della CPU, e ogni
+pochi secondi decide se aggiungere o togliere worker entro [min, max].
+"""
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+try:
+    import psutil  # Opzionale: CPU di sistema (altrimenti CPU del solo processo)
+except ImportError:
+    psutil = None
+
+AUTOSCALE_INTERVAL = float(os.getenv("AUTOSCALE_INTERVAL", "5"))  # Secondi tra due decisioni
+AUTOSCALE_HEADROOM = 1.3  # Capacità richiesta = carico * headroom
+AUTOSCALE_CPU_HIGH = 90.0  # % oltre cui aggiungere thread peggiora solo la contesa
+AUTOSCALE_SHRINK_AFTER = 3  # Valutazioni consecutive con capacità in eccesso prima di ridurre
+
+
+class ResizableThreadPool:
+    """Pool di thread con numero di worker modificabile (resize)"""
+
+    def __init__(self, num_workers, thread_name_prefix="Worker"):
+        self._tasks = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._target = 0
+        self._alive = 0
+        self._next_id = 0
+        self._shutdown = False
+        self._prefix = thread_name_prefix
+        self.resize(num_workers)
+
+    @property
+    def num_workers(self):
+        return self._target
+
+    def resize(self, num_workers):
+        """Porta il pool a num_workers (i thread in eccesso escono dopo il job corrente)"""
+        with self._lock:
+            self._target = max(1, num_workers)
+            while self._alive < self._target:
+                self._alive += 1
+                self._next_id += 1
+                t = threading.Thread(target=self._worker, name=f"{self._prefix}_{self._next_id}", daemon=True)
+                t.start()
+
+    def _retire(self):
+        """True se questo thread deve uscire (pool ridotto o chiuso)"""
+        with self._lock:
+            if self._alive > self._target or (self._shutdown and self._tasks.empty()):
+                self._alive -= 1
+                return True
+            return False
+
+    def _worker(self):
+        while not self._retire():
+            try:
+                future, fn, args, kwargs = self._tasks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, fn, *args, **kwargs):
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        future = Future()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+        if cancel_futures:
+            while True:
+                try:
+                    future, *_ = self._tasks.get_nowait()
+                except queue.Empty:
+                    break
+                future.cancel()
+        while wait and self._alive > 0:
+            time.sleep(0.05)
+
+
+class _CpuMonitor:
+    """Utilizzo CPU in % (sistema con psutil, altrimenti del processo sui core disponibili)"""
+
+    def __init__(self):
+        self._last = self._sample()
+        if psutil:
+            psutil.cpu_percent(None)  # Prima chiamata: solo inizializzazione
+
+    @staticmethod
+    def _sample():
+        t = os.times()
+        return time.monotonic(), t.user + t.system
+
+    def percent(self):
+        if psutil:
+            return psutil.cpu_percent(None)
+        now, cpu = self._sample()
+        wall = now - self._last[0]
+        used = cpu - self._last[1]
+        self._last = (now, cpu)
+        if wall <= 0:
+            return 0.0
+        return min(100.0, 100.0 * used / (wall * (os.cpu_count() or 1)))
+
+
+class WorkerAutoscaler:
+    """Decide il numero di worker in base a real-time factor, coda e CPU"""
+
+    def __init__(self, apply, min_workers, max_workers, queue_depth=lambda: 0,
+                 interval=AUTOSCALE_INTERVAL, window=20):
+        self.apply = apply  # apply(n): applica il nuovo numero di worker
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.interval = interval
+        self._samples = deque(maxlen=window)  # (secondi di elaborazione, secondi di audio)
+        self._samples_lock = threading.Lock()
+        self._cpu = _CpuMonitor()
+        self._surplus_runs = 0
+        self._last_grow = None  # (worker prima della crescita, capacità misurata)
+        self._stop = threading.Event()
+        self._thread = None
+        self.decisions = []  # Storico: (ora, da, a, motivo)
+
+    def record(self, processing_seconds, audio_seconds):
+        """Registra la durata di un job (chiamato dai worker)"""
+        if audio_seconds > 0:
+            with self._samples_lock:
+                self._samples.append((processing_seconds, audio_seconds))
+
+    def real_time_factor(self):
+        """RTF medio per worker sulla finestra recente (None se nessun campione)"""
+        with self._samples_lock:
+            if not self._samples:
+                return None
+            busy = sum(p for p, _ in self._samples)
+            audio = sum(a for _, a in self._samples)
+        return busy / audio
+
+    def evaluate(self, current):
+        """Ritorna (nuovo numero di worker, motivo)"""
+        rtf = self.real_time_factor()
+        depth = self.queue_depth()
+        cpu = self._cpu.percent()
+        if rtf is None:
+            return current, f"no samples yet (queue {depth}, cpu {cpu:.0f}%)"
+
+        # Worker necessari per stare al passo con l'audio in tempo reale
+        needed = max(self.min_workers, math.ceil(rtf * AUTOSCALE_HEADROOM))
+        capacity = current / rtf  # Secondi di audio elaborabili per secondo
+        stats = f"rtf {rtf:.2f}, needed {needed}, queue {depth}, cpu {cpu:.0f}%"
+
+        # Dopo una crescita: se la capacità non è aumentata i thread si contendono
+        # CPU o modello, si torna indietro e quel numero diventa il tetto
+        if self._last_grow is not None:
+            before_workers, before_capacity = self._last_grow
+            self._last_grow = None
+            if current > before_workers and capacity < before_capacity * 1.1:
+                self.max_workers = before_workers
+                return before_workers, f"revert: no throughput gain ({before_capacity:.2f} -> {capacity:.2f}x, {stats})"
+
+        if (needed > current or depth > current) and current < self.max_workers:
+            self._surplus_runs = 0
+            if cpu >= AUTOSCALE_CPU_HIGH:
+                return current, f"hold: CPU saturated ({stats})"
+            target = min(self.max_workers, max(needed, current + 1))
+            self._last_grow = (current, capacity)
+            return target, f"grow ({stats})"
+
+        if needed < current and depth == 0:
+            self._surplus_runs += 1
+            if self._surplus_runs >= AUTOSCALE_SHRINK_AFTER or cpu >= AUTOSCALE_CPU_HIGH:
+                self._surplus_runs = 0
+                return max(self.min_workers, current - 1), f"shrink ({stats})"
+            return current, f"hold: surplus {self._surplus_runs}/{AUTOSCALE_SHRINK_AFTER} ({stats})"
+
+        self._surplus_runs = 0
+        return current, f"hold ({stats})"
+
+    def _loop(self, current):
+        while not self._stop.wait(self.interval):
+            target, reason = self.evaluate(current)
+            if target != current:
+                self.decisions.append((time.time(), current, target, reason))
+                print(f"DEBUG: Autoscaler {current} -> {target} workers: {reason}")
+                self.apply(target)
+                current = target
+                with self._samples_lock:
+                    self._samples.clear()  # RTF misurato solo con il nuovo numero di worker
+            else:
+                print(f"DEBUG: Autoscaler {current} workers, {reason}")
+
+    def start(self, current):
+        self._thread = threading.Thread(target=self._loop, args=(current,), daemon=True, name="Autoscaler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,261 @@
+"""
+Trascrizione batch di registrazioni archiviate (senza GUI).
+
+Ogni file viene letto a blocchi (ricampionati a 16 kHz con filtro anti-alias, mai
+tutto in memoria) e diviso in chunk sulle pause con lo stesso VAD/chunker della
+cattura live (vad.AdaptiveChunker su AudioRingBuffer); i chunk con parlato
+vanno in parallelo ai worker: Whisper in un pool di processi (whisper_pool, un
+modello per processo), Google in un pool di thread (chiamate di rete). Le righe
+sono scritte nell'ordine dei chunk accanto al file, con il tempo dall'inizio
+della registrazione: meeting.wav -> meeting.transcript.txt.
+
+Ripresa: la trascrizione viene scritta in .part e rinominata solo a file finito;
+rilanciando lo stesso comando i file già completati vengono saltati e si
+riparte dal primo non finito (--force per rifarli tutti). Un chunk fallito
+(errore del worker o della rete) scarta il .part: il file verrà ritentato.
+
+    python batch_transcribe.py archivio/ --lang pt --processes 4
+    python batch_transcribe.py "archivio/2024-*.flac" --engine google
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import audio_sources
+import google_speech
+import whisper_pool
+from audio_buffer import AudioRingBuffer
+from vad import AdaptiveChunker, to_clip_timestamps
+
+SAMPLE_RATE = 16000
+DEVICE_TYPE = "cpu"
+COMPUTE_TYPE = "int8"
+BLOCK_SECONDS = 0.5  # Blocchi passati al chunker (come CAPTURE_BLOCK_SECONDS)
+CHUNK_MIN_FACTOR = 0.5  # Chunk adattivi: taglio alla prima pausa dopo buffer * MIN...
+CHUNK_MAX_FACTOR = 1.5  # ...e comunque entro buffer * MAX
+CHUNK_PAUSE_MS = 200
+WHISPER_PROCESS_THREADS = 2  # Thread CTranslate2 per ogni processo Whisper
+WHISPER_MODELS = {"en": "small.en", "pt": "small"}  # Offline: precisione prima della velocità
+LANGUAGES = {"en": "en-US", "pt": "pt-BR"}  # Codici Google
+BUFFER_SECONDS = {"en": 4, "pt": 10, "google": 10}  # Come nella GUI
+INFLIGHT_PER_WORKER = 2  # Job in volo per worker (limita memoria e shared memory)
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")  # Oltre a WAV serve soundfile
+TRANSCRIPT_SUFFIX = ".transcript.txt"
+FAILURE_PREFIXES = ("[❌", "[⚠️")  # Righe di errore dei worker (whisper_pool, google_speech)
+
+
+def transcript_path(path):
+    return os.path.splitext(path)[0] + TRANSCRIPT_SUFFIX
+
+
+def format_offset(frames):
+    """Posizione nella registrazione come HH:MM:SS"""
+    seconds = int(frames / SAMPLE_RATE)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def iter_chunks(blocks, buffer_seconds, batch=1):
+    """Chunk (inizio, frame, view audio, parlato) chiusi sulle pause come nella cattura live.
+    blocks: blocchi float32 (frame x canali) a SAMPLE_RATE, al massimo BLOCK_SECONDS ciascuno.
+    Le view restano valide finché non sono passati altri `batch` chunk"""
+    block = int(SAMPLE_RATE * BLOCK_SECONDS) + 1
+    ring = AudioRingBuffer(int(SAMPLE_RATE * buffer_seconds * CHUNK_MAX_FACTOR * (batch + 2)) + block)
+    chunker = AdaptiveChunker(
+        ring,
+        min_seconds=buffer_seconds * CHUNK_MIN_FACTOR,
+        max_seconds=buffer_seconds * CHUNK_MAX_FACTOR,
+        pause_ms=CHUNK_PAUSE_MS,
+        sample_rate=SAMPLE_RATE,
+    )
+    for audio in blocks:
+        ring.write(audio)  # Downmix nel ring, come dal device
+        for start, num_frames, speech_ranges in chunker.update():
+            yield start, num_frames, ring.view(start, num_frames), speech_ranges
+    last = chunker.flush()
+    if last:
+        start, num_frames, speech_ranges = last
+        yield start, num_frames, ring.view(start, num_frames), speech_ranges
+
+
+def find_inputs(items):
+    paths = []
+    for item in items:
+        if os.path.isdir(item):
+            matches = glob.glob(os.path.join(item, "**", "*"), recursive=True)
+            paths.extend(p for p in matches if p.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            paths.extend(glob.glob(item, recursive=True) or [item])
+    return sorted(dict.fromkeys(paths))
+
+
+class BatchTranscriber:
+    """Un pool per tutta l'esecuzione; i file si trascrivono uno alla volta, i chunk in parallelo"""
+
+    def __init__(self, engine, lang, model=None, processes=None, batch=1, beam_size=5):
+        self.engine = engine
+        self.lang = lang
+        self.batch = batch if engine == "whisper" else 1
+        self.beam_size = beam_size
+        self.buffer_seconds = BUFFER_SECONDS["google" if engine == "google" else lang]
+        if engine == "whisper":
+            self.workers = processes or max(1, (os.cpu_count() or 2) // WHISPER_PROCESS_THREADS)
+            self.model = model or WHISPER_MODELS[lang]
+        else:
+            self.workers = processes or 4
+            self.model = "google"
+        self.pool = self._create_pool()
+
+    def _create_pool(self):
+        if self.engine == "whisper":
+            return whisper_pool.WhisperProcessPool(self.model, self.workers, WHISPER_PROCESS_THREADS, DEVICE_TYPE, COMPUTE_TYPE)
+        # Google: I/O di rete, i processi non servono
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="GoogleWorker")
+
+    def _submit(self, chunks):
+        """Sottomette uno o più chunk [(audio, timestamp, clip)]; il future ritorna le righe"""
+        if self.engine == "google":
+            audio, timestamp, _ = chunks[0]
+            # Stesso boost del dispatcher live (la copia resta al worker)
+            boosted = np.multiply(audio, 3.0)
+            np.clip(boosted, -1.0, 1.0, out=boosted)
+            return self.pool.submit(google_speech.recognize_lines, boosted, LANGUAGES[self.lang], timestamp, SAMPLE_RATE)
+        if len(chunks) == 1:
+            audio, timestamp, clips = chunks[0]
+            return self.pool.submit(audio, self.lang, timestamp, clips, self.beam_size)
+        return self.pool.submit_batch(chunks, self.lang, self.beam_size)
+
+    def transcribe_file(self, path):
+        """Trascrive un file nell'ordine dei chunk; ritorna (righe, secondi di audio).
+        Se un processo worker muore il pool viene ricreato e il file ritentato una volta"""
+        try:
+            return self._transcribe_file(path)
+        except BrokenProcessPool:
+            print(f"WARNING: a worker process crashed on {path}, restarting the pool and retrying")
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._create_pool()
+            return self._transcribe_file(path)
+
+    def _transcribe_file(self, path):
+        frames = 0
+
+        def blocks():
+            # In memoria solo il blocco corrente, il ring e i chunk in volo
+            nonlocal frames
+            for block in audio_sources.iter_audio_blocks(path, SAMPLE_RATE, BLOCK_SECONDS):
+                frames += len(block)
+                yield block
+
+        out_path = transcript_path(path)
+        part_path = out_path + ".part"
+        try:
+            lines = self._write_transcript(blocks(), part_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, out_path)  # Solo ora il file risulta finito (ripresa)
+        return lines, frames / SAMPLE_RATE
+
+    def _write_transcript(self, blocks, part_path):
+        pending = deque()  # (future, batch?) nell'ordine dei chunk
+        max_inflight = self.workers * INFLIGHT_PER_WORKER
+        lines = 0
+
+        with open(part_path, "w", encoding="utf-8") as out:
+            def drain(limit):
+                nonlocal lines
+                while len(pending) > limit:
+                    future, is_batch = pending.popleft()
+                    results = future.result()
+                    for line in (sum(results, []) if is_batch else results):
+                        if line.startswith(FAILURE_PREFIXES):
+                            # Il file non va segnato come finito: la prossima esecuzione lo ritenta
+                            raise RuntimeError(f"chunk failed: {line}")
+                        out.write(line + "\n")
+                        lines += 1
+
+            group = []
+            try:
+                for start, num_frames, chunk, speech_ranges in iter_chunks(blocks, self.buffer_seconds, self.batch):
+                    if not speech_ranges:
+                        continue  # Solo silenzio: niente job
+                    group.append((chunk, format_offset(start), to_clip_timestamps(speech_ranges, SAMPLE_RATE)))
+                    if len(group) >= self.batch:
+                        pending.append((self._submit(group), len(group) > 1))
+                        group = []
+                        drain(max_inflight)
+                if group:
+                    pending.append((self._submit(group), len(group) > 1))
+                drain(0)
+            except BaseException:
+                for future, _ in pending:
+                    future.cancel()  # Il file è perso comunque: non occupare i worker
+                raise
+        return lines
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe folders of recordings offline, in parallel")
+    parser.add_argument("inputs", nargs="+", help="Audio files, folders (recursive) or glob patterns")
+    parser.add_argument("--engine", choices=["whisper", "google"], default="whisper")
+    parser.add_argument("--lang", choices=sorted(LANGUAGES), default="en")
+    parser.add_argument("--model", help="Whisper model (default: small.en / small)")
+    parser.add_argument("--processes", type=int, help="Whisper processes (default: cores / 2) or Google threads (4)")
+    parser.add_argument("--batch", type=int, default=1, help="Whisper: chunks per batched inference pass")
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--force", action="store_true", help="Transcribe again files that already have a transcript")
+    args = parser.parse_args(argv)
+
+    paths = find_inputs(args.inputs)
+    todo = [p for p in paths if args.force or not os.path.exists(transcript_path(p))]
+    print(f"{len(paths)} recordings, {len(paths) - len(todo)} already transcribed, {len(todo)} to go")
+    if not todo:
+        return 0
+
+    transcriber = BatchTranscriber(args.engine, args.lang, args.model, args.processes, max(1, args.batch), args.beam_size)
+    print(f"Engine: {args.engine} ({transcriber.model}), {transcriber.workers} workers")
+    failed = []
+    total_audio = 0.0
+    start = time.perf_counter()
+    try:
+        for i, path in enumerate(todo, 1):
+            file_start = time.perf_counter()
+            try:
+                lines, seconds = transcriber.transcribe_file(path)
+            except Exception as e:
+                print(f"[{i}/{len(todo)}] FAILED {path}: {type(e).__name__}: {e}")
+                failed.append(path)
+                continue
+            total_audio += seconds
+            elapsed = time.perf_counter() - file_start
+            print(f"[{i}/{len(todo)}] {path}: {seconds / 60:.1f} min, {lines} lines, "
+                  f"{elapsed:.1f}s ({seconds / elapsed if elapsed else 0:.1f}x real time)")
+    except KeyboardInterrupt:
+        print("\nInterrupted - run the same command again to resume from the first unfinished file")
+        return 130
+    finally:
+        transcriber.shutdown()
+
+    wall = time.perf_counter() - start
+    print(f"Done: {len(todo) - len(failed)} files, {total_audio / 3600:.2f} h of audio in {wall / 60:.1f} min"
+          f" ({total_audio / wall if wall else 0:.1f}x real time)")
+    if failed:
+        print(f"{len(failed)} failed (they will be retried on the next run):")
+        for path in failed:
+            print(f"  {path}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
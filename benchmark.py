@@ -0,0 +1,349 @@
+"""
+Benchmark offline della pipeline di trascrizione a chunk.
+
+Riproduce file audio (o sorgenti sintetiche "synth:speech?seconds=60") attraverso
+la pipeline VERA (record_audio_thread -> dispatcher_thread -> pool ->
+result_collector_thread) con una sorgente di audio_sources al posto di soundcard,
+a velocità reale, accelerata o senza pause (--speed 0).
+I motori sono intercambiabili:
+  - fake-google:  I/O-bound (sleep), percorso Google (un job per chunk)
+  - fake-whisper: percorso Whisper (batching), latenza simulata
+  - whisper:      modello faster-whisper locale (--model), thread condivisi
+  - whisper-process: pool di processi Whisper (un modello per processo)
+
+Per ogni file e motore: throughput (x tempo reale), real-time factor dei
+worker, percentili di latenza per fase (metrics), chunk scartati e picco di
+memoria. Con --json i risultati finiscono su file; con --baseline un
+peggioramento oltre --tolerance fa uscire con codice 1 (per la CI).
+
+    python benchmark.py registrazioni/*.wav --engine fake-google --engine fake-whisper --speed 0
+    python benchmark.py "synth:speech?seconds=300" --engine fake-whisper --speed 10
+    python benchmark.py meeting.wav --engine whisper --model tiny --speed 4 --json bench.json
+"""
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+import audio_sources
+import gui_transcriber as gui
+
+try:
+    import resource  # Solo Unix: picco RSS del processo
+except ImportError:
+    resource = None
+
+try:
+    import psutil  # Opzionale (Windows: picco working set)
+except ImportError:
+    psutil = None
+
+SAMPLE_RATE = gui.SAMPLE_RATE
+LANGUAGES = {"en": ("en-US", "en"), "pt": ("pt-BR", "pt")}  # --lang -> (Google, Whisper)
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg")
+LATENCY_METRICS = ("chunk.total", "chunk.capture->dispatch", "chunk.worker_start->worker_end")
+CAPTURE_ENQUEUE_TIMEOUT = gui.CAPTURE_ENQUEUE_TIMEOUT  # Attesa massima della cattura a velocità reale
+
+
+class FakeEngine:
+    """Motore finto: latenza fissa + rtf * durata audio (+ jitter).
+    cpu_bound=True tiene la CPU (e il GIL) invece di dormire"""
+
+    def __init__(self, mode, latency=0.2, rtf=0.1, jitter=0.0, cpu_bound=False, seed=0):
+        self.mode = mode
+        self.name = f"fake-{mode}"
+        self.latency = latency
+        self.rtf = rtf
+        self.jitter = jitter
+        self.cpu_bound = cpu_bound
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def setup(self, app):
+        pass
+
+    def _work(self, audio_seconds):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter)
+        delay = max(0.0, self.latency + self.rtf * audio_seconds + jitter)
+        if self.cpu_bound:
+            end = time.perf_counter() + delay
+            while time.perf_counter() < end:
+                pass
+        else:
+            time.sleep(delay)
+
+    def transcribe(self, audio, timestamp):
+        seconds = len(audio) / SAMPLE_RATE
+        self._work(seconds)
+        return [f"[{timestamp}] fake transcript ({seconds:.1f}s)"]
+
+    def transcribe_batch(self, chunks):
+        """Un solo passaggio per tutto il batch, come BatchedInferencePipeline"""
+        self._work(sum(len(audio) for audio, _, _ in chunks) / SAMPLE_RATE)
+        return [[f"[{timestamp}] fake transcript ({len(audio) / SAMPLE_RATE:.1f}s)"] for audio, timestamp, _ in chunks]
+
+
+class WhisperEngine:
+    """Whisper locale vero (stesso modello e stesse funzioni worker dell'app)"""
+
+    mode = "whisper"
+
+    def __init__(self, model_name, process_pool=False):
+        self.model_name = model_name
+        self.process_pool = process_pool
+        self.name = "whisper-process" if process_pool else "whisper"
+
+    def setup(self, app):
+        if not self.process_pool:
+            # Caricamento fuori dal tempo misurato
+            app.model = app.model_manager.get(self.model_name)
+            app.current_model_name = self.model_name
+
+
+class BenchmarkApp(gui.TranscriberApp):
+    """TranscriberApp senza UI: i worker passano dal motore scelto e il tempo di calcolo viene sommato"""
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self.lines = []  # Righe finali, nell'ordine di visualizzazione
+        self.busy_seconds = 0.0  # Tempo totale dei job nei worker
+        self._busy_lock = threading.Lock()
+
+    def _timed_job(self, audio_seconds, chunk_ids, fn, *args):
+        start = time.perf_counter()
+        try:
+            return super()._timed_job(audio_seconds, chunk_ids, fn, *args)
+        finally:
+            with self._busy_lock:
+                self.busy_seconds += time.perf_counter() - start
+
+    def process_chunk_google(self, audio_data, lang_code, timestamp):
+        return self.engine.transcribe(audio_data, timestamp)
+
+    def process_chunk_whisper(self, audio_data, lang_code, timestamp, clip_timestamps=None, beam_size=5, model=None):
+        if isinstance(self.engine, FakeEngine):
+            return self.engine.transcribe(audio_data, timestamp)
+        return super().process_chunk_whisper(audio_data, lang_code, timestamp, clip_timestamps, beam_size, model)
+
+    def process_batch_whisper(self, audio, chunk_specs, lang_code, beam_size=5, model=None):
+        if isinstance(self.engine, FakeEngine):
+            return self.engine.transcribe_batch([(audio[pos:pos + n], ts, clip) for pos, n, ts, clip in chunk_specs])
+        return super().process_batch_whisper(audio, chunk_specs, lang_code, beam_size, model)
+
+    def update_or_add_line(self, text, is_final, turn_order):
+        if is_final:
+            self.lines.append(text)
+        super().update_or_add_line(text, is_final, turn_order)
+
+
+def _peak_rss_mb():
+    """Picco di memoria residente del processo (None se non misurabile)"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        peak = getattr(info, "peak_wset", info.rss)
+        return round(peak / (1024 * 1024), 1)
+    return None
+
+
+def run_case(path, source, engine, speed=0.0, workers=(4, 1, 4), autoscale=False, buffer_seconds=4,
+             lang="en", policy=None, trace_malloc=False, verbose=False):
+    """Riproduce un file attraverso la pipeline e ritorna le misure"""
+    lang_google, lang_whisper = LANGUAGES[lang]
+    # Senza pause la cattura corre avanti: coda bloccante, altrimenti la politica scarta quasi tutto.
+    # Una sorgente a ritmo libero non perde audio mentre attende: nessun limite all'attesa
+    gui.OVERLOAD_POLICY = policy or ("block" if speed <= 0 else gui.OVERLOAD_POLICY)
+    gui.CAPTURE_ENQUEUE_TIMEOUT = None if speed <= 0 else CAPTURE_ENQUEUE_TIMEOUT
+
+    app = BenchmarkApp(engine)
+    engine.setup(app)
+    # Fine della sorgente = STOP: la pipeline smaltisce i chunk rimasti e si ferma
+    source.speed = speed
+    source.on_end = app.stop_event.set
+    audio_seconds = source.duration
+
+    out = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    if trace_malloc:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    try:
+        with out:
+            start = time.perf_counter()
+            threads = app.start_pipeline(
+                source, engine.mode, lang_google, lang_whisper, buffer_seconds, workers, autoscale,
+                process_pool_model=engine.model_name if getattr(engine, "process_pool", False) else None,
+            )
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - start
+    finally:
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_malloc else None
+        if trace_malloc:
+            tracemalloc.stop()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if app.autoscaler:
+                app.autoscaler.stop()
+            if app.executor:
+                app.executor.shutdown(wait=True, cancel_futures=False)
+            if app.whisper_pool:
+                app.whisper_pool.shutdown(wait=True, cancel_futures=False)
+            app.translator.shutdown()
+
+    snapshot = app.metrics.snapshot()
+    stats = app.audio_queue.stats()
+    return {
+        "file": path,
+        "engine": engine.name,
+        "speed": speed,
+        "workers": app.num_workers,
+        "policy": stats["policy"],
+        "audio_seconds": round(audio_seconds, 2),
+        "wall_seconds": round(wall, 3),
+        "throughput_x": round(audio_seconds / wall, 2) if wall else None,
+        # Pool di processi: il tempo dei job non è visibile da qui
+        "rtf": round(app.busy_seconds / audio_seconds, 3) if audio_seconds and app.busy_seconds else None,
+        "chunks": app.chunk_counter,
+        "lines": len(app.lines),
+        "dropped": stats["dropped"] + app.chunks_overwritten + app.capture_stalls,
+        "degraded": stats["degraded"],
+        "latency": {name: snapshot[name] for name in snapshot if name.startswith("chunk.")},
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_traced_mb": round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None,
+    }
+
+
+def print_report(results):
+    header = f"{'file':<28} {'engine':<16} {'audio s':>8} {'wall s':>8} {'x RT':>7} {'RTF':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'drop':>5} {'MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        total = r["latency"].get("chunk.total", {})
+        print(
+            f"{os.path.basename(r['file'])[:28]:<28} {r['engine']:<16} {r['audio_seconds']:>8} {r['wall_seconds']:>8} "
+            f"{r['throughput_x'] or '-':>7} {r['rtf'] or '-':>6} {total.get('p50_ms', '-'):>8} {total.get('p95_ms', '-'):>8} "
+            f"{total.get('p99_ms', '-'):>8} {r['dropped']:>5} {r['peak_traced_mb'] or r['peak_rss_mb'] or '-':>7}"
+        )
+    for r in results:
+        print(f"\n{os.path.basename(r['file'])} / {r['engine']}:")
+        for name in LATENCY_METRICS:
+            s = r["latency"].get(name)
+            if s and s["count"]:
+                print(f"  {name:<34} p50 {s['p50_ms']:>8} ms  p95 {s['p95_ms']:>8} ms  p99 {s['p99_ms']:>8} ms")
+
+
+def compare_baseline(results, baseline_path, tolerance):
+    """Confronta con un JSON precedente: ritorna le regressioni (p95 più alto o throughput più basso)"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(os.path.basename(r["file"]), r["engine"], r["speed"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get((os.path.basename(r["file"]), r["engine"], r["speed"]))
+        if not base:
+            continue
+        p95 = r["latency"].get("chunk.total", {}).get("p95_ms")
+        base_p95 = base["latency"].get("chunk.total", {}).get("p95_ms")
+        if p95 and base_p95 and p95 > base_p95 * (1 + tolerance):
+            regressions.append(f"{r['engine']} {os.path.basename(r['file'])}: p95 {base_p95} -> {p95} ms")
+        if r["throughput_x"] and base["throughput_x"] and r["throughput_x"] < base["throughput_x"] * (1 - tolerance):
+            regressions.append(f"{r['engine']} {os.path.basename(r['file'])}: throughput {base['throughput_x']}x -> {r['throughput_x']}x")
+    return regressions
+
+
+def create_engine(name, args):
+    if name == "fake-google":
+        return FakeEngine("google", args.latency, args.rtf, args.jitter, args.fake_cpu)
+    if name == "fake-whisper":
+        return FakeEngine("whisper", args.latency, args.rtf, args.jitter, args.fake_cpu)
+    if name == "whisper":
+        return WhisperEngine(args.model)
+    if name == "whisper-process":
+        return WhisperEngine(args.model, process_pool=True)
+    raise ValueError(f"Unknown engine '{name}'")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay audio files through the transcription pipeline")
+    parser.add_argument("inputs", nargs="+", help="Audio files, folders, glob patterns or synth:... sources")
+    parser.add_argument("--engine", action="append", choices=["fake-google", "fake-whisper", "whisper", "whisper-process"],
+                        help="Engine to benchmark (repeatable, default fake-google)")
+    parser.add_argument("--speed", type=float, default=0.0, help="Playback speed (1 = real time, 0 = as fast as possible)")
+    parser.add_argument("--workers", type=int, default=4, help="Worker threads (or processes)")
+    parser.add_argument("--autoscale", action="store_true", help="Let the autoscaler resize the pool (1..workers)")
+    parser.add_argument("--buffer", type=float, default=4, help="Chunk buffer seconds (as in the app)")
+    parser.add_argument("--lang", choices=sorted(LANGUAGES), default="en")
+    parser.add_argument("--policy", choices=["block", "drop_oldest", "skip_silence", "degrade"],
+                        help="Overload policy (default: block when unpaced, else OVERLOAD_POLICY)")
+    parser.add_argument("--model", default="tiny", help="Whisper model for the whisper engines")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake engine: fixed latency per job (s)")
+    parser.add_argument("--rtf", type=float, default=0.1, help="Fake engine: seconds of work per audio second")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Fake engine: +/- random latency (s)")
+    parser.add_argument("--fake-cpu", action="store_true", help="Fake engine: busy-wait instead of sleeping")
+    parser.add_argument("--tracemalloc", action="store_true", help="Track peak Python/numpy allocations (slower)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Previous --json output: exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression vs baseline (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline debug output")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for item in args.inputs:
+        if item.startswith(audio_sources.SYNTH_PREFIX):
+            paths.append(item)
+        elif os.path.isdir(item):
+            paths.extend(sorted(p for p in glob.glob(os.path.join(item, "*")) if p.lower().endswith(AUDIO_EXTENSIONS)))
+        else:
+            paths.extend(sorted(glob.glob(item)) or [item])
+    if not paths:
+        parser.error("no audio files found")
+
+    results = []
+    for path in paths:
+        if path.startswith(audio_sources.SYNTH_PREFIX):
+            source = audio_sources.open_source(path)
+            if not source.duration:
+                parser.error(f"{path}: synthetic sources need ?seconds=N")
+        else:
+            # Caricato una volta sola per tutti i motori
+            source = audio_sources.FileSource(path, audio=audio_sources.load_audio(path, SAMPLE_RATE))
+        for engine_name in args.engine or ["fake-google"]:
+            engine = create_engine(engine_name, args)
+            print(f"Running {engine_name} on {path} ({source.duration:.1f}s, speed {args.speed or 'max'})...")
+            results.append(run_case(
+                path, source, engine, speed=args.speed,
+                workers=(args.workers, 1, args.workers), autoscale=args.autoscale,
+                buffer_seconds=args.buffer, lang=args.lang, policy=args.policy,
+                trace_malloc=args.tracemalloc, verbose=args.verbose,
+            ))
+
+    print()
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        regressions = compare_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
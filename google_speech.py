@@ -0,0 +1,31 @@
+"""
+Riconoscimento Google Speech di un chunk (condiviso da GUI e batch_transcribe).
+
+Stesso contratto dei worker Whisper (whisper_pool.transcribe_lines): ritorna la
+lista di righe "[timestamp] testo" da mostrare, vuota se non c'è parlato.
+"""
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def recognize_lines(audio_data, lang_code, timestamp, sample_rate=SAMPLE_RATE):
+    """Worker per Google Speech (thread-safe, ritorna risultati)"""
+    import speech_recognition as sr
+    try:
+        recognizer = sr.Recognizer()
+        audio_int16 = (audio_data * 32767).astype(np.int16)
+        audio_bytes = audio_int16.tobytes()
+        audio_source = sr.AudioData(audio_bytes, sample_rate, 2)
+
+        try:
+            text = recognizer.recognize_google(audio_source, language=lang_code)
+            return [f"[{timestamp}] {text}"]
+        except sr.UnknownValueError:
+            return []  # Nessun testo riconosciuto
+        except sr.RequestError as e:
+            print(f"Google API Error: {e}")
+            return [f"[⚠️ Google API Error - check internet connection]"]
+    except Exception as e:
+        print(f"Google Worker Crash: {type(e).__name__}: {e}")
+        return [f"[❌ Google Processing Failed]"]
@@ -1,30 +1,47 @@
+from __future__ import annotations
+
+import lazy_imports
+if lazy_imports.IMPORT_TIMING:
+    lazy_imports.install_import_timer()  # Prima di tutti gli altri import
 import flet as ft
 import threading
+import atexit
 import queue
 import time
 import datetime
-import numpy as np
-import soundcard as sc
-import speech_recognition as sr
-from faster_whisper import WhisperModel
 import warnings
 import sys
 import os
-import json # #region debug log import
-# #endregion
 import asyncio  # Necessario per scroll ritardato
-from concurrent.futures import ThreadPoolExecutor
-import assemblyai as aai
-from assemblyai.streaming.v3 import (
-    StreamingClient,
-    StreamingClientOptions,
-    StreamingParameters,
-    StreamingEvents,
-    BeginEvent,
-    TurnEvent,
-    TerminationEvent,
-    StreamingError
-)
+import bisect
+import random
+from collections import deque
+from concurrent.futures import Future
+from lazy_imports import lazy_module, preload, import_report
+import tracing
+from metrics import MetricsRegistry
+from whisper_streaming import LocalAgreementBuffer
+from model_manager import WhisperModelManager
+from pipeline_queue import BoundedPipelineQueue
+from reorder_buffer import ReorderBuffer
+from autoscaler import ResizableThreadPool, WorkerAutoscaler
+from transcript_view import TranscriptRenderer, UpdateCoalescer
+from transcript_store import TranscriptStore
+from translation_service import TranslationService
+from translation_backends import create_backend
+from log_writer import TranscriptLogWriter
+
+# Moduli pesanti: importati al primo utilizzo (o in background quando si sceglie il motore)
+np = lazy_module("numpy")
+sc = lazy_module("soundcard")
+sr = lazy_module("speech_recognition")
+faster_whisper = lazy_module("faster_whisper")
+aai_streaming = lazy_module("assemblyai.streaming.v3")
+audio_buffer = lazy_module("audio_buffer")
+audio_sources = lazy_module("audio_sources")
+vad = lazy_module("vad")
+whisper_pool = lazy_module("whisper_pool")
+google_speech = lazy_module("google_speech")
 
 # Prova a caricare variabili d'ambiente da .env (opzionale)
 try:
@@ -37,25 +54,107 @@ except ImportError:
 SAMPLE_RATE = 16000
 DEVICE_TYPE = "cpu"
 COMPUTE_TYPE = "int8"
-# Ignora warning
+CAPTURE_BLOCK_SECONDS = 0.5  # Blocchi piccoli dal device verso il ring buffer
+RING_BUFFER_CHUNKS = 24  # Capacità del ring buffer in chunk (> coda audio + batch in attesa; i job ricevono copie)
+CHUNK_MIN_FACTOR = 0.5  # Chunk adattivi: taglio alla prima pausa dopo buffer * MIN...
+CHUNK_MAX_FACTOR = 1.5  # ...e comunque entro buffer * MAX
+# Backend Whisper: "thread" (un modello condiviso) o "process" (un modello per processo)
+WHISPER_BACKEND = os.getenv("WHISPER_BACKEND", "thread")
+WHISPER_PROCESS_THREADS = 2  # Thread CTranslate2 per ogni processo Whisper
+# Modelli Whisper per lingua, precaricati in background all'avvio (cache LRU)
+WHISPER_MODELS = {"English": "small.en", "Português": "tiny"}
+WHISPER_PRELOAD = [m for m in os.getenv("WHISPER_PRELOAD", "small.en,tiny").split(",") if m.strip()]
+WHISPER_MODEL_CACHE_SIZE = 2
+WHISPER_BATCH_MAX_CHUNKS = 8  # Chunk massimi in un singolo passaggio batched
+# Traduzione: "google" (online), "local" (modello CTranslate2 in TRANSLATION_MODEL_PATH) o "stub"
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")
+# Worker di trascrizione: (iniziali, minimo, massimo) con auto-scaling sul real-time factor
+AUTOSCALE_WORKERS = os.getenv("AUTOSCALE_WORKERS", "1") == "1"
+CPU_COUNT = os.cpu_count() or 2
+WHISPER_WORKERS = (min(4, CPU_COUNT), 1, CPU_COUNT)  # CPU-bound: mai oltre i core
+GOOGLE_WORKERS = (4, 2, 16)  # I/O-bound: limitato dal rate limiting dell'API
+# Code limitate: politica di overload "block", "drop_oldest", "skip_silence" o "degrade"
+OVERLOAD_POLICY = os.getenv("OVERLOAD_POLICY", "block")
+# Politica "degrade": modello più leggero usato sopra soglia (solo se già in cache, es. precaricato)
+WHISPER_DEGRADE_MODEL = os.getenv("WHISPER_DEGRADE_MODEL", "tiny")
+AUDIO_QUEUE_MAXSIZE = 4  # Chunk catturati in attesa del dispatcher
+# Attesa massima della cattura sulla coda audio piena: il device continua a produrre, oltre
+# il chunk viene scartato (contato e segnalato) invece di perdere audio senza traccia
+CAPTURE_ENQUEUE_TIMEOUT = float(os.getenv("CAPTURE_ENQUEUE_TIMEOUT", "1.0"))
+RESULT_QUEUE_MAXSIZE = 64  # Future registrati in attesa del collector
+TURN_CACHE_SIZE = 1000  # Turni recenti tenuti in memoria (lo storico completo è in TranscriptStore)
+CHUNK_RESULT_TIMEOUT = 45  # Secondi prima di saltare un chunk che blocca l'ordine
+# Mostra subito (come righe provvisorie) i risultati arrivati fuori ordine
+SHOW_PROVISIONAL_RESULTS = os.getenv("SHOW_PROVISIONAL_RESULTS", "0") == "1"
+CHUNK_PAUSE_MS = 200  # Pausa minima oltre all'hangover del VAD (~600ms di silenzio reale)
+STREAM_STEP_SECONDS = 0.5  # Whisper streaming: ogni quanto ridecodificare la finestra
+STREAM_MAX_WINDOW_SECONDS = 15  # Whisper streaming: oltre, il turno viene chiuso
+STREAM_IDLE_TRIM_SECONDS = 3  # Whisper streaming: silenzio iniziale scartato dalla finestra
+# AssemblyAI: cattura e invio separati da una coda (la rete lenta non ferma mai la cattura)
+AAI_FRAME_SECONDS = 0.05  # Frame di cattura (50ms, latenza minima)
+AAI_MAX_FRAME_SECONDS = 1.0  # Messaggio più lungo accettato dallo streaming v3 (50-1000 ms)
+AAI_SEND_QUEUE_SECONDS = 60  # Audio tenuto in coda se la rete rallenta (oltre, la cattura attende)
+AAI_MAX_PENDING_SENDS = 2  # Messaggi nella coda interna dell'SDK oltre cui i frame si accumulano (e si uniscono) qui
+AAI_DRAIN_TIMEOUT = 3  # STOP: secondi concessi per inviare l'audio ancora in coda
+# AssemblyAI: riconnessione automatica se la connessione cade a metà sessione
+AAI_REPLAY_SECONDS = 15  # Ultimo audio inviato tenuto per reinviarlo dopo la riconnessione
+AAI_RECONNECT_ATTEMPTS = 8  # Tentativi consecutivi prima di chiudere la sessione
+AAI_RECONNECT_BASE_DELAY = 0.5  # Backoff esponenziale (con jitter) da 0.5s...
+AAI_RECONNECT_MAX_DELAY = 15  # ...fino a 15s tra un tentativo e l'altro
+AAI_STABLE_SECONDS = 30  # Connessione rimasta su almeno così a lungo: il backoff riparte da capo
+AAI_STALL_SECONDS = 10  # Nessun messaggio inviato dall'SDK per così a lungo: connessione persa
+# Ignora warning (anche SoundcardRuntimeWarning, senza importare soundcard all'avvio)
 warnings.filterwarnings("ignore", category=UserWarning)
-try:
-    from soundcard.mediafoundation import SoundcardRuntimeWarning
-    warnings.filterwarnings("ignore", category=SoundcardRuntimeWarning)
-except ImportError:
-    pass
+warnings.filterwarnings("ignore", module="soundcard")
 
 class TranscriberApp:
     def __init__(self):
         self.is_recording = False
         self.stop_event = threading.Event()
-        self.audio_queue = queue.Queue()
-        self.result_queue = queue.Queue()  # Per risultati ordinati
+        self.audio_queue = BoundedPipelineQueue(
+            AUDIO_QUEUE_MAXSIZE, OVERLOAD_POLICY,
+            is_silence=lambda item: not item[4],  # Nessun intervallo di parlato
+            on_drop=self._on_chunk_dropped,
+        )
+        self.result_queue = BoundedPipelineQueue(RESULT_QUEUE_MAXSIZE, "block")  # Per risultati ordinati
         self.executor = None  # Creato dinamicamente
+        self.autoscaler = None  # Regola il numero di worker del pool a thread
+        self.whisper_pool = None  # Backend Whisper multi-processo (opzionale)
+        self.num_workers = 0
+        self.inflight = 0  # Job in esecuzione (o in coda) nel pool
+        self.inflight_lock = threading.Lock()
+        self.batch_pending = []  # Chunk Whisper in attesa di un worker libero: (future, inizio, frame, timestamp, clip, beam, chunk_id)
+        self.chunks_overwritten = 0  # Chunk rimasti in attesa così a lungo che il ring li ha sovrascritti
+        self.capture_stalls = 0  # Chunk scartati perché la cattura avrebbe dovuto attendere troppo
+        self.batched_pipeline = None  # BatchedInferencePipeline sul modello corrente
+        self.degrade_pipeline = None  # BatchedInferencePipeline sul modello della politica "degrade"
         self.chunk_counter = 0  # Contatore per ordinamento
+        # Fine cattura / fine dispatch: allo STOP l'ultimo chunk attraversa tutta la pipeline
+        self.capture_done = threading.Event()
+        self.dispatch_done = threading.Event()
+        self.streaming_done = threading.Event()  # Streaming Whisper: ultimo turno emesso
+        self.streaming_done.set()
+        self.audio_ring = None  # Ring buffer preallocato (creato per sessione)
         self.model = None
         self.current_model_name = ""
+        self.model_manager = WhisperModelManager(WHISPER_MODEL_CACHE_SIZE, DEVICE_TYPE, COMPUTE_TYPE)
         self.log_file = ""
+        self.log_writer = None  # Writer asincrono del file di trascrizione (uno per sessione)
+        # Latenze per fase: i chunk si chiudono quando mostrati, i turni quando resi e tradotti
+        self.metrics = MetricsRegistry(final_stages={"chunk": {"display"}, "turn": {"render", "translate"}})
+        self.stream_audio_ms = 0  # AssemblyAI: millisecondi di audio catturati nella sessione
+        self.stream_yields = deque(maxlen=2000)  # AssemblyAI: (fine audio in ms, istante di cattura)
+        # AssemblyAI: frame PCM16 (bytes, istante di cattura) in attesa di invio, senza perdite
+        self.send_queue = BoundedPipelineQueue(int(AAI_SEND_QUEUE_SECONDS / AAI_FRAME_SECONDS), "block")
+        self.stream_drained = threading.Event()  # Coda di invio svuotata a fine cattura
+        self.stream_stats = {}  # AssemblyAI: messaggi, frame, unione massima, riconnessioni, audio reinviato
+        self.stream_lost = threading.Event()  # Connessione corrente caduta (errore, chiusura o stallo)
+        self.replay_buffer = deque()  # (PCM16, inizio ms, fine ms) degli ultimi AAI_REPLAY_SECONDS inviati
+        self.stream_base_ms = None  # Ms di sessione corrispondenti al tempo 0 della connessione corrente
+        self.stream_final_ms = 0  # Fine dell'ultimo turno finale (audio da non reinviare)
+        self.stream_partial_turn = None  # Turno parziale ancora aperto (rimosso se la connessione cade)
+        # Pool fisso, batching e cache LRU sopra il backend scelto
+        self.translator = TranslationService(create_backend(TRANSLATION_BACKEND), target="it")
         
         # AssemblyAI Real-Time Streaming
         self.assemblyai_transcriber = None
@@ -66,33 +165,17 @@ class TranscriberApp:
         
         # Per gestire trascrizioni parziali (real-time)
         self.current_partial_text = ""
-        self.last_turn_order = -1
+        self.last_turn_order = -1  # Ultimo ID di turno AssemblyAI (offset incluso)
         self.turn_text_map = {}  # Mappa turn_order -> Testo stringa
         self.translated_text_map = {} # Mappa turn_order -> Testo tradotto
         self.turn_id_offset = 0  # Offset per garantire ordine tra sessioni
+        self.turn_id_lock = threading.Lock()
+        self.last_reserved_turn_id = 0  # Ultimo ID riservato da _reserve_turn_id
         
-        self.full_log_text = ft.Text(
-            value="", 
-            font_family="Consolas", 
-            size=14, 
-            color=ft.Colors.GREEN_400,
-            selectable=True
-        )
-        
-        self.full_translation_text = ft.Text(
-            value="", 
-            font_family="Consolas", 
-            size=14, 
-            color=ft.Colors.CYAN_400, # Colore diverso per traduzione
-            selectable=True
-        )
-    
         # Stato UI
         self.page = None
-        self.log_scroll_column = None # Colonna per auto-scroll (Trascrizione)
-        self.translation_scroll_column = None # Colonna per auto-scroll (Traduzione)
-        self.scroll_anchor = None # Ancora per lo scroll manuale
-        self.translation_scroll_anchor = None # Ancora per lo scroll manuale (Traduzione)
+        self.renderer = None  # Una riga per turno nelle due colonne (rendering incrementale)
+        self.coalescer = None  # Raggruppa gli aggiornamenti dei turni (max UI_MAX_FPS flush/s)
 
         
     def get_log_dir(self):
@@ -106,287 +189,786 @@ class TranscriberApp:
         return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     def log_to_file(self, text):
-        if self.log_file:
-            try:
-                with open(self.log_file, "a", encoding="utf-8") as f:
-                    f.write(text + "\n")
-            except:
-                pass
+        if self.log_writer:
+            self.log_writer.write(text)  # Accodata: scritta a blocchi dal thread del writer
 
-    def translate_text(self, text, target_lang="it"):
-        """Traduce il testo usando deep_translator (Google Translate)"""
+    def _open_log(self, path):
+        """Apre il file di trascrizione della nuova sessione (chiude quello precedente)"""
+        if self.log_writer:
+            self.log_writer.close()
+            self.log_writer = None
+        self.log_file = path
         try:
-            from deep_translator import GoogleTranslator
-            translated = GoogleTranslator(source='auto', target=target_lang).translate(text)
-            return translated
+            self.log_writer = TranscriptLogWriter(path)
         except Exception as e:
-            print(f"Translation Error: {e}")
-            return f"[Translation Error]"
+            print(f"Error opening log file {path}: {e}")
 
     def record_audio_thread(self, mic, buffer_seconds):
-        """Cattura audio e lo etichetta con chunk_id e timestamp di cattura"""
+        """Cattura audio a blocchi nel ring buffer e chiude i chunk sulle pause del parlato
+        (buffer_seconds=None: riempie solo il ring, usato dallo streaming Whisper)"""
         print(f"DEBUG: Start Recording Thread (Buffer: {buffer_seconds}s)")
+        block_frames = int(SAMPLE_RATE * CAPTURE_BLOCK_SECONDS)
+        ring = self.audio_ring
+        chunker = None
+        if buffer_seconds:
+            chunker = vad.AdaptiveChunker(
+                ring,
+                min_seconds=buffer_seconds * CHUNK_MIN_FACTOR,
+                max_seconds=buffer_seconds * CHUNK_MAX_FACTOR,
+                pause_ms=CHUNK_PAUSE_MS,
+                sample_rate=SAMPLE_RATE,
+            )
         try:
             with mic.recorder(samplerate=SAMPLE_RATE) as recorder:
                 while not self.stop_event.is_set():
                     try:
-                        # Cattura timestamp PRIMA del recording (più accurato)
-                        capture_time = datetime.datetime.now()
-                        data = recorder.record(numframes=SAMPLE_RATE * buffer_seconds)
-                        
-                        # Etichetta chunk con ID progressivo
-                        chunk_id = self.chunk_counter
-                        self.chunk_counter += 1
-                        
-                        # Metti in queue: (chunk_id, capture_time, audio_data)
-                        self.audio_queue.put((chunk_id, capture_time, data))
-                        
+                        block = recorder.record(numframes=block_frames)
+                        with tracing.span("capture.block"):
+                            ring.write(block)
+                            if chunker:
+                                for start, num_frames, speech_ranges in chunker.update():
+                                    self._enqueue_chunk(start, num_frames, speech_ranges)
                     except Exception as e:
                         print(f"Error recording: {e}")
                         time.sleep(0.1)
+                # Ultimo chunk parziale (fine sessione)
+                if chunker:
+                    last = chunker.flush()
+                    if last:
+                        self._enqueue_chunk(*last)
         except Exception as e:
             print(f"Fatal recorder error: {e}")
+        finally:
+            self.capture_done.set()
+
+    def _enqueue_chunk(self, start, num_frames, speech_ranges):
+        """Etichetta il chunk con ID progressivo e timestamp di cattura e lo accoda"""
+        chunk_id = self.chunk_counter
+        self.chunk_counter += 1
+        # Timestamp di cattura = inizio del chunk (ricavato dai campioni ancora dopo di lui)
+        behind = (self.audio_ring.write_pos - start) / SAMPLE_RATE
+        capture_time = datetime.datetime.now() - datetime.timedelta(seconds=behind)
+        # Metti in queue: (chunk_id, capture_time, inizio, lunghezza, parlato) nel ring
+        tracing.async_begin("chunk", chunk_id, seconds=round(num_frames / SAMPLE_RATE, 2), speech=bool(speech_ranges))
+        self.metrics.mark("chunk", chunk_id, "capture")  # Fine del chunk: da qui conta la latenza
+        item = (chunk_id, capture_time, start, num_frames, speech_ranges)
+        try:
+            self.audio_queue.put(item, timeout=CAPTURE_ENQUEUE_TIMEOUT)
+        except queue.Full:
+            # La coda non si è liberata in tempo: la cattura non può fermarsi oltre
+            self.capture_stalls += 1
+            self._on_chunk_dropped(item, reason=f"capture waited {CAPTURE_ENQUEUE_TIMEOUT}s")
+        tracing.counter("queue.audio", depth=self.audio_queue.qsize())
 
     def dispatcher_thread(self, engine_mode, lang_code, whisper_lang, buffer_seconds):
         """Distribuisce chunk ai worker paralleli (NON BLOCCA!)"""
         print("DEBUG: Start Dispatcher Thread (Parallel Processing)")
-        prev_audio_chunk = np.array([], dtype='float32')
-        overlap_samples = int(SAMPLE_RATE * (2.0 if engine_mode == "google" else 0))
+        ring = self.audio_ring
 
-        while not self.stop_event.is_set() or not self.audio_queue.empty():
-            try:
-                chunk_id, capture_time, data = self.audio_queue.get(timeout=1)
-            except queue.Empty:
-                continue
+        try:
+            while not self.capture_done.is_set() or not self.audio_queue.empty() or self.batch_pending:
+                # Back-pressure: se il pool è saturo non si prelevano altri chunk; la coda audio
+                # limitata si riempie e applica la politica di overload (niente sleep ciechi)
+                if self._pool_saturated(engine_mode):
+                    self._dispatch_whisper_pending(whisper_lang)
+                    time.sleep(0.05)
+                    continue
+                try:
+                    # Con chunk Whisper in attesa controlla spesso se un worker si è liberato
+                    chunk_id, capture_time, start, num_frames, speech_ranges = self.audio_queue.get(timeout=0.1 if self.batch_pending else 1)
+                except queue.Empty:
+                    self._dispatch_whisper_pending(whisper_lang)
+                    continue
 
-            mono_data = np.mean(data, axis=1)
+                tracing.event("dispatch", chunk=chunk_id)
+                self.metrics.mark("chunk", chunk_id, "dispatch")
+                if not ring.contains(start, num_frames):
+                    self._on_chunk_overwritten(chunk_id)
+                    continue
 
-            if engine_mode == "google":
-                if prev_audio_chunk.size > 0:
-                    combined_data = np.concatenate((prev_audio_chunk, mono_data))
-                else:
-                    combined_data = mono_data
-                
-                prev_audio_chunk = mono_data[-overlap_samples:]
-                data_to_process = combined_data
-                
-                boost_factor = 3.0
-                data_to_process = data_to_process * boost_factor
-                data_to_process = np.clip(data_to_process, -1.0, 1.0)
-            else:
-                data_to_process = mono_data
+                if engine_mode == "google":
+                    # Unica allocazione per chunk: il boost scrive in un array di proprietà del worker
+                    boost_factor = 3.0
+                    data_to_process = np.multiply(ring.view(start, num_frames), boost_factor)
+                    np.clip(data_to_process, -1.0, 1.0, out=data_to_process)
+                    if not ring.contains(start, num_frames):  # Sovrascritto durante la copia
+                        self._on_chunk_overwritten(chunk_id)
+                        continue
 
-            # Usa timestamp di cattura (non di elaborazione!)
-            timestamp = capture_time.strftime("%Y-%m-%d %H:%M:%S")
+                # Usa timestamp di cattura (non di elaborazione!)
+                timestamp = capture_time.strftime("%Y-%m-%d %H:%M:%S")
             
-            # Check se audio è silenzioso
-            if np.max(np.abs(data_to_process)) < 0.0001:
-                prev_audio_chunk = np.array([], dtype='float32')
-                # IMPORTANTE: Crea future "vuoto" per mantenere ordine sequenziale!
-                from concurrent.futures import Future
-                empty_future = Future()
-                empty_future.set_result([])  # Risultato vuoto (nessun testo)
-                self.result_queue.put((chunk_id, empty_future))
-                print(f"DEBUG: Chunk {chunk_id} SKIPPED (silence) but placeholder added")
-                continue
+                # Nessun parlato nel chunk: non arriva nemmeno al pool
+                if not speech_ranges:
+                    # IMPORTANTE: Crea future "vuoto" per mantenere ordine sequenziale!
+                    empty_future = Future()
+                    empty_future.set_result([])  # Risultato vuoto (nessun testo)
+                    self.metrics.discard("chunk", chunk_id)  # Solo i chunk con parlato entrano nelle latenze
+                    self.result_queue.put((chunk_id, empty_future))
+                    print(f"DEBUG: Chunk {chunk_id} SKIPPED (no speech) but placeholder added")
+                    continue
             
-            # SOTTOMETTI AL POOL (non blocca!)
-            if engine_mode == "google":
-                future = self.executor.submit(self.process_chunk_google, data_to_process.copy(), lang_code, timestamp)
-            else:
-                future = self.executor.submit(self.process_chunk_whisper, data_to_process.copy(), whisper_lang, timestamp)
+                # SOTTOMETTI AL POOL (non blocca!)
+                if engine_mode == "google":
+                    future = self.executor.submit(self._timed_job, num_frames / SAMPLE_RATE, [chunk_id], self.process_chunk_google, data_to_process, lang_code, timestamp)
+                    self._track_job(future, [chunk_id])
+                else:
+                    # I worker ricevono i clip di parlato: niente vad_filter ripetuto
+                    clip_timestamps = vad.to_clip_timestamps(speech_ranges, SAMPLE_RATE)
+                    # Future "proxy" subito in result queue (ordine garantito), il job parte
+                    # appena c'è un worker libero: se i worker sono in ritardo, in batch
+                    future = Future()
+                    # Politica "degrade": con la coda sopra soglia si decodifica in greedy (beam 1)
+                    # e, se precaricato, con il modello più leggero (beam 1 = chunk degradato)
+                    beam_size = 1 if self.audio_queue.should_degrade() else 5
+                    # In attesa resta solo la posizione nel ring: la copia si fa all'invio al pool
+                    self.batch_pending.append((future, start, num_frames, timestamp, clip_timestamps, beam_size, chunk_id))
+                    self._dispatch_whisper_pending(whisper_lang)
             
-            # Aggiungi alla result queue con chunk_id per ordinamento
-            self.result_queue.put((chunk_id, future))
-            current_queue_size = self.result_queue.qsize()
-            print(f"DEBUG: Chunk {chunk_id} submitted to pool (queue size: {current_queue_size})")
+                # Aggiungi alla result queue con chunk_id per ordinamento
+                self.result_queue.put((chunk_id, future))
+                backlog = self.inflight + len(self.batch_pending) + self.audio_queue.qsize()
+                print(f"DEBUG: Chunk {chunk_id} submitted to pool (backlog: {backlog})")
             
-            # Warning se queue troppo alta (collo di bottiglia!)
-            if current_queue_size > 3:
-                print(f"⚠️ WARNING: Queue size {current_queue_size} > 3 - Processing bottleneck detected!")
-                if current_queue_size > 6:
-                    print(f"🔴 CRITICAL: Queue size {current_queue_size} > 6 - Workers overloaded!")
-                
-                # Back-pressure: rallenta recording se queue troppo piena
-                if current_queue_size > 8:
-                    print(f"🛑 BACK-PRESSURE: Pausing recording for 2s to let workers catch up...")
-                    time.sleep(2)  # Pausa per dare tempo ai worker di recuperare
-        
+                # Warning se backlog troppo alto (collo di bottiglia!)
+                if backlog > 3:
+                    print(f"⚠️ WARNING: Backlog {backlog} > 3 - Processing bottleneck detected!")
+                    if backlog > 6:
+                        print(f"🔴 CRITICAL: Backlog {backlog} > 6 - Workers overloaded!")
+        finally:
+            self.dispatch_done.set()  # Anche se il dispatcher si interrompe: il collector non resta appeso
         print("DEBUG: Dispatcher finished")
+
+    def _pool_saturated(self, engine_mode):
+        """True se il pool non può accettare altri chunk senza far crescere il backlog"""
+        if engine_mode == "google":
+            return self.inflight >= self.num_workers * 2
+        return len(self.batch_pending) >= WHISPER_BATCH_MAX_CHUNKS
+
+    def _track_job(self, job, chunk_ids):
+        """Conta i job nel pool (per back-pressure e batching)"""
+        with self.inflight_lock:
+            self.inflight += 1
+
+        def _done(_f):
+            with self.inflight_lock:
+                self.inflight -= 1
+            for chunk_id in chunk_ids:  # Pool di processi: fine job vista dal processo principale
+                self.metrics.mark("chunk", chunk_id, "worker_end")
+        job.add_done_callback(_done)
+
+    def _timed_job(self, audio_seconds, chunk_ids, fn, *args):
+        """Esegue un job nel worker misurandone il real-time factor per l'autoscaler"""
+        for chunk_id in chunk_ids:
+            self.metrics.mark("chunk", chunk_id, "worker_start")
+        start = time.perf_counter()
+        try:
+            with tracing.span("worker.job", fn=fn.__name__, audio_seconds=round(audio_seconds, 2)):
+                return fn(*args)
+        finally:
+            if self.autoscaler:
+                self.autoscaler.record(time.perf_counter() - start, audio_seconds)
+            for chunk_id in chunk_ids:
+                self.metrics.mark("chunk", chunk_id, "worker_end")
+
+    def _apply_num_workers(self, num_workers):
+        """Callback dell'autoscaler: ridimensiona il pool a sessione avviata"""
+        self.num_workers = num_workers
+        if self.executor:
+            self.executor.resize(num_workers)
+
+    def _on_chunk_dropped(self, item, reason=None):
+        """Chunk scartato dalla politica di overload: placeholder per non bloccare l'ordine"""
+        chunk_id, _capture_time, _start, _num_frames, speech_ranges = item
+        self.metrics.discard("chunk", chunk_id)
+        placeholder = Future()
+        if speech_ranges:
+            print(f"⚠️ OVERLOAD: Chunk {chunk_id} dropped ({reason or OVERLOAD_POLICY})")
+            placeholder.set_result([f"[⚠️ CHUNK {chunk_id} DROPPED - Overload]"])
+        else:
+            placeholder.set_result([])
+        self.result_queue.put((chunk_id, placeholder))
+
+    def _on_chunk_overwritten(self, chunk_id, future=None):
+        """Chunk atteso troppo a lungo: il ring ha già sovrascritto il suo audio (mai trascritto)"""
+        self.chunks_overwritten += 1
+        self.metrics.discard("chunk", chunk_id)
+        print(f"⚠️ OVERLOAD: Chunk {chunk_id} lost (audio overwritten in the ring buffer)")
+        lines = [f"[⚠️ CHUNK {chunk_id} LOST - Overload]"]
+        if future is None:
+            future = Future()
+            self.result_queue.put((chunk_id, future))
+        future.set_result(lines)
+
+    def _copy_pending(self, batch):
+        """Copia dal ring i chunk in attesa (una sola allocazione per tutto il batch).
+        Ritorna (audio, [(proxy, chunk_id, inizio in audio, frame, timestamp, clip, beam)])
+        senza i chunk già sovrascritti"""
+        ring = self.audio_ring
+        audio = np.empty(sum(item[2] for item in batch), dtype=np.float32)
+        kept = []
+        pos = 0
+        for future, start, num_frames, timestamp, clip_timestamps, beam_size, chunk_id in batch:
+            if ring.contains(start, num_frames):
+                audio[pos:pos + num_frames] = ring.view(start, num_frames)
+                # La cattura può aver scritto durante la copia: valida solo se la finestra c'è ancora
+                if ring.contains(start, num_frames):
+                    kept.append((future, chunk_id, pos, num_frames, timestamp, clip_timestamps, beam_size))
+                    pos += num_frames
+                    continue
+            self._on_chunk_overwritten(chunk_id, future)
+        return audio[:pos], kept
+
+    def _dispatch_whisper_pending(self, whisper_lang):
+        """Invia i chunk Whisper in attesa: singolo se il pool è libero, batch se è in ritardo"""
+        if not self.batch_pending or self.inflight >= self.num_workers:
+            return
+        batch = self.batch_pending[:WHISPER_BATCH_MAX_CHUNKS]
+        del self.batch_pending[:len(batch)]
+        # I job ricevono una copia: chunk in coda nel pool non dipendono da quanto resta nel ring
+        audio, batch = self._copy_pending(batch)
+        if not batch:
+            return
+        proxies = [item[0] for item in batch]
+        chunk_ids = [item[1] for item in batch]
+        for chunk_id in chunk_ids:
+            self.metrics.mark("chunk", chunk_id, "submit")
+
+        if len(batch) == 1:
+            _, _, _, _, timestamp, clip_timestamps, beam_size = batch[0]
+            if self.whisper_pool:
+                job = self.whisper_pool.submit(audio, whisper_lang, timestamp, clip_timestamps, beam_size)
+            else:
+                model = self._degrade_model() if beam_size == 1 else None
+                job = self.executor.submit(self._timed_job, len(audio) / SAMPLE_RATE, chunk_ids, self.process_chunk_whisper, audio, whisper_lang, timestamp, clip_timestamps, beam_size, model)
+        else:
+            print(f"DEBUG: Batching {len(batch)} queued chunks into one Whisper pass")
+            tracing.event("whisper.batch", chunks=len(batch))
+            beam_size = min(item[6] for item in batch)
+            if self.whisper_pool:
+                chunks = [(audio[pos:pos + n], timestamp, clip_timestamps) for _, _, pos, n, timestamp, clip_timestamps, _ in batch]
+                job = self.whisper_pool.submit_batch(chunks, whisper_lang, beam_size)
+            else:
+                chunk_specs = [(pos, n, timestamp, clip_timestamps) for _, _, pos, n, timestamp, clip_timestamps, _ in batch]
+                model = self._degrade_model() if beam_size == 1 else None
+                job = self.executor.submit(self._timed_job, len(audio) / SAMPLE_RATE, chunk_ids, self.process_batch_whisper, audio, chunk_specs, whisper_lang, beam_size, model)
+
+        self._track_job(job, chunk_ids)
+        job.add_done_callback(lambda f: self._resolve_whisper_job(f, proxies))
+
+    def _degrade_model(self):
+        """Modello più leggero per i chunk degradati; None (modello corrente) se non è già in cache.
+        Non avvia caricamenti: sotto carico non si toglie CPU ai worker"""
+        name = WHISPER_DEGRADE_MODEL
+        if not name or name == self.current_model_name or not self.model_manager.is_ready(name):
+            return None
+        return self.model_manager.get(name)
+
+    def _resolve_whisper_job(self, job, proxies):
+        """Distribuisce il risultato di un job (singolo o batch) ai future dei singoli chunk"""
+        try:
+            results = job.result()
+            per_chunk = [results] if len(proxies) == 1 else results
+            for proxy, lines in zip(proxies, per_chunk):
+                proxy.set_result(lines)
+        except Exception as e:
+            for proxy in proxies:
+                proxy.set_exception(e)
     
     def result_collector_thread(self):
-        """Raccoglie risultati dai worker e li mostra NELL'ORDINE CORRETTO"""
+        """Raccoglie i risultati appena i worker finiscono e li mostra NELL'ORDINE CORRETTO"""
         print("DEBUG: Start Result Collector Thread")
-        expected_chunk_id = 0
-        pending_results = {}  # Buffer per risultati fuori ordine
-        
-        while not self.stop_event.is_set() or not self.result_queue.empty() or len(pending_results) > 0:
-            try:
-                chunk_id, future = self.result_queue.get(timeout=0.5)
-                
-                # Attendi completamento worker (può essere già finito!)
+        completed = queue.Queue()  # (chunk_id, righe) dai done-callback dei future
+        reorder = ReorderBuffer(CHUNK_RESULT_TIMEOUT)
+        provisional = {}  # chunk_id -> turn id della riga provvisoria mostrata
+
+        while not self.dispatch_done.is_set() or not self.result_queue.empty() or reorder:
+            # 1. Registra i nuovi future: il completamento arriva via callback (nessun blocco in ordine)
+            while True:
                 try:
-                    results = future.result(timeout=45)  # Timeout 45s - aumentato per gestire carichi alti
-                except TimeoutError:
-                    print(f"WARNING: Chunk {chunk_id} timeout dopo 45s - SKIPPED")
-                    results = [f"[⚠️ CHUNK {chunk_id} TIMEOUT - Skipped]"]
-                except Exception as e:
-                    print(f"ERROR: Chunk {chunk_id} failed with: {type(e).__name__}: {e}")
-                    results = [f"[❌ CHUNK {chunk_id} ERROR: {type(e).__name__}]"]
-                
-                # Salva risultato
-                pending_results[chunk_id] = results
-                
-                # Avvisa se troppi chunk in attesa (possibile blocco)
-                if len(pending_results) > 5:
-                    print(f"WARNING: {len(pending_results)} chunks waiting (expecting #{expected_chunk_id})")
-                
-                # Mostra tutti i chunk consecutivi disponibili
-                while expected_chunk_id in pending_results:
-                    for line in pending_results[expected_chunk_id]:
-                        if line:  # Salta linee vuote
-                            self.update_ui(line)
-                    
-                    del pending_results[expected_chunk_id]
-                    expected_chunk_id += 1
-                    print(f"DEBUG: Chunk {expected_chunk_id - 1} displayed (pending: {len(pending_results)})")
-                    
+                    chunk_id, future = self.result_queue.get_nowait()
+                except queue.Empty:
+                    break
+                reorder.register(chunk_id)
+                future.add_done_callback(
+                    lambda f, cid=chunk_id: completed.put((cid, self._future_lines(cid, f)))
+                )
+
+            # 2. Sposta nel reorder buffer tutto ciò che è finito
+            try:
+                item = completed.get(timeout=0.2)
             except queue.Empty:
-                continue
-        
+                item = None
+            while item is not None:
+                chunk_id, results = item
+                if reorder.complete(chunk_id, results):  # Ignora risultati di chunk già scaduti
+                    self.metrics.mark("chunk", chunk_id, "collect", create=False)
+                    if SHOW_PROVISIONAL_RESULTS and chunk_id > reorder.expected and results:
+                        # Fuori ordine: mostra subito come riga provvisoria
+                        turn_id = self._reserve_turn_id()
+                        provisional[chunk_id] = turn_id
+                        self.update_or_add_line(f"⏳ {' '.join(results)}", is_final=False, turn_order=turn_id)
+                try:
+                    item = completed.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            # 3. Il chunk atteso è scaduto: salta (gli altri non restano bloccati per sempre)
+            expired = reorder.expire(lambda cid: [f"[⚠️ CHUNK {cid} TIMEOUT - Skipped]"])
+            if expired is not None:
+                print(f"WARNING: Chunk {expired} timeout dopo {CHUNK_RESULT_TIMEOUT}s - SKIPPED")
+
+            # Avvisa se troppi chunk in attesa (possibile blocco)
+            if len(reorder.ready) > 5:
+                print(f"WARNING: {len(reorder.ready)} chunks waiting (expecting #{reorder.expected})")
+
+            # 4. Mostra subito tutti i chunk consecutivi disponibili
+            for chunk_id, results in reorder.pop_ready():
+                if chunk_id in provisional:
+                    self.remove_line(provisional.pop(chunk_id))
+                for line in results:
+                    if line:  # Salta linee vuote
+                        # Il turno eredita le fasi del chunk (cattura -> raccolta) per le latenze end-to-end
+                        turn_id = self._reserve_turn_id()
+                        self.metrics.link("chunk", chunk_id, "turn", turn_id)
+                        self.metrics.mark("turn", turn_id, "display", create=False)
+                        self.update_or_add_line(line, True, turn_id)
+                self.metrics.mark("chunk", chunk_id, "display", create=False)
+                tracing.async_end("chunk", chunk_id, lines=len(results))
+                print(f"DEBUG: Chunk {chunk_id} displayed (pending: {len(reorder.ready)})")
+
         print("DEBUG: Result Collector finished")
 
-    def process_chunk_google(self, audio_data, lang_code, timestamp):
-        """Worker per Google Speech (thread-safe, ritorna risultati)"""
+    def _future_lines(self, chunk_id, future):
+        """Righe da mostrare per un future completato (errori inclusi)"""
         try:
-            recognizer = sr.Recognizer()
-            audio_int16 = (audio_data * 32767).astype(np.int16)
-            audio_bytes = audio_int16.tobytes()
-            audio_source = sr.AudioData(audio_bytes, SAMPLE_RATE, 2)
-
-            try:
-                text = recognizer.recognize_google(audio_source, language=lang_code)
-                return [f"[{timestamp}] {text}"]
-            except sr.UnknownValueError:
-                return []  # Nessun testo riconosciuto
-            except sr.RequestError as e:
-                print(f"Google API Error: {e}")
-                return [f"[⚠️ Google API Error - check internet connection]"]
+            return future.result()
         except Exception as e:
-            print(f"Google Worker Crash: {type(e).__name__}: {e}")
-            return [f"[❌ Google Processing Failed]"]
+            print(f"ERROR: Chunk {chunk_id} failed with: {type(e).__name__}: {e}")
+            return [f"[❌ CHUNK {chunk_id} ERROR: {type(e).__name__}]"]
+
+    def process_chunk_google(self, audio_data, lang_code, timestamp):
+        """Worker per Google Speech (thread-safe, ritorna risultati)"""
+        return google_speech.recognize_lines(audio_data, lang_code, timestamp, SAMPLE_RATE)
 
-    def process_chunk_whisper(self, audio_data, lang_code, timestamp):
-        """Worker per Whisper (thread-safe, ritorna risultati)"""
+    def process_chunk_whisper(self, audio_data, lang_code, timestamp, clip_timestamps=None, beam_size=5, model=None):
+        """Worker per Whisper (thread-safe, ritorna risultati)
+        clip_timestamps: intervalli di parlato già trovati dal VAD del dispatcher
+        model: modello alternativo (politica "degrade"), altrimenti quello corrente"""
         try:
-            if not self.model:
+            model = model or self.model
+            if not model:
                 print("WARNING: Whisper model not loaded!")
                 return [f"[⚠️ Model Not Loaded]"]
             
-            segments, _ = self.model.transcribe(audio_data, beam_size=5, language=lang_code, vad_filter=True)
-            parts = [s.text.strip() for s in segments if s.text.strip()]
-            text = " ".join(parts)
-            if text:
-                return [f"[{timestamp}] {text}"]
-            return []
+            return whisper_pool.transcribe_lines(model, audio_data, lang_code, timestamp, clip_timestamps, beam_size)
         except Exception as e:
             print(f"Whisper Worker Error: {type(e).__name__}: {e}")
             return [f"[❌ Whisper Processing Failed]"]
 
+    def whisper_streaming_thread(self, lang_code):
+        """Whisper STREAMING: ridecodifica la finestra crescente e conferma le parole stabili"""
+        print(f"DEBUG: Start Whisper Streaming Thread (step {STREAM_STEP_SECONDS}s)")
+        ring = self.audio_ring
+        agreement = LocalAgreementBuffer()
+        window_start = ring.write_pos  # Inizio finestra (campione assoluto nel ring)
+        turn_order = 0  # Come AssemblyAI: turni locali + turn_id_offset
+        turn_timestamp = None
+        last_decoded = window_start
+
+        try:
+            while not self.stop_event.is_set():
+                end = ring.write_pos
+                if end - last_decoded < SAMPLE_RATE * STREAM_STEP_SECONDS:
+                    time.sleep(0.05)
+                    continue
+                last_decoded = end
+
+                if not ring.contains(window_start, end - window_start):
+                    # Decodifica più lenta del margine del ring: l'inizio della finestra è già
+                    # stato sovrascritto. Si riparte con una finestra corta sull'audio più recente
+                    new_start = end - SAMPLE_RATE * STREAM_IDLE_TRIM_SECONDS
+                    skipped = (new_start - window_start) / SAMPLE_RATE
+                    print(f"⚠️ Whisper Streaming: decoding fell {skipped:.1f}s behind the ring buffer, skipping ahead")
+                    if agreement.committed_text():
+                        self.update_or_add_line(f"[{turn_timestamp}] {agreement.committed_text()}", is_final=True, turn_order=turn_order + self.turn_id_offset)
+                        turn_order += 1
+                    elif agreement.draft:
+                        self.remove_line(turn_order + self.turn_id_offset)  # Bozza di audio perso
+                    self.update_ui(f"⚠️ Whisper Streaming too slow: {skipped:.1f}s of audio skipped")
+                    window_start = new_start
+                    agreement = LocalAgreementBuffer()
+                    turn_timestamp = None
+
+                try:
+                    audio = ring.view(window_start, end - window_start)
+                    segments, _ = self.model.transcribe(
+                        audio, beam_size=5, language=lang_code, word_timestamps=True,
+                        condition_on_previous_text=False, vad_filter=False,
+                        initial_prompt=agreement.prompt(),
+                    )
+                    offset = window_start / SAMPLE_RATE
+                    words = [(offset + w.start, offset + w.end, w.word)
+                             for seg in segments for w in (seg.words or [])]
+                except Exception as e:
+                    print(f"Whisper Streaming Error: {type(e).__name__}: {e}")
+                    continue
+
+                if not words and not agreement.committed:
+                    # Solo silenzio: non far crescere la finestra all'infinito
+                    if end - window_start > SAMPLE_RATE * STREAM_IDLE_TRIM_SECONDS:
+                        window_start = end - SAMPLE_RATE
+                    continue
+
+                if turn_timestamp is None:
+                    turn_timestamp = self.get_timestamp()
+                agreement.insert(words)
+                window_full = end - window_start >= SAMPLE_RATE * STREAM_MAX_WINDOW_SECONDS
+                if window_full:
+                    agreement.flush()
+
+                current_turn_id = turn_order + self.turn_id_offset
+                committed = agreement.committed_text()
+                draft = agreement.draft_text()
+
+                if committed and (window_full or (not draft and agreement.ends_sentence())):
+                    # FINE TURNO: testo definitivo, la finestra riparte dall'ultima parola confermata
+                    self.update_or_add_line(f"[{turn_timestamp}] {committed}", is_final=True, turn_order=current_turn_id)
+                    window_start = max(window_start, min(end, int(agreement.committed_end * SAMPLE_RATE)))
+                    agreement.start_new_turn()
+                    turn_order += 1
+                    turn_timestamp = None
+                elif committed or draft:
+                    # BOZZA: stesso percorso dei parziali AssemblyAI
+                    self.update_or_add_line(
+                        f"[{turn_timestamp}] 🔵 {' '.join(t for t in (committed, draft) if t)}...",
+                        is_final=False,
+                        turn_order=current_turn_id
+                    )
+
+            # Fine sessione: conferma ciò che resta
+            agreement.flush()
+            if agreement.committed_text():
+                self.update_or_add_line(
+                    f"[{turn_timestamp or self.get_timestamp()}] {agreement.committed_text()}",
+                    is_final=True,
+                    turn_order=turn_order + self.turn_id_offset
+                )
+        finally:
+            self.streaming_done.set()  # Lo STOP attende l'ultimo turno
+        print("DEBUG: Whisper Streaming finished")
+
+    def process_batch_whisper(self, audio, chunk_specs, lang_code, beam_size=5, model=None):
+        """Worker batched: più chunk [(inizio, frame, timestamp, clip)] di un unico array audio
+        (copiato all'invio) in un solo passaggio encoder/decoder"""
+        try:
+            if model is not None:
+                # Politica "degrade": pipeline separata, quella del modello corrente resta valida
+                if self.degrade_pipeline is None or self.degrade_pipeline.model is not model:
+                    self.degrade_pipeline = faster_whisper.BatchedInferencePipeline(model=model)
+                pipeline = self.degrade_pipeline
+            elif not self.model:
+                print("WARNING: Whisper model not loaded!")
+                return [[f"[⚠️ Model Not Loaded]"] for _ in chunk_specs]
+            else:
+                if self.batched_pipeline is None or self.batched_pipeline.model is not self.model:
+                    self.batched_pipeline = faster_whisper.BatchedInferencePipeline(model=self.model)
+                pipeline = self.batched_pipeline
+            return whisper_pool.transcribe_batch_lines(pipeline, audio, chunk_specs, lang_code, beam_size)
+        except Exception as e:
+            print(f"Whisper Batch Worker Error: {type(e).__name__}: {e}")
+            return [[f"[❌ Whisper Processing Failed]"] for _ in chunk_specs]
+
     # ============== ASSEMBLYAI REAL-TIME STREAMING (v3 Universal) ==============
     
-    def audio_generator(self, mic):
-        """Generatore di chunk audio per AssemblyAI v3"""
+    def assemblyai_capture_thread(self, mic):
+        """Cattura AssemblyAI: frame da 50ms in PCM16 verso la coda di invio (non aspetta mai la rete)"""
+        converter = audio_buffer.Pcm16Converter()  # Buffer riutilizzati per tutta la sessione
+        numframes = int(SAMPLE_RATE * AAI_FRAME_SECONDS)
         try:
             with mic.recorder(samplerate=SAMPLE_RATE) as recorder:
                 while not self.stop_event.is_set():
-                    # Buffer MICRO: solo 0.05 secondi (50ms) per latenza minima
-                    data = recorder.record(numframes=int(SAMPLE_RATE * 0.05))
-                    
-                    # Converti in mono e PCM16
-                    mono_data = np.mean(data, axis=1)
-                    audio_int16 = (mono_data * 32767).astype(np.int16)
-                    audio_bytes = audio_int16.tobytes()
-                    
-                    yield audio_bytes
+                    data = recorder.record(numframes=numframes)
+                    captured = time.monotonic()
+                    # Mono + PCM16 con clipping, senza temporanei. Resta una sola copia
+                    # (bytes): l'SDK accoda il frame e lo invia più tardi dal suo thread
+                    frame = converter.to_bytes(data)
+
+                    # Istante di cattura di ogni frame: latenza dei turni (fine parola -> evento).
+                    # I millisecondi contano dall'inizio della sessione (non della connessione)
+                    self.stream_audio_ms += len(data) * 1000 // SAMPLE_RATE
+                    self.stream_yields.append((self.stream_audio_ms, captured))
+                    while True:
+                        try:
+                            self.send_queue.put((frame, captured, self.stream_audio_ms), timeout=1)
+                            break
+                        except queue.Full:
+                            # Rete ferma da oltre AAI_SEND_QUEUE_SECONDS: la cattura attende
+                            print(f"⚠️ AssemblyAI send queue full ({AAI_SEND_QUEUE_SECONDS}s of audio) - network stalled")
+                            if self.stop_event.is_set():
+                                break
         except Exception as e:
             print(f"Audio Generator Error: {e}")
-    
+        finally:
+            self.capture_done.set()
+
+    def audio_generator(self, replay=()):
+        """Invio ad AssemblyAI v3 per una connessione: prima l'audio da reinviare (replay), poi la
+        coda. Un frame per messaggio se la rete tiene il passo; se è in ritardo i frame in coda
+        partono uniti (fino a AAI_MAX_FRAME_SECONDS), poi si torna a 50ms.
+        Termina a cattura finita e coda vuota, o appena la connessione cade"""
+        max_merge = max(1, int(AAI_MAX_FRAME_SECONDS / AAI_FRAME_SECONDS))
+        stats = self.stream_stats
+        for audio, start_ms, end_ms in replay:
+            if self.stream_lost.is_set():
+                return
+            if self.stream_base_ms is None:
+                self.stream_base_ms = start_ms  # Tempo 0 della connessione
+            stats["replayed_ms"] = stats.get("replayed_ms", 0) + end_ms - start_ms
+            yield audio  # Resta nel buffer di replay finché un turno finale non lo copre
+
+        while True:
+            # Coda interna dell'SDK piena: i frame si accumulano nella nostra coda (e si uniscono)
+            if not self._wait_sdk_writer():
+                return
+            try:
+                first = self.send_queue.get(timeout=0.1)
+            except queue.Empty:
+                if self.stream_lost.is_set():
+                    return
+                if self.capture_done.is_set():
+                    self.stream_drained.set()  # Tutto l'audio catturato è passato all'SDK
+                    return
+                continue
+            frames = [first]
+            while len(frames) < max_merge:
+                try:
+                    frames.append(self.send_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Ritardo di invio: da quando il frame più vecchio è stato catturato
+            lag = time.monotonic() - first[1]
+            self.metrics.observe("assemblyai.send_lag", lag)
+            stats["messages"] = stats.get("messages", 0) + 1
+            stats["frames"] = stats.get("frames", 0) + len(frames)
+            stats["max_merge"] = max(stats.get("max_merge", 1), len(frames))
+            tracing.counter("assemblyai.send", backlog=self.send_queue.qsize(), merged=len(frames), lag_ms=round(lag * 1000))
+            audio = b"".join(frame for frame, _, _ in frames)
+            end_ms = frames[-1][2]
+            start_ms = end_ms - len(audio) * 1000 // (2 * SAMPLE_RATE)
+            if self.stream_base_ms is None:
+                self.stream_base_ms = start_ms
+            self._remember_sent(audio, start_ms, end_ms)
+            yield audio
+
+    def _wait_sdk_writer(self):
+        """Attende che la coda interna dell'SDK scenda sotto AAI_MAX_PENDING_SENDS.
+        False se la connessione è caduta o non invia più nulla da AAI_STALL_SECONDS"""
+        last_pending, since = None, time.monotonic()
+        while not self.stream_lost.is_set():
+            pending = self._sdk_pending()
+            if pending <= AAI_MAX_PENDING_SENDS or self.assemblyai_transcriber is None:
+                return True
+            if pending != last_pending:
+                last_pending, since = pending, time.monotonic()
+            elif time.monotonic() - since > AAI_STALL_SECONDS:
+                # Socket morto senza errore (es. Wi-Fi sparito): si riconnette senza aspettare il keepalive
+                print(f"⚠️ AssemblyAI: nothing sent for {AAI_STALL_SECONDS}s - treating connection as lost")
+                self.stream_lost.set()
+                break
+            time.sleep(0.01)
+        return False
+
+    def _remember_sent(self, audio, start_ms, end_ms):
+        """Ultimi AAI_REPLAY_SECONDS di audio passati all'SDK, da reinviare se la connessione cade"""
+        self.replay_buffer.append((audio, start_ms, end_ms))
+        while self.replay_buffer and end_ms - self.replay_buffer[0][2] >= AAI_REPLAY_SECONDS * 1000:
+            self.replay_buffer.popleft()
+
+    def _replay_audio(self):
+        """Audio inviato ma non ancora confermato da un turno finale: riparte con la nuova connessione"""
+        replay = []
+        for audio, start_ms, end_ms in self.replay_buffer:
+            if end_ms <= self.stream_final_ms:
+                continue  # Già trascritto in un turno finale
+            if start_ms < self.stream_final_ms:
+                cut = (self.stream_final_ms - start_ms) * SAMPLE_RATE // 1000
+                audio = audio[cut * 2:]
+                start_ms = self.stream_final_ms
+            replay.append((audio, start_ms, end_ms))
+        return replay
+
+    def _sdk_pending(self):
+        """Messaggi in attesa nella coda interna dell'SDK (0 se questa versione non la espone)"""
+        write_queue = getattr(self.assemblyai_transcriber, "_write_queue", None)
+        try:
+            return write_queue.qsize() if write_queue is not None else 0
+        except Exception:
+            return 0
+
+    def _connect_assemblyai(self, lang_code):
+        """Nuovo client v3 connesso, con le callback registrate"""
+        # Crea client con nuova API v3
+        client = aai_streaming.StreamingClient(
+            aai_streaming.StreamingClientOptions(
+                api_key=self.ASSEMBLYAI_API_KEY,
+                api_host="streaming.assemblyai.com"
+            )
+        )
+
+        # Registra callback
+        client.on(aai_streaming.StreamingEvents.Begin, self.on_assemblyai_begin)
+        client.on(aai_streaming.StreamingEvents.Turn, self.on_assemblyai_turn)
+        client.on(aai_streaming.StreamingEvents.Termination, self.on_assemblyai_terminated)
+        client.on(aai_streaming.StreamingEvents.Error, self.on_assemblyai_error)
+
+        # Configura parametri (usa modello corretto!)
+        # "universal-streaming-english" = solo inglese
+        # "universal-streaming-multi" = multilingua (EN, PT, ES, FR, DE, IT)
+        speech_model = "universal-streaming-multi" if lang_code == "pt" else "universal-streaming-english"
+
+        params = aai_streaming.StreamingParameters(
+            sample_rate=SAMPLE_RATE,
+            format_turns=True,  # Formattazione automatica (punteggiatura)
+            speech_model=speech_model,
+            end_utterance_silence_threshold=300,  # Ridotto a 300ms (default 700ms)
+            # Altri parametri per massima reattività:
+            # - Rileva fine frase più velocemente
+            # - Mostra parole più rapidamente
+        )
+        client.connect(params)
+        return client
+
+    def _disconnect_assemblyai(self, terminate):
+        client, self.assemblyai_transcriber = self.assemblyai_transcriber, None
+        if client:
+            try:
+                client.disconnect(terminate=terminate)
+            except Exception:
+                pass
+
     def record_audio_assemblyai_thread(self, mic, lang_code):
-        """Streaming REAL-TIME con AssemblyAI v3 (latenza 300-500ms!)"""
+        """Streaming REAL-TIME con AssemblyAI v3 (latenza 300-500ms!).
+        Supervisore: la cattura continua per tutta la sessione; se la connessione cade si
+        riconnette con backoff esponenziale e reinvia l'audio non ancora trascritto"""
         print(f"DEBUG: Start AssemblyAI Universal Streaming (Language: {lang_code})")
-        
+
+        # Stato della sessione (sopravvive alle riconnessioni)
+        self.stream_audio_ms = 0
+        self.stream_yields.clear()
+        self.send_queue = BoundedPipelineQueue(int(AAI_SEND_QUEUE_SECONDS / AAI_FRAME_SECONDS), "block")
+        self.replay_buffer.clear()
+        self.stream_final_ms = 0
+        self.stream_stats = {}
+        self.capture_done.clear()
+        self.stream_drained.clear()
+        failures = 0
+        t_capture = None
+
         try:
-            # Crea client con nuova API v3
-            client = StreamingClient(
-                StreamingClientOptions(
-                    api_key=self.ASSEMBLYAI_API_KEY,
-                    api_host="streaming.assemblyai.com"
-                )
-            )
-            
-            # Registra callback
-            client.on(StreamingEvents.Begin, self.on_assemblyai_begin)
-            client.on(StreamingEvents.Turn, self.on_assemblyai_turn)
-            client.on(StreamingEvents.Termination, self.on_assemblyai_terminated)
-            client.on(StreamingEvents.Error, self.on_assemblyai_error)
-            
-            self.assemblyai_transcriber = client
-            
-            # Configura parametri (usa modello corretto!)
-            # "universal-streaming-english" = solo inglese
-            # "universal-streaming-multi" = multilingua (EN, PT, ES, FR, DE, IT)
-            speech_model = "universal-streaming-multi" if lang_code == "pt" else "universal-streaming-english"
-            
-            params = StreamingParameters(
-                sample_rate=SAMPLE_RATE,
-                format_turns=True,  # Formattazione automatica (punteggiatura)
-                speech_model=speech_model,
-                end_utterance_silence_threshold=300,  # Ridotto a 300ms (default 700ms)
-                # Altri parametri per massima reattività:
-                # - Rileva fine frase più velocemente
-                # - Mostra parole più rapidamente
-            )
-            
-            # Connetti
-            client.connect(params)
-            
-            # Crea generatore audio e avvia streaming
-            # Il metodo .stream() gestisce automaticamente l'invio dei chunk
-            audio_stream = self.audio_generator(mic)
-            client.stream(audio_stream)
-                        
+            while not self.stop_event.is_set():
+                try:
+                    self.stream_lost.clear()
+                    self.assemblyai_transcriber = self._connect_assemblyai(lang_code)
+                except Exception as e:
+                    if t_capture is None:
+                        raise  # Prima connessione: chiave, rete o parametri sbagliati
+                    error = e
+                else:
+                    if t_capture is None:
+                        # Cattura in un thread dedicato; .stream() consuma il generatore di invio
+                        t_capture = threading.Thread(target=self.assemblyai_capture_thread, args=(mic,), daemon=True, name="AssemblyAICapture")
+                        t_capture.start()
+                    else:
+                        self._rebase_turn_ids()
+                    # I tempi delle parole ripartono da 0 a ogni connessione: base = primo audio inviato
+                    self.stream_base_ms = None
+                    replay = self._replay_audio()
+                    if failures:
+                        replay_seconds = sum(end - start for _, start, end in replay) / 1000
+                        print(f"DEBUG: AssemblyAI reconnected, resending {replay_seconds:.1f}s of audio")
+                        self.update_ui(f"🟢 AssemblyAI reconnected - resending {replay_seconds:.1f}s of audio")
+                    connected_at = time.monotonic()
+                    self.assemblyai_transcriber.stream(self.audio_generator(replay))
+                    if self.stream_drained.is_set():
+                        break  # Fine sessione: tutto l'audio è passato all'SDK
+                    error = "connection lost"
+                    if time.monotonic() - connected_at >= AAI_STABLE_SECONDS:
+                        failures = 0  # Connessione rimasta su a lungo: il backoff riparte da capo
+                    self.stream_stats["reconnects"] = self.stream_stats.get("reconnects", 0) + 1
+
+                self._disconnect_assemblyai(terminate=False)
+                self._drop_partial_turn()  # Il replay lo ritrascrive nella nuova connessione
+                if self.stop_event.is_set():
+                    break
+                failures += 1
+                if failures > AAI_RECONNECT_ATTEMPTS:
+                    raise RuntimeError(f"{error} ({AAI_RECONNECT_ATTEMPTS} reconnect attempts failed)")
+                delay = min(AAI_RECONNECT_MAX_DELAY, AAI_RECONNECT_BASE_DELAY * 2 ** (failures - 1))
+                delay *= random.uniform(0.5, 1.0)  # Jitter: niente riconnessioni sincronizzate
+                print(f"AssemblyAI: {error} - reconnecting in {delay:.1f}s (attempt {failures}/{AAI_RECONNECT_ATTEMPTS})")
+                self.update_ui(f"⚠️ AssemblyAI connection lost - reconnecting (attempt {failures}/{AAI_RECONNECT_ATTEMPTS})...")
+                tracing.event("assemblyai.reconnect", attempt=failures, delay_ms=round(delay * 1000))
+                self.stop_event.wait(delay)
+
         except Exception as e:
             print(f"AssemblyAI Fatal Error: {e}")
             self.update_ui(f"❌ AssemblyAI Error: {e}")
         finally:
-            if self.assemblyai_transcriber:
-                try:
-                    self.assemblyai_transcriber.disconnect(terminate=True)
-                except:
-                    pass
+            self.stream_drained.set()  # Streaming finito (anche per errore): lo STOP non attende
+            self._disconnect_assemblyai(terminate=True)
+
+    def _rebase_turn_ids(self):
+        """Nuova connessione: turn_order riparte da 0, l'offset va oltre ogni ID già usato"""
+        with self.turn_id_lock:
+            used = max(self.turn_text_map, default=0)
+            next_id = max(used, self.last_reserved_turn_id, self.last_turn_order) + 1
+            self.turn_id_offset = max(self.turn_id_offset, next_id)
+
+    def _drop_partial_turn(self):
+        """Rimuove la riga parziale del turno rimasto aperto sulla connessione caduta"""
+        turn_id, self.stream_partial_turn = self.stream_partial_turn, None
+        if turn_id is not None:
+            self.remove_line(turn_id)
 
-    def on_assemblyai_begin(self, client, event: BeginEvent):
+    def on_assemblyai_begin(self, client, event: aai_streaming.BeginEvent):
         """Callback: connessione aperta"""
         print(f"AssemblyAI: Connected! Session: {event.id}")
         self.update_ui("🟢 AssemblyAI Universal Streaming Connected - Start speaking!")
 
-    def on_assemblyai_terminated(self, client, event: TerminationEvent):
+    def on_assemblyai_terminated(self, client, event: aai_streaming.TerminationEvent):
         """Callback: connessione chiusa"""
         print(f"AssemblyAI: Disconnected (processed {event.audio_duration_seconds:.1f}s)")
         self.update_ui("🔴 AssemblyAI Disconnected")
+        if client is self.assemblyai_transcriber and not self.stream_drained.is_set():
+            self.stream_lost.set()  # Chiusa dal server a metà sessione: il supervisore riconnette
 
     
-    def on_assemblyai_turn(self, client, event: TurnEvent):
+    def on_assemblyai_turn(self, client, event: aai_streaming.TurnEvent):
         """Callback: risultati REAL-TIME (parziali e finali)"""
+        if client is not self.assemblyai_transcriber:
+            return  # Evento tardivo di una connessione già chiusa
         timestamp = self.get_timestamp()
         
         # Usa l'offset di sessione per garantire ordine cronologico globale
         # AssemblyAI riparte da 0 a ogni connessione, noi aggiungiamo l'offset
         current_turn_id = event.turn_order + self.turn_id_offset
+        self.last_turn_order = max(self.last_turn_order, current_turn_id)
+        tracing.event("assemblyai.turn", turn=current_turn_id, final=bool(event.end_of_turn))
+        end_ms = self._stream_end_ms(event)
+        sent_at = self._stream_sent_at(end_ms)
+        if sent_at is not None:
+            kind = "final" if event.end_of_turn else "partial"
+            self.metrics.observe(f"assemblyai.{kind}_latency", time.monotonic() - sent_at)
+            if event.end_of_turn and event.transcript:
+                self.metrics.mark("turn", current_turn_id, "capture", t=sent_at)
         
         if event.end_of_turn:
             # FINE FRASE
+            self.stream_partial_turn = None
+            if end_ms is not None:
+                self.stream_final_ms = max(self.stream_final_ms, end_ms)  # Non va reinviato
             if event.transcript:
                 self.update_or_add_line(
                     f"[{timestamp}] {event.transcript}", 
@@ -400,161 +982,147 @@ class TranscriberApp:
             if hasattr(event, 'words') and event.words:
                 all_words_text = " ".join([w.text for w in event.words])
                 if all_words_text:
+                    self.stream_partial_turn = current_turn_id
                     self.update_or_add_line(
                         f"[{timestamp}] 🔵 {all_words_text}...", 
                         is_final=False, 
                         turn_order=current_turn_id
                     )
 
+    def _stream_end_ms(self, event):
+        """Fine dell'ultima parola del turno in ms dall'inizio della sessione (None se ignota)"""
+        words = getattr(event, "words", None)
+        end_ms = getattr(words[-1], "end", None) if words else None
+        if end_ms is None or self.stream_base_ms is None:
+            return None
+        return self.stream_base_ms + end_ms
+
+    def _stream_sent_at(self, end_ms):
+        """Istante in cui è stato catturato l'audio che finisce a end_ms (None se ignoto)"""
+        if end_ms is None or not self.stream_yields:
+            return None
+        yields = list(self.stream_yields)
+        idx = bisect.bisect_left(yields, (end_ms, 0.0))
+        if idx >= len(yields):
+            return None
+        return yields[idx][1]
+
     def update_or_add_line(self, text, is_final, turn_order):
-        """Aggiorna il testo UNICO ricostruendolo dalla mappa (garantisce ordine e unicità)"""
+        """Aggiorna il testo del turno nella mappa e lo segna per il prossimo flush della UI"""
         # FIX: Scrive su file se è una trascrizione finale (AssemblyAI bypassava update_ui)
         if is_final:
             self.log_to_file(text)
+            self.metrics.mark("turn", turn_order, "final", create=False)
 
-        if self.page and self.full_log_text:
+        if self.page and self.coalescer:
             try:
-                async def _do_update():
-                    # #region agent log
-                    try:
-                        with open(r"c:\Users\Antonio Nuzzi\ontheflow\.cursor\debug.log", "a") as f: 
-                            f.write(json.dumps({"sessionId": "debug-session", "timestamp": int(time.time()*1000), "location": "gui_transcriber.py:update_or_add_line", "message": "Start UI Update", "data": {"turn_order": turn_order, "text_len": len(text), "is_final": is_final}}) + "\n")
-                    except: pass
-                    # #endregion
-                    
-                    # 1. Aggiorna la mappa dei testi
-                    self.turn_text_map[turn_order] = text
-                    
-                    # Se è finale, traduci
-                    if is_final and turn_order not in self.translated_text_map:
-                         # Esegui traduzione in thread separato per non bloccare UI
-                        def translate_worker():
-                            # Pulisci il testo da timestamp e log prima di tradurre
-                            clean_text = text
-                            if "]" in text:
-                                try:
-                                    clean_text = text.split("]", 1)[1].strip()
-                                except:
-                                    pass
-                            
-                            # Ignora messaggi di sistema
-                            if clean_text.startswith(">>>") or clean_text.startswith("---") or clean_text.startswith("ERROR") or clean_text.startswith("⚠️"):
-                                translation = text # Copia i messaggi di sistema così come sono
-                            else:
-                                translation = self.translate_text(clean_text)
-                                # Aggiungi timestamp se presente nell'originale
-                                if "]" in text:
-                                    timestamp_part = text.split("]", 1)[0] + "]"
-                                    translation = f"{timestamp_part} {translation}"
-                            
-                            self.translated_text_map[turn_order] = translation
-                            self.trigger_ui_refresh() # Ridisegna UI dopo traduzione
-                            
-                        threading.Thread(target=translate_worker, daemon=True).start()
-
-                    self.trigger_ui_refresh() # Ridisegna UI immediato (trascrizione)
-
-                self.page.run_task(_do_update)
+                tracing.event("ui.update", turn=turn_order, text_len=len(text), final=is_final)
+
+                # 1. Aggiorna la mappa dei testi (un parziale più recente sostituisce il precedente)
+                self.turn_text_map[turn_order] = text
+                
+                # Se è finale, traduci (pool del servizio: non blocca UI, messaggi di sistema copiati)
+                if is_final and turn_order not in self.translated_text_map:
+                    def _on_translated(translation):
+                        self.metrics.mark("turn", turn_order, "translate", create=False)
+                        self.translated_text_map[turn_order] = translation
+                        self.coalescer.mark(turn_order) # Aggiorna la riga dopo traduzione
+
+                    self.translator.translate_line(text, _on_translated)
+
+                self.coalescer.mark(turn_order) # Ridisegnata al prossimo flush
             except Exception as e:
                 print(f"UI Update Error: {e}")
 
-    def trigger_ui_refresh(self):
-        """Ricostruisce e aggiorna entrambe le colonne di testo"""
+    def _flush_ui(self, turn_ids):
+        """Callback del coalescer: un solo task sulla pagina per tutti i turni cambiati"""
+        async def _do_flush():
+            self.trigger_ui_refresh(turn_ids)
+        return self.page.run_task(_do_flush)
+
+    def trigger_ui_refresh(self, turn_ids):
+        """Aggiorna solo le righe dei turni cambiati in entrambe le colonne"""
+        with tracing.span("ui.flush", turns=len(turn_ids)):
+            self._refresh_turns(turn_ids)
+
+    def _refresh_turns(self, turn_ids):
         try:
-             # 2. Ricostruisci TUTTO il testo
-            sorted_keys = sorted(self.turn_text_map.keys())
-            
-            # Ottimizzazione
-            if len(sorted_keys) > 500:
-                keys_to_remove = sorted_keys[:-500]
-                for k in keys_to_remove:
-                    if k in self.turn_text_map: del self.turn_text_map[k]
-                    if k in self.translated_text_map: del self.translated_text_map[k]
-                sorted_keys = sorted_keys[-500:]
-            
-            # Costruisci stringa unica TRASCRIZIONE
-            full_content = "\n".join([self.turn_text_map[k] for k in sorted_keys])
-            self.full_log_text.value = full_content
-            self.full_log_text.update()
+            for turn_order in sorted(turn_ids):
+                text = self.turn_text_map.get(turn_order)
+                translation = self.translated_text_map.get(turn_order)
+                if text is None and translation is None:
+                    self.renderer.remove(turn_order)  # Turno rimosso (es. riga provvisoria)
+                else:
+                    # None = invariato (es. traduzione arrivata per un turno già fuori cache)
+                    self.renderer.render(turn_order, text, translation)
+                    if self.metrics.has("turn", turn_order, "final"):
+                        self.metrics.mark("turn", turn_order, "render")
 
-            # Costruisci stringa unica TRADUZIONE
-            # Usa stringa vuota se la traduzione non è ancora pronta
-            full_translation = "\n".join([self.translated_text_map.get(k, "") for k in sorted_keys])
-            self.full_translation_text.value = full_translation
-            self.full_translation_text.update()
+            # Le mappe sono solo una cache dei turni recenti: lo storico resta nello store
+            if len(self.turn_text_map) > TURN_CACHE_SIZE + 100:
+                for k in sorted(self.turn_text_map)[:-TURN_CACHE_SIZE]:
+                    self.turn_text_map.pop(k, None)
+                    self.translated_text_map.pop(k, None)
 
-            # 4. Scroll automatico: Strategia "Mano Invisibile" (Stacca e Riattacca)
-            self._scroll_column(self.log_scroll_column, self.scroll_anchor)
-            self._scroll_column(self.translation_scroll_column, self.translation_scroll_anchor)
+            # Scroll automatico in fondo (solo se l'utente non sta rileggendo lo storico)
+            self.renderer.scroll_to_end()
+            self.page.run_task(self._force_scroll_delayed)
 
         except Exception as e:
             print(f"Trigger UI Refresh Error: {e}")
 
-    def _scroll_column(self, column, anchor):
-        """Helper per gestire lo scroll automatico di una colonna"""
-        if column and anchor:
-            try:
-                # Rimuovi e riaggiungi l'ancora per forzare il layout a vederla "nuova" in fondo
-                if anchor in column.controls:
-                    column.controls.remove(anchor)
-                column.controls.append(anchor)
-                column.update() # Ridisegna la colonna
-                
-                # Scroll immediato verso l'ancora
-                column.scroll_to(key=anchor.key, duration=10)
-                
-                # Scroll ritardato di sicurezza
-                async def force_scroll_delayed():
-                    await asyncio.sleep(0.1) 
-                    if column:
-                        column.scroll_to(key=anchor.key, duration=10)
-                
-                self.page.run_task(force_scroll_delayed)
-            except Exception as e:
-                print(f"Scroll Helper Error: {e}")
+    async def _force_scroll_delayed(self):
+        """Scroll ritardato di sicurezza (il layout delle nuove righe arriva dopo)"""
+        await asyncio.sleep(0.1)
+        self.renderer.scroll_to_end()
 
     def update_ui(self, text):
         """Fallback per messaggi di sistema: usa ID sequenziale per apparire SOPRA le trascrizioni"""
         # self.log_to_file(text) -> Spostato in update_or_add_line per supportare anche AssemblyAI
-        
+        self.update_or_add_line(text, True, self._reserve_turn_id())
+
+    def _reserve_turn_id(self):
+        """Prossimo ID sequenziale (max + 1) per una nuova riga in fondo"""
         # Calcola ID sequenziale corretto (max + 1) per garantire ordine cronologico
         # Questo fa sì che i messaggi di sistema appaiano SOPRA le trascrizioni future
-        next_id = 0
-        if self.turn_text_map:
-            next_id = max(self.turn_text_map.keys()) + 1
-        else:
-            # Se siamo all'inizio, usa un valore base
-            next_id = 1
-            
-        # Assicurati che l'offset per le trascrizioni future sia maggiore di questo ID
-        # Le trascrizioni useranno (turn_order + turn_id_offset), quindi:
-        if self.turn_id_offset <= next_id:
-            self.turn_id_offset = next_id + 10
-            
-        self.update_or_add_line(text, True, next_id)
+        with self.turn_id_lock:
+            next_id = 0
+            if self.turn_text_map:
+                next_id = max(self.turn_text_map.keys()) + 1
+            else:
+                # Se siamo all'inizio, usa un valore base
+                next_id = 1
+            # La mappa si aggiorna in modo asincrono: non riusare un ID appena riservato
+            next_id = max(next_id, self.last_reserved_turn_id + 1)
+            self.last_reserved_turn_id = next_id
+
+            # Assicurati che l'offset per le trascrizioni future sia maggiore di questo ID
+            # Le trascrizioni useranno (turn_order + turn_id_offset), quindi:
+            if self.turn_id_offset <= next_id:
+                self.turn_id_offset = next_id + 10
+            return next_id
 
-    def on_assemblyai_error(self, client, error: StreamingError):
+    def remove_line(self, turn_order):
+        """Rimuove una riga (es. risultato provvisorio sostituito da quello definitivo)"""
+        self.turn_text_map.pop(turn_order, None)
+        self.translated_text_map.pop(turn_order, None)
+        if self.coalescer:
+            self.coalescer.mark(turn_order)
+
+    def on_assemblyai_error(self, client, error: aai_streaming.StreamingError):
         """Callback: errori"""
         error_msg = str(error)
         print(f"AssemblyAI Error: {error_msg}")
+        if client is self.assemblyai_transcriber:
+            self.stream_lost.set()  # Dopo un errore l'SDK chiude la connessione: il supervisore riconnette
         # Non mostrare errori "Model deprecated" ripetuti (già gestiti)
         if "deprecated" not in error_msg.lower():
             self.update_ui(f"⚠️ AssemblyAI Error: {error_msg}")
 
     def _get_microphone(self, device_name):
-        """Helper per ottenere microfono"""
+        """Sorgente audio per nome: device soundcard, "file:..." o "synth:..." (audio_sources)"""
         try:
-            mics = sc.all_microphones(include_loopback=True)
-            for m in mics:
-                if m.name == device_name:
-                    return m
-            for m in mics:
-                if device_name in m.name:
-                    return m
-            default = sc.default_speaker()
-            for m in mics:
-                if m.isloopback and m.id == default.id:
-                    return m
+            return audio_sources.open_source(device_name)
         except Exception as e:
             print(f"Error getting microphone: {e}")
         return None
@@ -565,19 +1133,20 @@ class TranscriberApp:
         if self.is_recording: return
         
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.log_file = os.path.join(self.get_log_dir(), f"transcript_{ts}.txt")
+        self._open_log(os.path.join(self.get_log_dir(), f"transcript_{ts}.txt"))
+        self.metrics.reset()  # Latenze della nuova sessione
         
         if lang == "Português":
             l_google = "pt-BR"
             l_whisper = "pt"
             l_assemblyai = "pt"  # AssemblyAI language code
-            w_model = "tiny"  # Soluzione Ibrida: tiny model per velocità
+            w_model = WHISPER_MODELS[lang]  # Soluzione Ibrida: tiny model per velocità
             w_buffer = 10  # Compromesso: 10s per bilanciare velocità e accuracy
         else:
             l_google = "en-US"
             l_whisper = "en"
             l_assemblyai = "en"  # AssemblyAI language code
-            w_model = "small.en"
+            w_model = WHISPER_MODELS["English"]
             w_buffer = 4
 
         # ========== ASSEMBLYAI REAL-TIME ==========
@@ -604,71 +1173,100 @@ class TranscriberApp:
             return
         
         # ========== WHISPER / GOOGLE (codice originale) ==========
-        if "Whisper" in engine:
+        use_process_pool = "Whisper" in engine and "Streaming" not in engine and WHISPER_BACKEND == "process"
+        if "Whisper" in engine and not use_process_pool:
             if self.current_model_name != w_model:
-                self.update_ui(f"Loading Whisper Model ({w_model})... Please wait.")
+                # Di solito il modello è già in cache (preload): si attende solo se ancora in caricamento
+                wait_needed = not self.model_manager.is_ready(w_model)
+                if wait_needed:
+                    self.update_ui(f"Loading Whisper Model ({w_model})... Please wait.")
                 try:
-                    self.model = WhisperModel(w_model, device=DEVICE_TYPE, compute_type=COMPUTE_TYPE)
+                    self.model = self.model_manager.get(w_model)
                     self.current_model_name = w_model
-                    self.update_ui("Model Loaded.")
+                    if wait_needed:
+                        self.update_ui("Model Loaded.")
                 except Exception as e:
                     self.update_ui(f"Error loading model: {e}")
                     return
+            if "Streaming" in engine:
+                return self._start_whisper_streaming(lang, l_whisper, device_name)
             current_buffer = w_buffer
             mode = "whisper"
-            # Whisper: 8 worker paralleli per CPU multi-core (auto-scaling per evitare colli di bottiglia)
-            num_workers = 8
+            # Whisper: si parte da pochi worker, l'autoscaler li adatta a hardware e carico
+            num_workers, min_workers, max_workers = WHISPER_WORKERS
+        elif use_process_pool:
+            current_buffer = w_buffer
+            mode = "whisper"
+            # Un processo (e un modello) ogni WHISPER_PROCESS_THREADS core (dimensione fissa)
+            num_workers = max(1, CPU_COUNT // WHISPER_PROCESS_THREADS)
+            min_workers = max_workers = num_workers
         else:
             current_buffer = 10 
             mode = "google"
-            # Google: 4 worker per gestire rate limiting API
-            num_workers = 4
-
-        target_mic = None
-        try:
-            mics = sc.all_microphones(include_loopback=True)
-            for m in mics:
-                if m.name == device_name:
-                    target_mic = m; break
-            if not target_mic:
-                for m in mics:
-                    if device_name in m.name:
-                        target_mic = m; break
-            if not target_mic:
-                default = sc.default_speaker()
-                for m in mics:
-                    if m.isloopback and m.id == default.id:
-                        target_mic = m; break
-        except:
-            pass
+            # Google: worker per gestire rate limiting API
+            num_workers, min_workers, max_workers = GOOGLE_WORKERS
 
+        target_mic = self._get_microphone(device_name)
         if not target_mic:
             self.update_ui("ERROR: Audio device not found! Try selecting another one.")
             return
 
         self.update_ui(f"--- STARTED ({mode.upper()} - {lang} - {target_mic.name}) ---")
-        self.update_ui(f">>> Parallel Processing: {num_workers} workers")
-        
+        autoscale = AUTOSCALE_WORKERS and not use_process_pool
+        if autoscale:
+            self.update_ui(f">>> Parallel Processing: {num_workers} workers (auto-scaling {min_workers}-{max_workers})")
+        else:
+            self.update_ui(f">>> Parallel Processing: {num_workers} workers")
+
+        self.start_pipeline(
+            target_mic, mode, l_google, l_whisper, current_buffer,
+            (num_workers, min_workers, max_workers), autoscale,
+            process_pool_model=w_model if use_process_pool else None,
+        )
+
+    def start_pipeline(self, mic, mode, lang_code, whisper_lang, buffer_seconds, workers, autoscale,
+                       process_pool_model=None):
+        """Avvia cattura, dispatcher e collector a chunk (usato anche da benchmark.py con un recorder finto).
+        Ritorna i tre thread"""
+        num_workers, min_workers, max_workers = workers
+
         # Reset queues e contatori
-        while not self.audio_queue.empty():
-            self.audio_queue.get()
-        while not self.result_queue.empty():
-            self.result_queue.get()
+        self.audio_queue.clear()
+        self.result_queue.clear()
         self.chunk_counter = 0
+        self.chunks_overwritten = 0
+        self.capture_stalls = 0
+        self.num_workers = num_workers
+        self.inflight = 0
+        self.batch_pending = []
+        self.capture_done.clear()
+        self.dispatch_done.clear()
+        # Ring buffer preallocato, dimensionato sul backlog massimo di chunk lunghi
+        self.audio_ring = audio_buffer.AudioRingBuffer(int(SAMPLE_RATE * buffer_seconds * CHUNK_MAX_FACTOR * RING_BUFFER_CHUNKS))
 
         # Crea pool di worker paralleli
-        self.executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="TranscribeWorker")
+        if process_pool_model:
+            self.update_ui(f">>> Whisper process pool: {num_workers} processes x {WHISPER_PROCESS_THREADS} threads ({process_pool_model})")
+            self.whisper_pool = whisper_pool.WhisperProcessPool(process_pool_model, num_workers, WHISPER_PROCESS_THREADS, DEVICE_TYPE, COMPUTE_TYPE)
+        else:
+            self.executor = ResizableThreadPool(num_workers, thread_name_prefix="TranscribeWorker")
+            if autoscale:
+                self.autoscaler = WorkerAutoscaler(
+                    self._apply_num_workers, min_workers, max_workers,
+                    queue_depth=lambda: self.audio_queue.qsize() + len(self.batch_pending),
+                )
+                self.autoscaler.start(num_workers)
 
         self.stop_event.clear()
         self.is_recording = True
         
         # Thread 1: Recording (cattura audio)
-        t_rec = threading.Thread(target=self.record_audio_thread, args=(target_mic, current_buffer))
+        t_rec = threading.Thread(target=self.record_audio_thread, args=(mic, buffer_seconds))
         t_rec.daemon = True
         t_rec.start()
         
         # Thread 2: Dispatcher (distribuisce ai worker)
-        t_disp = threading.Thread(target=self.dispatcher_thread, args=(mode, l_google, l_whisper, current_buffer))
+        t_disp = threading.Thread(target=self.dispatcher_thread, args=(mode, lang_code, whisper_lang, buffer_seconds))
         t_disp.daemon = True
         t_disp.start()
         
@@ -676,14 +1274,69 @@ class TranscriberApp:
         t_collect = threading.Thread(target=self.result_collector_thread)
         t_collect.daemon = True
         t_collect.start()
+        return [t_rec, t_disp, t_collect]
+
+    def preload_engine(self, engine):
+        """Importa in background i moduli del motore selezionato"""
+        if "AssemblyAI" in engine:
+            preload(np, sc, aai_streaming)
+        elif "Whisper" in engine:
+            preload(np, sc, faster_whisper, audio_buffer, vad, whisper_pool)
+        else:
+            preload(np, sc, sr, audio_buffer, vad, google_speech)
+
+    def select_whisper_model(self, lang):
+        """Prepara in background il modello della lingua scelta e lo rende attivo (swap senza attese)"""
+        w_model = WHISPER_MODELS.get(lang, WHISPER_MODELS["English"])
+
+        def _swap(name, model):
+            # Niente swap durante una sessione: il modello attivo resta quello in uso
+            if not self.is_recording:
+                self.model = model
+                self.current_model_name = name
+                print(f"DEBUG: Active Whisper model -> {name}")
+
+        self.model_manager.activate(w_model, _swap)
+
+    def _start_whisper_streaming(self, lang, l_whisper, device_name):
+        """Avvia Whisper in modalità streaming (cattura nel ring + thread di decodifica)"""
+        target_mic = self._get_microphone(device_name)
+        if not target_mic:
+            self.update_ui("ERROR: Audio device not found! Try selecting another one.")
+            return
+
+        self.update_ui(f"--- STARTED (WHISPER STREAMING - {lang} - {target_mic.name}) ---")
+        self.update_ui(f">>> Sliding window: re-decode every {STREAM_STEP_SECONDS}s, stable words are committed")
+
+        self.audio_ring = audio_buffer.AudioRingBuffer(SAMPLE_RATE * STREAM_MAX_WINDOW_SECONDS * 2)
+        self.stop_event.clear()
+        self.streaming_done.clear()
+        self.is_recording = True
+
+        t_rec = threading.Thread(target=self.record_audio_thread, args=(target_mic, None))
+        t_rec.daemon = True
+        t_rec.start()
+
+        t_stream = threading.Thread(target=self.whisper_streaming_thread, args=(l_whisper,))
+        t_stream.daemon = True
+        t_stream.start()
 
     def stop_transcription(self):
         if not self.is_recording: return
         self.stop_event.set()
         self.is_recording = False
+        # L'ultimo chunk (flush della cattura) deve arrivare al pool prima di chiuderlo
+        if self.executor or self.whisper_pool:
+            self.dispatch_done.wait(timeout=CHUNK_RESULT_TIMEOUT)
+        # Streaming Whisper: il turno finale (flush) va mostrato prima di "STOPPED"
+        if not self.streaming_done.wait(timeout=CHUNK_RESULT_TIMEOUT):
+            print("WARNING: Whisper streaming thread did not finish in time")
         
         # Chiudi AssemblyAI se attivo (v3 usa disconnect)
         if self.assemblyai_transcriber:
+            # Prima l'audio ancora in coda (rete in ritardo), poi la chiusura
+            if not self.stream_drained.wait(timeout=AAI_DRAIN_TIMEOUT):
+                print(f"WARNING: AssemblyAI send queue not drained in {AAI_DRAIN_TIMEOUT}s ({self.send_queue.qsize()} frames left)")
             try:
                 self.assemblyai_transcriber.disconnect(terminate=True)
                 print("DEBUG: AssemblyAI transcriber disconnected")
@@ -693,11 +1346,83 @@ class TranscriberApp:
                 self.assemblyai_transcriber = None
         
         # Chiudi pool di worker
+        if self.autoscaler:
+            self.autoscaler.stop()
+            if self.autoscaler.decisions:
+                self.update_ui(f">>> Auto-scaling: {len(self.autoscaler.decisions)} decisions, final {self.num_workers} workers")
+            self.autoscaler = None
         if self.executor:
             self.executor.shutdown(wait=True, cancel_futures=False)
             self.executor = None
+        if self.whisper_pool:
+            self.whisper_pool.shutdown(wait=True, cancel_futures=False)
+            self.whisper_pool = None
+
+        print(f"DEBUG: Translation stats ({self.translator.backend.name}): {self.translator.stats}")
+        if self.stream_stats.get("messages"):
+            sq = self.send_queue.stats()
+            print(f"DEBUG: AssemblyAI send stats: {self.stream_stats}, queue max depth {sq['max_depth']}, capture blocked {sq['blocked_seconds']:.1f}s")
+            if self.stream_stats["max_merge"] > 1:
+                self.update_ui(
+                    f">>> AssemblyAI network lag: {self.stream_stats['frames']} frames sent in "
+                    f"{self.stream_stats['messages']} messages (up to {self.stream_stats['max_merge']} merged)"
+                )
+        if self.stream_stats.get("reconnects"):
+            self.update_ui(
+                f">>> AssemblyAI: {self.stream_stats['reconnects']} connection drops, "
+                f"{self.stream_stats.get('replayed_ms', 0) / 1000:.1f}s of audio resent after reconnecting"
+            )
+
+        # Contatori di overload della sessione
+        stats = self.audio_queue.stats()
+        print(f"DEBUG: Audio queue stats: {stats}")
+        if stats["dropped"] or stats["degraded"]:
+            self.update_ui(
+                f">>> Overload ({stats['policy']}): {stats['dropped']} chunks dropped "
+                f"({stats['dropped_silence']} silent), {stats['degraded']} degraded"
+            )
+        if self.capture_stalls:
+            self.update_ui(
+                f">>> Overload ({stats['policy']}): {self.capture_stalls} chunks dropped, capture could not wait "
+                f"over {CAPTURE_ENQUEUE_TIMEOUT}s for the dispatcher ({stats['blocked_seconds']:.1f}s blocked)"
+            )
+        if self.chunks_overwritten:
+            self.update_ui(f">>> Overload: {self.chunks_overwritten} chunks lost (waited longer than the ring buffer holds)")
+        
+        if tracing.ENABLED:
+            self.export_trace()
+        self.export_metrics()
         
         self.update_ui("--- STOPPED ---")
+        if self.log_writer:
+            self.log_writer.flush()  # Tutte le righe della sessione sono sul file
+
+    def export_metrics(self):
+        """Scrive gli istogrammi di latenza della sessione nella cartella dei log"""
+        snapshot = self.metrics.snapshot()
+        if not snapshot:
+            return
+        print("DEBUG: Latency metrics\n" + self.metrics.report())
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.get_log_dir(), f"metrics_{ts}.json")
+        try:
+            self.metrics.write(path, transcript=self.log_file)
+            for name in ("turn.total", "chunk.total", "assemblyai.final_latency", "assemblyai.send_lag"):
+                s = snapshot.get(name)
+                if s and s["count"]:
+                    self.update_ui(f">>> Latency {name}: p50 {s['p50_ms']:.0f} ms, p95 {s['p95_ms']:.0f} ms, p99 {s['p99_ms']:.0f} ms")
+        except Exception as e:
+            print(f"Metrics export error: {e}")
+
+    def export_trace(self):
+        """Esporta il buffer di tracing (Chrome trace) nella cartella dei log"""
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.get_log_dir(), f"trace_{ts}.json")
+        try:
+            count = tracing.export_chrome(path)
+            self.update_ui(f">>> Trace: {count} events -> {path} (open in chrome://tracing or Perfetto)")
+        except Exception as e:
+            print(f"Trace export error: {e}")
 
 def main(page: ft.Page):
     page.title = "Live Transcriber Pro"
@@ -759,26 +1484,15 @@ def main(page: ft.Page):
     
     def refresh_devices(e=None):
         try:
-            mics = sc.all_microphones(include_loopback=True)
-            options = []
-            default_speaker_id = sc.default_speaker().id
-            found_default = None
-            for m in mics:
-                if m.isloopback:
-                    opt = ft.dropdown.Option(text=m.name)
-                    options.append(opt)
-                    if m.id == default_speaker_id:
-                        found_default = m.name
-            dd_device.options = options
-            if found_default:
-                dd_device.value = found_default
-            elif options:
-                dd_device.value = options[0].text
+            # Loopback soundcard più eventuali sorgenti file/sintetiche (AUDIO_SOURCES)
+            names, default = audio_sources.list_sources()
+            dd_device.options = [ft.dropdown.Option(text=name) for name in names]
+            if default:
+                dd_device.value = default
             dd_device.update()
         except:
             pass
 
-    refresh_devices()
 
     btn_refresh = ft.IconButton(icon=ft.Icons.REFRESH, on_click=refresh_devices, tooltip="Refresh Devices")
 
@@ -789,7 +1503,8 @@ def main(page: ft.Page):
             ft.dropdown.Option("Português"),
         ],
         value="English",
-        expand=True
+        expand=True,
+        on_change=lambda e: app.select_whisper_model(dd_lang.value),
     )
 
     dd_engine = ft.Dropdown(
@@ -798,47 +1513,35 @@ def main(page: ft.Page):
             ft.dropdown.Option("AssemblyAI Real-Time ⚡ (FASTEST - like ChatGPT)"),
             ft.dropdown.Option("Google (indicated for English)"),
             ft.dropdown.Option("Whisper (indicated for Português Brasil)"),
+            ft.dropdown.Option("Whisper Streaming (Offline, Low Latency)"),
         ],
         value="AssemblyAI Real-Time ⚡ (FASTEST - like ChatGPT)",
-        expand=True
+        expand=True,
+        on_change=lambda e: app.preload_engine(dd_engine.value),
     )
 
-    # Output Area: UNICO Testo per selezione perfetta!
-    # Avvolto in SelectionArea per permettere selezione nativa
+    # Output Area: una riga per turno (aggiornamenti incrementali), solo una finestra
+    # dello storico nelle ListView; le pagine più vecchie arrivano scorrendo verso l'alto.
+    # Avvolto in SelectionArea per permettere selezione nativa su più righe
+    log_list = ft.ListView(spacing=0, expand=True, on_scroll_interval=100)
+    translation_list = ft.ListView(spacing=0, expand=True, on_scroll_interval=100)
+    transcript_store = TranscriptStore()
+    atexit.register(transcript_store.close)  # Il file temporaneo dello storico non sopravvive all'app
+    atexit.register(lambda: app.log_writer and app.log_writer.close())  # Righe ancora in coda
+    app.renderer = TranscriptRenderer(log_list, translation_list, transcript_store)
+    app.coalescer = UpdateCoalescer(app._flush_ui)
+
     log_content = ft.SelectionArea(
-        content=app.full_log_text
+        content=log_list
     )
     
     translation_content = ft.SelectionArea(
-        content=app.full_translation_text
+        content=translation_list
     )
     
-    # Colonna scrollabile
-    # Aggiungo un'ancora invisibile alla fine per lo scroll
-    scroll_anchor = ft.Container(height=1, key="scroll_anchor")
-    translation_scroll_anchor = ft.Container(height=1, key="translation_scroll_anchor")
-    
-    log_scroll_column = ft.Column(
-        controls=[log_content, scroll_anchor],
-        scroll=ft.ScrollMode.ALWAYS,
-        # auto_scroll rimosso per evitare conflitti con scroll manuale
-        expand=True,
-    )
-    
-    translation_scroll_column = ft.Column(
-        controls=[translation_content, translation_scroll_anchor],
-        scroll=ft.ScrollMode.ALWAYS,
-        expand=True
-    )
-    
-    app.log_scroll_column = log_scroll_column
-    app.scroll_anchor = scroll_anchor
-    app.translation_scroll_column = translation_scroll_column
-    app.translation_scroll_anchor = translation_scroll_anchor
-    
     # Container principale (Sinistra - Trascrizione)
     log_container = ft.Container(
-        content=log_scroll_column,
+        content=log_content,
         bgcolor=ft.Colors.BLACK12,
         border_radius=10,
         border=ft.border.all(2, ft.Colors.BLUE_GREY_700),
@@ -848,7 +1551,7 @@ def main(page: ft.Page):
     
     # Container secondario (Destra - Traduzione)
     translation_container = ft.Container(
-        content=translation_scroll_column,
+        content=translation_content,
         bgcolor=ft.Colors.BLACK12,
         border_radius=10,
         border=ft.border.all(2, ft.Colors.AMBER_900), # Bordo diverso
@@ -934,8 +1637,7 @@ def main(page: ft.Page):
         # Svuota tutto
         app.turn_text_map.clear()
         app.translated_text_map.clear()
-        app.full_log_text.value = ""
-        app.full_translation_text.value = ""
+        app.renderer.clear()
         page.update()
 
     def btn_open_logs_click(e):
@@ -965,8 +1667,9 @@ def main(page: ft.Page):
     )
 
     def btn_copy_all_click(e):
-        if app.full_log_text.value:
-            page.set_clipboard(app.full_log_text.value)
+        full_text = app.renderer.transcript_text()
+        if full_text:
+            page.set_clipboard(full_text)
             # Feedback visivo temporaneo
             btn_copy_all.text = "✓ Copied!"
             page.update()
@@ -1006,5 +1709,12 @@ def main(page: ft.Page):
         ft.Text("Logs saved to text files automatically", size=10, color=ft.Colors.GREY_500, text_align=ft.TextAlign.CENTER)
     )
 
+    # Finestra visibile: ora i lavori pesanti in background (device, moduli del motore, modelli)
+    threading.Thread(target=refresh_devices, daemon=True).start()
+    app.preload_engine(dd_engine.value)
+    app.model_manager.preload(WHISPER_PRELOAD)
+    if lazy_imports.IMPORT_TIMING:
+        print(import_report())
+
 if __name__ == "__main__":
     ft.run(main)
\ No newline at end of file
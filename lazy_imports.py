@@ -0,0 +1,149 @@
+"""
+Import pigri dei moduli pesanti e report dei tempi di import.
+
+lazy_module("numpy") ritorna un proxy: il modulo vero viene importato al primo
+accesso a un attributo (o in background con preload). Con IMPORT_TIMING=1 un
+finder su sys.meta_path misura ogni import (tempo proprio e cumulativo, come
+`python -X importtime`) e import_report() segnala i moduli oltre il budget.
+"""
+import importlib
+import importlib.abc
+import os
+import sys
+import threading
+import time
+import types
+
+IMPORT_TIMING = os.getenv("IMPORT_TIMING", "") not in ("", "0")
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "150"))  # Budget per singolo modulo
+
+_times = {}  # nome modulo -> (self_s, cumulative_s)
+_lazy_loads = []  # (nome, secondi, thread) dei moduli caricati in modo pigro
+_local = threading.local()
+_lock = threading.RLock()
+
+
+class _TimingLoader(importlib.abc.Loader):
+    """Avvolge il loader originale misurando exec_module"""
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._loader, attr)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(0.0)  # Tempo speso negli import figli
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            _times[self._name] = (total - children, total)
+            # Ripristina il loader originale (introspezione successiva invariata)
+            if module.__spec__ is not None:
+                module.__spec__.loader = self._loader
+            module.__loader__ = self._loader
+
+
+class _TimingFinder(importlib.abc.MetaPathFinder):
+    """Delega agli altri finder e sostituisce il loader con _TimingLoader"""
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimingLoader(spec.loader, name)
+                return spec
+        return None
+
+
+def install_import_timer():
+    """Attiva la misura dei tempi di import (da chiamare prima degli import pesanti)"""
+    if not any(isinstance(f, _TimingFinder) for f in sys.meta_path):
+        sys.meta_path.insert(0, _TimingFinder())
+
+
+class LazyModule(types.ModuleType):
+    """Proxy di un modulo importato al primo utilizzo"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_module"]
+                if module is None:
+                    name = self.__dict__["_lazy_name"]
+                    start = time.perf_counter()
+                    module = importlib.import_module(name)
+                    elapsed = time.perf_counter() - start
+                    _lazy_loads.append((name, elapsed, threading.current_thread().name))
+                    print(f"DEBUG: Lazy import {name} ({elapsed * 1000:.0f} ms)")
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def is_loaded(self):
+        return self.__dict__["_module"] is not None
+
+
+def lazy_module(name):
+    """Ritorna un proxy pigro per il modulo (riusa il modulo se già importato)"""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def preload(*modules):
+    """Importa in background i moduli pigri (es. quando l'utente sceglie un motore)"""
+    pending = [m for m in modules if isinstance(m, LazyModule) and not m.is_loaded]
+    if pending:
+        def _worker():
+            for m in pending:
+                try:
+                    m._load()
+                except Exception as e:
+                    print(f"Preload error ({m.__dict__['_lazy_name']}): {e}")
+        threading.Thread(target=_worker, daemon=True, name="LazyPreload").start()
+
+
+def import_report(top=25, budget_ms=IMPORT_BUDGET_MS):
+    """Report testuale: moduli più costosi (self/cumulativo) e caricamenti pigri"""
+    lines = []
+    if _times:
+        total = sum(self_s for self_s, _ in _times.values())
+        lines.append(f"--- IMPORT TIME REPORT ({len(_times)} modules, {total * 1000:.0f} ms total) ---")
+        lines.append(f"{'self ms':>9} | {'cumulative':>10} | module")
+        ranked = sorted(_times.items(), key=lambda kv: kv[1][1], reverse=True)[:top]
+        for name, (self_s, cum_s) in ranked:
+            flag = "  <-- OVER BUDGET" if self_s * 1000 > budget_ms else ""
+            lines.append(f"{self_s * 1000:9.1f} | {cum_s * 1000:10.1f} | {name}{flag}")
+    else:
+        lines.append("--- IMPORT TIME REPORT: timer not installed (set IMPORT_TIMING=1) ---")
+    for name, elapsed, thread_name in _lazy_loads:
+        lines.append(f"lazy: {name} loaded in {elapsed * 1000:.0f} ms ({thread_name})")
+    return "\n".join(lines)
@@ -1,4 +1,3 @@
-import soundcard as sc
 import soundfile as sf
 import numpy as np
 from faster_whisper import WhisperModel
@@ -12,19 +11,26 @@ import warnings
 import datetime
 import io
 from concurrent.futures import ThreadPoolExecutor
+from audio_buffer import AudioRingBuffer
+from vad import AdaptiveChunker, to_clip_timestamps
+from log_writer import TranscriptLogWriter
+import audio_sources
 
-# Ignora i warning di soundcard per discontinuità
+# Ignora i warning di soundcard per discontinuità (senza importarlo: può mancare sui server)
 warnings.filterwarnings("ignore", category=UserWarning)
-try:
-    from soundcard.mediafoundation import SoundcardRuntimeWarning
-    warnings.filterwarnings("ignore", category=SoundcardRuntimeWarning)
-except ImportError:
-    pass
+warnings.filterwarnings("ignore", module="soundcard")
 
 # --- CONFIGURAZIONE BASE ---
 SAMPLE_RATE = 16000
 DEVICE_TYPE = "cpu"
 COMPUTE_TYPE = "int8"
+CAPTURE_BLOCK_SECONDS = 0.5  # Blocchi piccoli dal device verso il ring buffer
+RING_BUFFER_CHUNKS = 2  # Capacità del ring buffer in chunk (solo il chunk aperto: in coda vanno copie)
+CHUNK_MIN_FACTOR = 0.5  # Chunk adattivi: taglio alla prima pausa dopo buffer * MIN...
+CHUNK_MAX_FACTOR = 1.5  # ...e comunque entro buffer * MAX
+CHUNK_PAUSE_MS = 200  # Pausa minima oltre all'hangover del VAD (~600ms di silenzio reale)
+# Sorgente audio: vuoto = loopback dell'uscita predefinita, oppure "file:..." / "synth:..." (audio_sources)
+AUDIO_SOURCE = os.getenv("AUDIO_SOURCE", "")
 
 # Crea un nome file unico con data e ora
 timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -33,17 +39,16 @@ LOG_FILE = f"transcript_{timestamp}.txt"
 # Coda audio
 audio_queue = queue.Queue()
 
-# Lock per la scrittura su file/console per evitare righe mescolate
+# Lock per la scrittura su console per evitare righe mescolate
 io_lock = threading.Lock()
 
+# Writer asincrono del file di log (creato in main)
+log_writer = None
+
 def log_to_file(text):
-    """Scrive il testo nel file di log."""
-    with io_lock:
-        try:
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                f.write(text + "\n")
-        except Exception as e:
-            print(f"Errore scrittura file: {e}")
+    """Accoda il testo al file di log (scritto a blocchi dal thread del writer)."""
+    if log_writer:
+        log_writer.write(text)
 
 def safe_print(text):
     """Stampa thread-safe"""
@@ -52,14 +57,24 @@ def safe_print(text):
         sys.stdout.flush()
 
 def record_audio(mic, stop_event, record_seconds):
-    """Thread dedicato alla registrazione audio continua."""
-    print(f">>> Thread registrazione avviato (Buffer: {record_seconds}s)")
+    """Thread dedicato alla registrazione audio continua (chunk chiusi sulle pause)."""
+    print(f">>> Thread registrazione avviato (Chunk adattivi: {record_seconds * CHUNK_MIN_FACTOR:g}-{record_seconds * CHUNK_MAX_FACTOR:g}s)")
+    ring = AudioRingBuffer(int(SAMPLE_RATE * record_seconds * CHUNK_MAX_FACTOR * RING_BUFFER_CHUNKS))
+    chunker = AdaptiveChunker(
+        ring,
+        min_seconds=record_seconds * CHUNK_MIN_FACTOR,
+        max_seconds=record_seconds * CHUNK_MAX_FACTOR,
+        pause_ms=CHUNK_PAUSE_MS,
+        sample_rate=SAMPLE_RATE,
+    )
     try:
         with mic.recorder(samplerate=SAMPLE_RATE) as recorder:
             while not stop_event.is_set():
                 try:
-                    data = recorder.record(numframes=SAMPLE_RATE * record_seconds)
-                    audio_queue.put(data)
+                    ring.write(recorder.record(numframes=int(SAMPLE_RATE * CAPTURE_BLOCK_SECONDS)))
+                    for start, num_frames, speech_ranges in chunker.update():
+                        # Copia: la coda non è limitata e Whisper può restare indietro di molti chunk
+                        audio_queue.put((ring.view(start, num_frames).copy(), speech_ranges))
                 except Exception as e:
                     print(f"Errore rec: {e}")
                     time.sleep(0.1)
@@ -137,8 +152,7 @@ def main():
     
     if engine_mode == "google":
         current_buffer = 10  # Buffer più lungo per ridurre frequenza chiamate API
-        overlap_samples = int(SAMPLE_RATE * 2.0) # 2.0s overlap (più conservativo)
-        print(f">>> Motore: GOOGLE ONLINE (Async mode, Buffer: {current_buffer}s + 2.0s Overlap)")
+        print(f">>> Motore: GOOGLE ONLINE (Async mode, Buffer: ~{current_buffer}s, tagli sulle pause)")
         
         # ThreadPool per gestire le richieste multiple a Google in parallelo
         # max_workers=4 significa che può gestire fino a 4 richieste simultanee
@@ -147,16 +161,9 @@ def main():
         
     else:
         current_buffer = whisper_buffer
-        overlap_samples = 0
         executor = None
         print(f">>> Motore: WHISPER LOCALE ({whisper_model}, Buffer: {current_buffer}s)")
 
-    # Inizializza Log
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write(f"--- SESSIONE {timestamp} ---\n")
-        f.write(f"--- Lingua: {lang_google if engine_mode == 'google' else lang_whisper} ---\n")
-        f.write(f"--- Motore: {engine_mode.upper()} ---\n")
-
     # Caricamento Modello (Solo se Whisper)
     model = None
     if engine_mode == "whisper":
@@ -169,21 +176,7 @@ def main():
 
     # Init Audio
     try:
-        default_speaker = sc.default_speaker()
-        target_mic = None
-        mics = sc.all_microphones(include_loopback=True)
-        
-        for m in mics:
-            if m.isloopback and m.id == default_speaker.id:
-                target_mic = m; break
-        if not target_mic:
-            for m in mics:
-                if m.isloopback and m.name == default_speaker.name:
-                    target_mic = m; break
-        if not target_mic:
-             for m in mics:
-                 if "Loopback" in m.name or "Stereo Mix" in m.name:
-                     target_mic = m; break
+        target_mic = audio_sources.open_source(AUDIO_SOURCE or None)
         
         if not target_mic:
             print("ERRORE: Loopback device non trovato.")
@@ -194,6 +187,13 @@ def main():
         print(f"Errore audio init: {e}")
         return
 
+    # Inizializza Log (dopo i controlli: le uscite anticipate non lasciano il writer aperto)
+    global log_writer
+    log_writer = TranscriptLogWriter(LOG_FILE, mode="w")
+    log_to_file(f"--- SESSIONE {timestamp} ---")
+    log_to_file(f"--- Lingua: {lang_google if engine_mode == 'google' else lang_whisper} ---")
+    log_to_file(f"--- Motore: {engine_mode.upper()} ---")
+
     print("\n--- INIZIO TRASCRIZIONE (PREMI CTRL+C PER USCIRE) ---\n")
     
     stop_event = threading.Event()
@@ -201,34 +201,16 @@ def main():
     recorder_thread.daemon = True
     recorder_thread.start()
 
-    prev_audio_chunk = np.array([], dtype='float32')
-
     try:
         while True:
             try:
                 # Timeout un po' più lungo per sicurezza
-                data = audio_queue.get(timeout=current_buffer + 5)
+                data_to_process, speech_ranges = audio_queue.get(timeout=current_buffer * CHUNK_MAX_FACTOR + 5)
             except queue.Empty:
                 continue
 
-            # --- PRE-PROCESSING ---
-            mono_data = np.mean(data, axis=1)
-
-            # Overlap management
-            if engine_mode == "google":
-                if prev_audio_chunk.size > 0:
-                    combined_data = np.concatenate((prev_audio_chunk, mono_data))
-                else:
-                    combined_data = mono_data
-                
-                prev_audio_chunk = mono_data[-overlap_samples:] 
-                data_to_process = combined_data
-            else:
-                data_to_process = mono_data
-
-            # Check silenzio
-            if np.max(np.abs(data_to_process)) < 0.001:
-                prev_audio_chunk = np.array([], dtype='float32')
+            # Check silenzio (deciso dal VAD del chunker)
+            if not speech_ranges:
                 continue
 
             # --- DISPATCHING ---
@@ -241,7 +223,10 @@ def main():
             else:
                 # Whisper (rimane sincrono perché usa la CPU intensamente, inutile parallelizzare troppo)
                 try:
-                    segments, _ = model.transcribe(data_to_process, beam_size=5, language=lang_whisper, vad_filter=True)
+                    segments, _ = model.transcribe(
+                        data_to_process, beam_size=5, language=lang_whisper, vad_filter=False,
+                        clip_timestamps=to_clip_timestamps(speech_ranges, SAMPLE_RATE)
+                    )
                     parts = [s.text.strip() for s in segments if s.text.strip()]
                     text_result = " ".join(parts)
                     
@@ -259,6 +244,8 @@ def main():
         if executor:
             print("Attendo completamento richieste pendenti...")
             executor.shutdown(wait=False)
+    finally:
+        log_writer.close()  # Anche se il ciclo si interrompe per un errore
         print(f"Salvato in: {LOG_FILE}")
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""
+Scrittura asincrona del file di trascrizione.
+
+Un solo file handle aperto per tutta la sessione e un thread dedicato che
+scrive le righe in coda a blocchi (ogni LOG_BATCH_LINES righe o LOG_FLUSH_SECONDS
+secondi). Chi chiama write() non tocca mai il disco.
+
+Politica fsync (LOG_FSYNC):
+  - "none":     flush verso il sistema operativo, nessun fsync (default)
+  - "batch":    fsync dopo ogni blocco scritto
+  - "interval": fsync al massimo ogni LOG_FSYNC_SECONDS secondi
+"""
+import os
+import queue
+import threading
+import time
+
+import tracing
+
+LOG_BATCH_LINES = 64
+LOG_FLUSH_SECONDS = 0.5
+LOG_FSYNC = os.getenv("LOG_FSYNC", "none")
+LOG_FSYNC_SECONDS = float(os.getenv("LOG_FSYNC_SECONDS", "5"))
+
+
+class TranscriptLogWriter:
+    """Writer a blocchi su un file aperto una volta sola"""
+
+    def __init__(self, path, mode="a", batch_lines=LOG_BATCH_LINES, flush_seconds=LOG_FLUSH_SECONDS,
+                 fsync=LOG_FSYNC):
+        if fsync not in ("none", "batch", "interval"):
+            raise ValueError(f"Unknown fsync policy '{fsync}' (none, batch, interval)")
+        self.path = path
+        self.batch_lines = batch_lines
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self._queue = queue.Queue()
+        self._file = open(path, mode, encoding="utf-8")
+        self._last_fsync = time.monotonic()
+        self._closed = False
+        self.lines_written = 0
+        self.batches_written = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="LogWriter")
+        self._thread.start()
+
+    def write(self, line):
+        """Accoda una riga (non blocca mai)"""
+        if not self._closed:
+            self._queue.put(line)
+
+    def flush(self, timeout=5):
+        """Attende che tutte le righe accodate finora siano sul file"""
+        if self._closed:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout=5):
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _write_batch(self, lines):
+        try:
+            with tracing.span("log.write", lines=len(lines)):
+                self._file.write("".join(line + "\n" for line in lines))
+                self._file.flush()
+                now = time.monotonic()
+                if self.fsync == "batch" or (self.fsync == "interval" and now - self._last_fsync >= LOG_FSYNC_SECONDS):
+                    os.fsync(self._file.fileno())
+                    self._last_fsync = now
+            self.lines_written += len(lines)
+            self.batches_written += 1
+        except Exception as e:
+            print(f"Log write error ({self.path}): {e}")
+
+    def _run(self):
+        lines = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Scaduto il tempo del blocco
+
+            if isinstance(item, str):
+                lines.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+                if len(lines) < self.batch_lines:
+                    continue
+
+            # Blocco pieno, tempo scaduto, flush richiesto o chiusura
+            if lines:
+                self._write_batch(lines)
+                lines = []
+            deadline = None
+            if isinstance(item, threading.Event):
+                if self.fsync != "none":
+                    try:
+                        os.fsync(self._file.fileno())
+                    except Exception as e:
+                        print(f"Log fsync error ({self.path}): {e}")
+                item.set()
+            elif item is None:
+                break
+        try:
+            self._file.close()
+        except Exception as e:
+            print(f"Log close error ({self.path}): {e}")
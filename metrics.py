@@ -0,0 +1,160 @@
+"""
+Metriche di latenza end-to-end per chunk e per turno.
+
+Ogni chunk (o turno) accumula i timestamp delle fasi che attraversa
+(cattura, dispatch, worker, raccolta, rendering, traduzione...). Quando sono
+arrivate le fasi finali, i tempi tra fasi consecutive e il totale finiscono in
+istogrammi in streaming (bucket logaritmici, memoria costante) interrogabili
+in qualsiasi momento con snapshot() e salvati su file a fine sessione.
+"""
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+HISTOGRAM_MIN_SECONDS = 1e-4  # Sotto: primo bucket
+HISTOGRAM_RESOLUTION = 0.05  # Errore relativo massimo dei percentili (5%)
+MAX_OPEN_TIMELINES = 5000  # Timeline non concluse tenute in memoria (le più vecchie si scartano)
+
+
+class LatencyHistogram:
+    """Istogramma a bucket logaritmici: percentili con errore relativo limitato"""
+
+    def __init__(self, min_value=HISTOGRAM_MIN_SECONDS, resolution=HISTOGRAM_RESOLUTION):
+        self.min_value = min_value
+        self._log_base = math.log1p(resolution)
+        self.buckets = {}  # indice -> conteggio
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _index(self, value):
+        if value <= self.min_value:
+            return 0
+        return int(math.log(value / self.min_value) / self._log_base) + 1
+
+    def _value(self, index):
+        """Valore rappresentativo (limite superiore) del bucket"""
+        return self.min_value * math.exp(index * self._log_base)
+
+    def observe(self, value):
+        value = max(0.0, value)
+        idx = self._index(value)
+        self.buckets[idx] = self.buckets.get(idx, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                return min(self._value(idx), self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 1),
+            "p50_ms": round(self.percentile(50) * 1000, 1),
+            "p95_ms": round(self.percentile(95) * 1000, 1),
+            "p99_ms": round(self.percentile(99) * 1000, 1),
+            "max_ms": round(self.max * 1000, 1),
+        }
+
+
+class MetricsRegistry:
+    """Timeline per chunk/turno e istogrammi di latenza (thread-safe)"""
+
+    def __init__(self, final_stages=None):
+        # Per tipo: fasi che chiudono la timeline (tutte devono essere arrivate)
+        self.final_stages = final_stages or {}
+        self._timelines = OrderedDict()  # (tipo, chiave) -> {fase: tempo monotonic}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self._observe(name, seconds)
+
+    def _observe(self, name, seconds):
+        hist = self._histograms.get(name)
+        if hist is None:
+            hist = self._histograms[name] = LatencyHistogram()
+        hist.observe(seconds)
+
+    def mark(self, kind, key, stage, t=None, create=True):
+        """Registra la fase (solo la prima volta) e chiude la timeline se è completa.
+        create=False: solo se la timeline esiste già (es. fasi UI dei soli turni misurati)"""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            timeline = self._timelines.get((kind, key))
+            if timeline is None:
+                if not create:
+                    return
+                timeline = self._timelines[(kind, key)] = {}
+                while len(self._timelines) > MAX_OPEN_TIMELINES:
+                    self._timelines.popitem(last=False)
+            timeline.setdefault(stage, t)
+            final = self.final_stages.get(kind)
+            if final and final.issubset(timeline):
+                self._finish(kind, key)
+
+    def has(self, kind, key, stage):
+        with self._lock:
+            return stage in self._timelines.get((kind, key), ())
+
+    def link(self, src_kind, src_key, dst_kind, dst_key):
+        """Copia le fasi già registrate (es. del chunk) nella timeline del turno che ne nasce"""
+        with self._lock:
+            marks = dict(self._timelines.get((src_kind, src_key), {}))
+        for stage, t in sorted(marks.items(), key=lambda kv: kv[1]):
+            self.mark(dst_kind, dst_key, stage, t)
+
+    def discard(self, kind, key):
+        with self._lock:
+            self._timelines.pop((kind, key), None)
+
+    def finish(self, kind, key):
+        """Chiude la timeline anche senza tutte le fasi finali"""
+        with self._lock:
+            self._finish(kind, key)
+
+    def _finish(self, kind, key):
+        timeline = self._timelines.pop((kind, key), None)
+        if not timeline:
+            return
+        stages = sorted(timeline.items(), key=lambda kv: kv[1])
+        for (prev, t_prev), (stage, t) in zip(stages, stages[1:]):
+            self._observe(f"{kind}.{prev}->{stage}", t - t_prev)
+        if len(stages) > 1:
+            self._observe(f"{kind}.total", stages[-1][1] - stages[0][1])
+
+    def snapshot(self):
+        """{nome: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            return {name: hist.summary() for name, hist in sorted(self._histograms.items())}
+
+    def report(self):
+        lines = [f"{'metric':<42} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for name, s in self.snapshot().items():
+            if s["count"]:
+                lines.append(f"{name:<42} {s['count']:>6} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {s['max_ms']:>9}")
+        return "\n".join(lines)
+
+    def write(self, path, **extra):
+        """Salva gli istogrammi (più eventuali campi extra) in JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(extra, metrics=self.snapshot()), f, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self._timelines.clear()
+            self._histograms.clear()
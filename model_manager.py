@@ -0,0 +1,74 @@
+"""
+Gestione dei modelli Whisper: preload in background e cache LRU limitata.
+
+Il caricamento avviene in un thread dedicato; chi chiede un modello riceve un
+Future e attende solo se il modello non è ancora pronto.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WhisperModelManager:
+    """Cache LRU di WhisperModel con caricamento in background"""
+
+    def __init__(self, max_models=2, device="cpu", compute_type="int8"):
+        self.max_models = max_models
+        self.device = device
+        self.compute_type = compute_type
+        self._models = OrderedDict()  # nome -> Future[WhisperModel]
+        self._lock = threading.Lock()
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ModelLoader")
+
+    def _load(self, name):
+        from faster_whisper import WhisperModel
+        print(f"DEBUG: Loading Whisper model {name} in background...")
+        model = WhisperModel(name, device=self.device, compute_type=self.compute_type)
+        print(f"DEBUG: Whisper model {name} ready")
+        return model
+
+    def _request(self, name):
+        """Ritorna il Future del modello, avviandone il caricamento se serve"""
+        with self._lock:
+            future = self._models.get(name)
+            if future is not None and not (future.done() and future.exception()):
+                self._models.move_to_end(name)
+                return future
+
+            future = self._loader.submit(self._load, name)
+            self._models[name] = future
+
+            # Evict LRU: solo modelli già caricati, mai quello appena richiesto
+            while len(self._models) > self.max_models:
+                evictable = [n for n, f in self._models.items() if n != name and f.done()]
+                if not evictable:
+                    break
+                print(f"DEBUG: Evicting Whisper model {evictable[0]} from cache")
+                del self._models[evictable[0]]
+            return future
+
+    def preload(self, names):
+        """Avvia il caricamento in background dei modelli configurati"""
+        for name in names:
+            self._request(name)
+
+    def is_ready(self, name):
+        with self._lock:
+            future = self._models.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def get(self, name, timeout=None):
+        """Ritorna il modello (attende solo se il caricamento è ancora in corso)"""
+        return self._request(name).result(timeout=timeout)
+
+    def activate(self, name, on_ready):
+        """Prepara il modello senza bloccare; on_ready(name, model) quando è disponibile"""
+        def _done(future):
+            if future.exception() is None:
+                on_ready(name, future.result())
+            else:
+                print(f"Error loading model {name}: {future.exception()}")
+        self._request(name).add_done_callback(_done)
+
+    def shutdown(self):
+        self._loader.shutdown(wait=False, cancel_futures=True)
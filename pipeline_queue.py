@@ -0,0 +1,115 @@
+"""
+Code limitate per la pipeline di trascrizione, con politiche di overload.
+
+Politiche quando la coda è piena:
+  - "block":        il produttore attende (nessuna perdita, la cattura rallenta)
+  - "drop_oldest":  scarta l'elemento più vecchio (anche con parlato)
+  - "skip_silence": scarta solo i chunk senza parlato; se non ce ne sono, come "block"
+  - "degrade":      come "block", ma sopra la soglia il consumatore usa impostazioni
+                    più economiche (should_degrade)
+Ogni elemento scartato passa a on_drop, così chi produce può mantenere l'ordine.
+"""
+import queue
+import threading
+import time
+from collections import deque
+
+POLICIES = ("block", "drop_oldest", "skip_silence", "degrade")
+
+
+class BoundedPipelineQueue:
+    """Coda FIFO limitata (API compatibile con queue.Queue) con contatori di overload"""
+
+    def __init__(self, maxsize, policy="block", is_silence=None, on_drop=None, degrade_watermark=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overload policy '{policy}' (choose from {', '.join(POLICIES)})")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.is_silence = is_silence or (lambda item: False)
+        self.on_drop = on_drop
+        self.degrade_watermark = degrade_watermark if degrade_watermark is not None else max(1, maxsize // 2)
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.counters = {
+            "put": 0,
+            "dropped": 0,
+            "dropped_silence": 0,
+            "degraded": 0,
+            "blocked_seconds": 0.0,
+            "max_depth": 0,
+        }
+
+    def put(self, item, timeout=None):
+        victim = None
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    victim = self._items.popleft()
+                elif self.policy == "skip_silence":
+                    victim = next((i for i in self._items if self.is_silence(i)), None)
+                    if victim is not None:
+                        self._items.remove(victim)
+                    elif self.is_silence(item):
+                        victim = item  # Coda piena di parlato: si scarta il nuovo chunk silenzioso
+                    if victim is not None:
+                        self.counters["dropped_silence"] += 1
+                if victim is None and self.policy != "drop_oldest":
+                    # Niente da scartare senza perdere parlato: il produttore attende
+                    start = time.monotonic()
+                    freed = self._cond.wait_for(lambda: len(self._items) < self.maxsize, timeout)
+                    self.counters["blocked_seconds"] += time.monotonic() - start
+                    if not freed:
+                        raise queue.Full
+                if victim is not None:
+                    self.counters["dropped"] += 1
+
+            if victim is not item:
+                self._items.append(item)
+            self.counters["put"] += 1
+            self.counters["max_depth"] = max(self.counters["max_depth"], len(self._items))
+            self._cond.notify_all()
+
+        # Callback fuori dal lock (può a sua volta accodare altrove)
+        if victim is not None and self.on_drop:
+            self.on_drop(victim)
+
+    def get(self, block=True, timeout=None):
+        with self._cond:
+            if not block:
+                if not self._items:
+                    raise queue.Empty
+            elif not self._cond.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return self.qsize() >= self.maxsize
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+            self._cond.notify_all()
+
+    def should_degrade(self):
+        """True se il consumatore deve passare a impostazioni più economiche"""
+        if self.policy != "degrade" or self.qsize() < self.degrade_watermark:
+            return False
+        with self._cond:
+            self.counters["degraded"] += 1
+        return True
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counters, depth=len(self._items), maxsize=self.maxsize, policy=self.policy)
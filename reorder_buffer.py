@@ -0,0 +1,51 @@
+"""
+Reorder buffer con scadenze per il collector dei risultati.
+
+I chunk completano fuori ordine (più worker, batch, pool di processi) ma vanno
+mostrati nell'ordine degli ID. Ogni chunk registrato ha una scadenza: se il
+chunk atteso non arriva in tempo viene sostituito da una riga di timeout, così
+i successivi non restano bloccati per sempre.
+"""
+import time
+
+
+class ReorderBuffer:
+    """Risultati (chunk_id -> righe) rilasciati in ordine, con scadenza per chunk"""
+
+    def __init__(self, timeout, clock=time.monotonic):
+        self.timeout = timeout
+        self.clock = clock
+        self.expected = 0  # Prossimo chunk da rilasciare
+        self.ready = {}  # chunk_id -> righe, pronti ma fuori ordine
+        self.deadlines = {}  # chunk_id -> scadenza, registrati non ancora completati
+
+    def register(self, chunk_id):
+        self.deadlines[chunk_id] = self.clock() + self.timeout
+
+    def complete(self, chunk_id, lines):
+        """Accetta il risultato; False se il chunk è già scaduto (o mai registrato)"""
+        if chunk_id not in self.deadlines:
+            return False
+        del self.deadlines[chunk_id]
+        self.ready[chunk_id] = lines
+        return True
+
+    def expire(self, timeout_lines):
+        """Se il chunk atteso è scaduto lo sostituisce con timeout_lines(chunk_id); ritorna l'ID o None"""
+        chunk_id = self.expected
+        if chunk_id not in self.deadlines or self.clock() <= self.deadlines[chunk_id]:
+            return None
+        del self.deadlines[chunk_id]
+        self.ready[chunk_id] = timeout_lines(chunk_id)
+        return chunk_id
+
+    def pop_ready(self):
+        """Rilascia tutti i chunk consecutivi disponibili: (chunk_id, righe)"""
+        while self.expected in self.ready:
+            chunk_id = self.expected
+            self.expected += 1
+            yield chunk_id, self.ready.pop(chunk_id)
+
+    def __bool__(self):
+        """True finché ci sono chunk in attesa o pronti"""
+        return bool(self.deadlines or self.ready)
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("flet")  # gui_transcriber importa flet a livello di modulo
+
+import gui_transcriber
+from gui_transcriber import AAI_REPLAY_SECONDS, SAMPLE_RATE
+
+
+@pytest.fixture
+def app(monkeypatch):
+    a = gui_transcriber.TranscriberApp()
+    a.lines = []
+    monkeypatch.setattr(a, "update_or_add_line", lambda text, is_final, turn_order: a.lines.append((turn_order, is_final, text)))
+    monkeypatch.setattr(a, "remove_line", lambda turn_order: a.lines.append((turn_order, "removed", None)))
+    yield a
+    a.translator.shutdown()
+
+
+def pcm(start_ms, end_ms):
+    """PCM16 riconoscibile: ogni campione vale il suo indice (mod 2^15) dall'inizio della sessione"""
+    first, last = start_ms * SAMPLE_RATE // 1000, end_ms * SAMPLE_RATE // 1000
+    return (np.arange(first, last) % 32768).astype("<i2").tobytes()
+
+
+def send(app, seconds, frame_ms=1000):
+    for start in range(0, seconds * 1000, frame_ms):
+        app._remember_sent(pcm(start, start + frame_ms), start, start + frame_ms)
+
+
+def turn(turn_order, end_of_turn, text, end_ms=None):
+    words = [SimpleNamespace(text=w, end=end_ms) for w in text.split()]
+    return SimpleNamespace(turn_order=turn_order, end_of_turn=end_of_turn, transcript=text, words=words)
+
+
+def test_replay_buffer_keeps_only_the_last_seconds(app):
+    send(app, AAI_REPLAY_SECONDS + 5)
+
+    starts = [start for _, start, _ in app.replay_buffer]
+    assert starts[0] == 5000  # Ultimi 15 s: 5..20 s
+    assert starts[-1] == (AAI_REPLAY_SECONDS + 4) * 1000
+    assert len(app.replay_buffer) == AAI_REPLAY_SECONDS
+
+
+def test_replay_skips_audio_covered_by_final_turns(app):
+    send(app, 5)
+    app.stream_final_ms = 2500  # Fine dell'ultimo turno finale
+
+    replay = app._replay_audio()
+    assert [(start, end) for _, start, end in replay] == [(2500, 3000), (3000, 4000), (4000, 5000)]
+    # Il primo frame è tagliato esattamente a 2.5 s
+    assert replay[0][0] == pcm(2500, 3000)
+
+
+def test_replay_everything_when_nothing_is_final(app):
+    send(app, 3)
+    assert [start for _, start, _ in app._replay_audio()] == [0, 1000, 2000]
+    app.stream_final_ms = 3000
+    assert app._replay_audio() == []
+
+
+def test_rebase_moves_past_every_used_id(app):
+    app.turn_text_map = {3: "a", 8: "b"}
+    app.last_reserved_turn_id = 10
+    app.last_turn_order = 12
+    app.turn_id_offset = 5
+
+    app._rebase_turn_ids()
+    assert app.turn_id_offset == 13
+
+    app.turn_text_map = {}
+    app.last_turn_order = -1
+    app._rebase_turn_ids()
+    assert app.turn_id_offset == 13  # Mai all'indietro
+
+
+def test_reconnect_keeps_turns_in_order_and_replays_the_open_turn(app):
+    client = object()
+    app.assemblyai_transcriber = client
+    app.stream_base_ms = 0
+    send(app, 6)
+
+    # Prima connessione: due turni finali e uno parziale
+    app.on_assemblyai_turn(client, turn(0, True, "one", end_ms=1500))
+    app.on_assemblyai_turn(client, turn(1, True, "two", end_ms=3200))
+    app.on_assemblyai_turn(client, turn(2, False, "thr"))
+    first_ids = [turn_id for turn_id, _, _ in app.lines]
+    app.turn_text_map = {turn_id: text for turn_id, _, text in app.lines}
+    assert app.stream_final_ms == 3200
+
+    # Caduta: la riga parziale sparisce, gli ID ripartono oltre quelli usati
+    app._drop_partial_turn()
+    assert app.lines[-1] == (first_ids[-1], "removed", None)
+    app._rebase_turn_ids()
+    assert [(s, e) for _, s, e in app._replay_audio()] == [(3200, 4000), (4000, 5000), (5000, 6000)]
+
+    # Seconda connessione: turn_order riparte da 0
+    new_client = object()
+    app.assemblyai_transcriber = new_client
+    app.on_assemblyai_turn(client, turn(0, True, "stale"))  # Evento tardivo della connessione chiusa
+    app.on_assemblyai_turn(new_client, turn(0, True, "three"))
+
+    turn_id, is_final, text = app.lines[-1]
+    assert text.endswith("three") and is_final
+    assert turn_id > max(first_ids)
+    assert not any(t and t.endswith("stale") for _, _, t in app.lines)
@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from audio_buffer import AudioRingBuffer, Pcm16Converter
+
+
+def ramp(start, frames):
+    """Campioni riconoscibili: il valore è la posizione assoluta"""
+    return np.arange(start, start + frames, dtype=np.float32)
+
+
+def test_window_across_the_wrap_is_contiguous():
+    ring = AudioRingBuffer(10)
+    ring.write(ramp(0, 7))
+    ring.write(ramp(7, 6))  # Scrive 7..9 in coda e 10..12 all'inizio
+
+    window = ring.view(5, 8)
+    assert window.base is not None  # View, nessuna copia
+    np.testing.assert_array_equal(window, ramp(5, 8))
+    np.testing.assert_array_equal(ring.view(3, 10), ramp(3, 10))  # Finestra lunga quanto il buffer
+
+
+def test_many_wraps_keep_the_latest_capacity_frames():
+    ring = AudioRingBuffer(10)
+    pos = 0
+    for frames in (3, 4, 9, 1, 7, 10, 2):
+        ring.write(ramp(pos, frames))
+        pos += frames
+        start = max(0, pos - 10)
+        np.testing.assert_array_equal(ring.view(start, pos - start), ramp(start, pos - start))
+    assert ring.write_pos == pos
+
+
+def test_block_larger_than_capacity_keeps_only_the_tail():
+    ring = AudioRingBuffer(10)
+    ring.write(ramp(0, 3))
+    ring.write(ramp(3, 25))
+
+    assert ring.write_pos == 28
+    np.testing.assert_array_equal(ring.view(18, 10), ramp(18, 10))
+    assert not ring.contains(17, 1)
+
+
+def test_overwritten_and_future_windows_are_rejected():
+    ring = AudioRingBuffer(10)
+    ring.write(ramp(0, 15))
+
+    assert ring.contains(5, 10)
+    assert not ring.contains(4, 2)  # Inizio già sovrascritto
+    assert not ring.contains(10, 6)  # Oltre write_pos
+    assert not ring.contains(5, 11)  # Più lunga del buffer
+    assert not ring.contains(-1, 1)
+    for start, frames in ((4, 2), (10, 6), (0, 11)):
+        with pytest.raises(ValueError):
+            ring.view(start, frames)
+
+
+def test_multichannel_blocks_are_downmixed():
+    ring = AudioRingBuffer(8)
+    stereo = np.array([[1.0, 0.0], [0.5, 0.5], [-1.0, 1.0], [0.25, -0.75]], dtype=np.float32)
+    ring.write(stereo)
+    ring.write(np.array([[0.2, 0.4, 0.6]] * 2, dtype=np.float32))  # Tre canali
+    ring.write(np.array([[0.8]], dtype=np.float32))  # Un canale, forma (frames, 1)
+
+    np.testing.assert_allclose(ring.view(0, 7), [0.5, 0.5, 0.0, -0.25, 0.4, 0.4, 0.8], rtol=1e-6)
+
+
+def test_reset_starts_again_from_zero():
+    ring = AudioRingBuffer(4)
+    ring.write(ramp(0, 6))
+    ring.reset()
+
+    assert ring.write_pos == 0
+    assert not ring.contains(0, 1)
+    ring.write(ramp(100, 2))
+    np.testing.assert_array_equal(ring.view(0, 2), ramp(100, 2))
+
+
+def old_pcm16(block):
+    """Conversione precedente di audio_generator (np.mean + astype, senza clipping)"""
+    return (np.mean(block, axis=1) * 32767).astype(np.int16)
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+def test_pcm16_matches_the_old_conversion(channels):
+    block = np.random.default_rng(channels).uniform(-1, 1, (4000, channels)).astype(np.float32)
+    pcm = Pcm16Converter().convert(block)
+
+    assert pcm.dtype == np.dtype("<i2")
+    np.testing.assert_array_equal(pcm, old_pcm16(block))
+
+
+@pytest.mark.parametrize("channels", [3, 6])
+def test_pcm16_multichannel_average_is_within_one_step(channels):
+    # Somma per colonne e una sola scala: al massimo 1 LSB dal troncamento di np.mean
+    block = np.random.default_rng(channels).uniform(-1, 1, (4000, channels)).astype(np.float32)
+    diff = Pcm16Converter().convert(block).astype(int) - old_pcm16(block)
+
+    assert np.abs(diff).max() <= 1
+
+
+def test_pcm16_clips_instead_of_wrapping():
+    block = np.array([[1.0], [-1.0], [1.5], [-1.5], [40.0]], dtype=np.float32)
+    pcm = Pcm16Converter().convert(block)
+
+    np.testing.assert_array_equal(pcm, [32767, -32767, 32767, -32768, 32767])
+    assert old_pcm16(block)[2] < 0  # La vecchia conversione andava in wrap-around
+
+
+def test_pcm16_mono_1d_block():
+    block = np.array([0.5, -0.5], dtype=np.float32)
+    np.testing.assert_array_equal(Pcm16Converter().convert(block), [16383, -16383])
+
+
+def test_pcm16_view_is_reused_by_the_next_call():
+    converter = Pcm16Converter()
+    first = converter.convert(np.full((4, 2), 0.5, dtype=np.float32))
+    kept = converter.to_bytes(np.full((4, 2), 0.5, dtype=np.float32))
+    second = converter.convert(np.full((4, 2), -0.25, dtype=np.float32))
+
+    assert np.shares_memory(first, second)
+    np.testing.assert_array_equal(first, second)  # La view precedente ora mostra il nuovo frame
+    assert kept == old_pcm16(np.full((4, 2), 0.5, dtype=np.float32)).astype("<i2").tobytes()
@@ -0,0 +1,185 @@
+import threading
+import time
+
+import pytest
+
+from autoscaler import AUTOSCALE_SHRINK_AFTER, ResizableThreadPool, WorkerAutoscaler
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_pool_runs_tasks_and_propagates_errors():
+    pool = ResizableThreadPool(2)
+    try:
+        assert pool.submit(lambda a, b: a + b, 2, b=3).result(timeout=2) == 5
+        with pytest.raises(ZeroDivisionError):
+            pool.submit(lambda: 1 / 0).result(timeout=2)
+    finally:
+        pool.shutdown()
+
+
+def test_pool_grows_and_shrinks():
+    pool = ResizableThreadPool(1, thread_name_prefix="T")
+    release = threading.Event()
+    running = []
+    lock = threading.Lock()
+
+    def task():
+        with lock:
+            running.append(threading.current_thread().name)
+        release.wait(5)
+
+    try:
+        futures = [pool.submit(task) for _ in range(3)]
+        assert wait_for(lambda: len(running) == 1)
+        pool.resize(3)
+        assert pool.num_workers == 3
+        assert wait_for(lambda: len(running) == 3)  # I nuovi worker prendono i job in coda
+        assert len(set(running)) == 3
+
+        release.set()
+        for f in futures:
+            f.result(timeout=2)
+        pool.resize(1)
+        assert wait_for(lambda: pool._alive == 1)  # I thread in eccesso escono dopo il job corrente
+        assert pool.submit(lambda: "still works").result(timeout=2) == "still works"
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_pool_never_goes_below_one_worker():
+    pool = ResizableThreadPool(2)
+    pool.resize(0)
+    assert pool.num_workers == 1
+    pool.shutdown()
+
+
+def test_shutdown_cancels_queued_tasks():
+    pool = ResizableThreadPool(1)
+    release = threading.Event()
+    first = pool.submit(release.wait, 5)
+    queued = pool.submit(lambda: "never")
+    assert wait_for(first.running)
+
+    pool.shutdown(wait=False, cancel_futures=True)
+    assert queued.cancelled()
+    release.set()
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
+    assert wait_for(lambda: pool._alive == 0)
+
+
+class FakeCpu:
+    def __init__(self, value=10.0):
+        self.value = value
+
+    def percent(self):
+        return self.value
+
+
+def make_scaler(min_workers=1, max_workers=8, depth=0, cpu=10.0):
+    scaler = WorkerAutoscaler(lambda n: None, min_workers, max_workers, queue_depth=lambda: depth, interval=60)
+    scaler._cpu = FakeCpu(cpu)
+    return scaler
+
+
+def load(scaler, rtf, jobs=5):
+    scaler._samples.clear()
+    for _ in range(jobs):
+        scaler.record(rtf * 2.0, 2.0)
+
+
+def test_no_samples_holds():
+    scaler = make_scaler()
+    assert scaler.evaluate(2)[0] == 2
+    scaler.record(1.0, 0)  # Job senza audio: ignorato
+    assert scaler.real_time_factor() is None
+
+
+def test_grows_to_the_needed_workers():
+    scaler = make_scaler()
+    load(scaler, rtf=2.0)  # ceil(2.0 * 1.3) = 3 worker
+    target, reason = scaler.evaluate(1)
+    assert target == 3
+    assert reason.startswith("grow")
+
+
+def test_grow_is_capped_and_held_when_cpu_is_saturated():
+    scaler = make_scaler(max_workers=2)
+    load(scaler, rtf=4.0)
+    assert scaler.evaluate(1)[0] == 2
+
+    scaler = make_scaler(cpu=95.0)
+    load(scaler, rtf=4.0)
+    target, reason = scaler.evaluate(1)
+    assert target == 1
+    assert reason.startswith("hold: CPU saturated")
+
+
+def test_queue_backlog_grows_one_worker_at_a_time():
+    scaler = make_scaler(depth=5)
+    load(scaler, rtf=0.5)  # Bastano i worker attuali, ma la coda cresce
+    assert scaler.evaluate(2)[0] == 3
+
+
+def test_shrink_needs_consecutive_surplus_evaluations():
+    scaler = make_scaler()
+    load(scaler, rtf=0.2)
+    for i in range(1, AUTOSCALE_SHRINK_AFTER):
+        target, reason = scaler.evaluate(4)
+        assert target == 4
+        assert f"surplus {i}/{AUTOSCALE_SHRINK_AFTER}" in reason
+    assert scaler.evaluate(4)[0] == 3  # Uno alla volta
+
+
+def test_surplus_count_resets_when_load_returns():
+    scaler = make_scaler()
+    load(scaler, rtf=0.2)
+    for _ in range(AUTOSCALE_SHRINK_AFTER - 1):
+        scaler.evaluate(4)
+    load(scaler, rtf=2.5)  # needed = 4: niente surplus
+    assert scaler.evaluate(4)[0] == 4
+
+    load(scaler, rtf=0.2)
+    assert scaler.evaluate(4)[0] == 4  # Il conteggio riparte da capo
+
+
+def test_shrink_never_goes_below_min_workers():
+    scaler = make_scaler(min_workers=2)
+    load(scaler, rtf=0.1)
+    for _ in range(AUTOSCALE_SHRINK_AFTER * 2):
+        target = scaler.evaluate(2)[0]
+    assert target == 2
+
+
+def test_growth_without_throughput_gain_is_reverted_and_capped():
+    scaler = make_scaler()
+    load(scaler, rtf=2.0)  # Capacità con 1 worker: 0.5x
+    assert scaler.evaluate(1)[0] == 3
+
+    load(scaler, rtf=6.0)  # 3 worker in contesa: ancora 0.5x
+    target, reason = scaler.evaluate(3)
+    assert target == 1
+    assert reason.startswith("revert")
+    assert scaler.max_workers == 1
+
+    load(scaler, rtf=6.0)
+    assert scaler.evaluate(1)[0] == 1  # Il tetto resta
+
+
+def test_growth_with_throughput_gain_is_kept():
+    scaler = make_scaler()
+    load(scaler, rtf=2.0)
+    assert scaler.evaluate(1)[0] == 3
+
+    load(scaler, rtf=2.0)  # Capacità 1.5x: la crescita ha funzionato
+    assert scaler.evaluate(3)[0] == 3
+    assert scaler.max_workers == 8
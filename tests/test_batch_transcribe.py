@@ -0,0 +1,130 @@
+import os
+import wave
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+import batch_transcribe
+import google_speech
+from batch_transcribe import BatchTranscriber, transcript_path
+
+SAMPLE_RATE = 16000
+
+
+def write_wav(path, seconds=12):
+    """Registrazione finta: 1 s di tono e 1 s di quasi silenzio alternati"""
+    t = np.arange(SAMPLE_RATE) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t)
+    quiet = np.random.default_rng(0).normal(0, 1e-4, SAMPLE_RATE)
+    audio = np.concatenate([tone, quiet] * (seconds // 2))
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes((audio * 32767).astype(np.int16).tobytes())
+    return str(path)
+
+
+@pytest.fixture
+def recognizer(monkeypatch):
+    """Sostituisce Google con un riconoscitore locale; .fail simula un errore di rete"""
+    state = {"calls": 0, "fail": False}
+
+    def recognize_lines(audio, lang_code, timestamp, sample_rate):
+        state["calls"] += 1
+        if state["fail"]:
+            return ["[⚠️ Google API Error - check internet connection]"]
+        return [f"[{timestamp}] words"]
+
+    monkeypatch.setattr(google_speech, "recognize_lines", recognize_lines)
+    return state
+
+
+def run(*argv):
+    return batch_transcribe.main([*argv, "--engine", "google", "--processes", "2"])
+
+
+def test_transcript_is_written_in_chunk_order(tmp_path, recognizer):
+    path = write_wav(tmp_path / "meeting.wav")
+    assert run(path) == 0
+
+    lines = open(transcript_path(path), encoding="utf-8").read().splitlines()
+    assert lines and all(line.endswith("] words") for line in lines)
+    assert lines == sorted(lines)  # Timestamp crescenti
+    assert not os.path.exists(transcript_path(path) + ".part")
+
+
+def test_finished_files_are_skipped(tmp_path, recognizer):
+    done = write_wav(tmp_path / "a.wav")
+    todo = write_wav(tmp_path / "b.wav")
+    with open(transcript_path(done), "w", encoding="utf-8") as f:
+        f.write("old\n")
+
+    assert run(str(tmp_path)) == 0
+    assert open(transcript_path(done), encoding="utf-8").read() == "old\n"
+    assert os.path.exists(transcript_path(todo))
+
+    calls = recognizer["calls"]
+    assert run(str(tmp_path)) == 0  # Niente da fare
+    assert recognizer["calls"] == calls
+
+    assert run(str(tmp_path), "--force") == 0
+    assert open(transcript_path(done), encoding="utf-8").read() != "old\n"
+
+
+def test_failed_chunk_leaves_the_file_to_be_retried(tmp_path, recognizer):
+    path = write_wav(tmp_path / "meeting.wav")
+    recognizer["fail"] = True
+    assert run(path) == 1
+    assert not os.path.exists(transcript_path(path))
+    assert not os.path.exists(transcript_path(path) + ".part")
+
+    recognizer["fail"] = False
+    assert run(path) == 0  # Ripresa: il file viene ritentato
+    assert "[⚠️" not in open(transcript_path(path), encoding="utf-8").read()
+
+
+class BrokenPool:
+    """Pool il cui processo worker è morto: ogni future fallisce"""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_pool_is_rebuilt_and_the_file_retried(tmp_path, recognizer, monkeypatch):
+    path = write_wav(tmp_path / "meeting.wav")
+    broken = BrokenPool()
+    pools = [broken]
+    real_create = BatchTranscriber._create_pool
+    monkeypatch.setattr(BatchTranscriber, "_create_pool", lambda self: pools.pop(0) if pools else real_create(self))
+
+    transcriber = BatchTranscriber("google", "en")
+    try:
+        lines, seconds = transcriber.transcribe_file(path)
+    finally:
+        transcriber.shutdown()
+
+    assert broken.shut_down
+    assert lines > 0
+    assert seconds == pytest.approx(12)
+    assert os.path.exists(transcript_path(path))
+
+
+def test_broken_pool_is_retried_only_once(tmp_path, recognizer, monkeypatch):
+    path = write_wav(tmp_path / "meeting.wav")
+    monkeypatch.setattr(BatchTranscriber, "_create_pool", lambda self: BrokenPool())
+
+    transcriber = BatchTranscriber("google", "en")
+    with pytest.raises(BrokenProcessPool):
+        transcriber.transcribe_file(path)
+    assert not os.path.exists(transcript_path(path) + ".part")
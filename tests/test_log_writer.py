@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from log_writer import TranscriptLogWriter
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_unknown_fsync_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        TranscriptLogWriter(tmp_path / "log.txt", fsync="always")
+
+
+def test_full_batch_is_written_in_one_block(tmp_path):
+    path = tmp_path / "log.txt"
+    writer = TranscriptLogWriter(path, batch_lines=4, flush_seconds=60)
+    try:
+        for i in range(4):
+            writer.write(f"line {i}")
+        assert wait_for(lambda: writer.batches_written == 1)
+        assert writer.lines_written == 4
+        assert read_lines(path) == [f"line {i}" for i in range(4)]
+    finally:
+        writer.close()
+
+
+def test_partial_batch_is_written_after_flush_seconds(tmp_path):
+    path = tmp_path / "log.txt"
+    writer = TranscriptLogWriter(path, batch_lines=100, flush_seconds=0.05)
+    try:
+        writer.write("a")
+        writer.write("b")
+        assert wait_for(lambda: writer.lines_written == 2)
+        assert writer.batches_written == 1
+        assert read_lines(path) == ["a", "b"]
+    finally:
+        writer.close()
+
+
+def test_flush_waits_for_queued_lines(tmp_path):
+    path = tmp_path / "log.txt"
+    writer = TranscriptLogWriter(path, batch_lines=100, flush_seconds=60)
+    try:
+        writer.write("header")
+        assert writer.flush()
+        assert read_lines(path) == ["header"]
+    finally:
+        writer.close()
+
+
+def test_close_writes_pending_lines_and_ignores_later_writes(tmp_path):
+    path = tmp_path / "log.txt"
+    writer = TranscriptLogWriter(path, mode="w", batch_lines=100, flush_seconds=60)
+    writer.write("--- SESSIONE ---")
+    writer.write("testo")
+    writer.close()
+
+    assert read_lines(path) == ["--- SESSIONE ---", "testo"]
+    assert not writer._thread.is_alive()
+    writer.write("dopo la chiusura")
+    writer.close()  # Idempotente
+    assert writer.flush()
+    assert read_lines(path) == ["--- SESSIONE ---", "testo"]
+
+
+def test_append_mode_keeps_previous_content(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("vecchia\n", encoding="utf-8")
+    writer = TranscriptLogWriter(path, batch_lines=100, flush_seconds=60, fsync="batch")
+    writer.write("nuova")
+    writer.close()
+    assert read_lines(path) == ["vecchia", "nuova"]
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+import metrics
+from metrics import HISTOGRAM_RESOLUTION, LatencyHistogram, MetricsRegistry
+
+
+def test_percentiles_are_within_the_bucket_resolution():
+    hist = LatencyHistogram()
+    values = [i / 1000 for i in range(1, 1001)]  # 1..1000 ms
+    for v in reversed(values):
+        hist.observe(v)
+
+    for q, exact in ((50, 0.5), (95, 0.95), (99, 0.99)):
+        assert hist.percentile(q) == pytest.approx(exact, rel=HISTOGRAM_RESOLUTION)
+    assert hist.percentile(100) == 1.0  # Mai oltre il massimo osservato
+    assert hist.count == 1000
+    assert hist.total == pytest.approx(sum(values))
+
+
+def test_percentile_of_a_skewed_distribution():
+    hist = LatencyHistogram()
+    for _ in range(98):
+        hist.observe(0.010)
+    hist.observe(2.0)
+    hist.observe(3.0)
+
+    assert hist.percentile(50) == pytest.approx(0.010, rel=HISTOGRAM_RESOLUTION)
+    assert hist.percentile(98) == pytest.approx(0.010, rel=HISTOGRAM_RESOLUTION)
+    assert hist.percentile(99) == pytest.approx(2.0, rel=HISTOGRAM_RESOLUTION)
+    assert hist.summary()["max_ms"] == 3000.0
+
+
+def test_tiny_and_negative_values_fall_in_the_first_bucket():
+    hist = LatencyHistogram()
+    hist.observe(-1.0)
+    hist.observe(1e-6)
+    assert hist.buckets == {0: 2}
+    assert hist.percentile(50) == 1e-6  # Limitato al massimo osservato
+
+
+def test_empty_histogram():
+    hist = LatencyHistogram()
+    assert hist.percentile(50) is None
+    assert hist.summary() == {"count": 0}
+
+
+def test_timeline_closes_when_final_stages_arrive():
+    registry = MetricsRegistry(final_stages={"chunk": {"display"}})
+    registry.mark("chunk", 1, "capture", t=10.0)
+    registry.mark("chunk", 1, "dispatch", t=10.5)
+    registry.mark("chunk", 1, "dispatch", t=99.0)  # Solo la prima volta conta
+    assert registry.snapshot() == {}
+
+    registry.mark("chunk", 1, "display", t=12.0)
+    snap = registry.snapshot()
+    assert snap["chunk.capture->dispatch"]["p50_ms"] == pytest.approx(500, rel=HISTOGRAM_RESOLUTION)
+    assert snap["chunk.dispatch->display"]["p50_ms"] == pytest.approx(1500, rel=HISTOGRAM_RESOLUTION)
+    assert snap["chunk.total"]["max_ms"] == 2000.0
+    assert not registry.has("chunk", 1, "capture")  # Timeline chiusa
+
+
+def test_stages_are_ordered_by_time_not_by_arrival():
+    registry = MetricsRegistry()
+    registry.mark("turn", 7, "display", t=3.0)
+    registry.mark("turn", 7, "capture", t=1.0)
+    registry.finish("turn", 7)
+    assert set(registry.snapshot()) == {"turn.capture->display", "turn.total"}
+
+
+def test_create_false_link_and_discard():
+    registry = MetricsRegistry(final_stages={"turn": {"display"}})
+    registry.mark("turn", 1, "display", create=False)  # Turno non misurato: ignorato
+    assert registry.snapshot() == {}
+
+    registry.mark("chunk", 5, "capture", t=1.0)
+    registry.mark("chunk", 5, "collect", t=2.0)
+    registry.link("chunk", 5, "turn", 9)
+    registry.mark("turn", 9, "display", t=2.5, create=False)
+    assert registry.snapshot()["turn.total"]["max_ms"] == 1500.0
+
+    registry.mark("chunk", 6, "capture", t=1.0)
+    registry.discard("chunk", 6)
+    registry.finish("chunk", 6)
+    assert "chunk.total" not in registry.snapshot()
+
+
+def test_open_timelines_are_bounded(monkeypatch):
+    monkeypatch.setattr(metrics, "MAX_OPEN_TIMELINES", 3)
+    registry = MetricsRegistry()
+    for key in range(5):
+        registry.mark("chunk", key, "capture", t=float(key))
+
+    assert not registry.has("chunk", 1, "capture")  # Le più vecchie si scartano
+    assert registry.has("chunk", 2, "capture")
+    assert registry.has("chunk", 4, "capture")
+
+
+def test_write_and_reset(tmp_path):
+    registry = MetricsRegistry()
+    registry.observe("assemblyai.final_latency", 0.25)
+    path = tmp_path / "metrics.json"
+    registry.write(str(path), session="s1")
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["session"] == "s1"
+    assert data["metrics"]["assemblyai.final_latency"]["count"] == 1
+    assert "assemblyai.final_latency" in registry.report()
+
+    registry.reset()
+    assert registry.snapshot() == {}
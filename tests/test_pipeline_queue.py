@@ -0,0 +1,129 @@
+import queue
+import threading
+
+import pytest
+
+from pipeline_queue import BoundedPipelineQueue
+
+
+def is_silence(item):
+    return item.startswith("sil")
+
+
+def make_queue(policy, **kwargs):
+    dropped = []
+    q = BoundedPipelineQueue(2, policy=policy, is_silence=is_silence, on_drop=dropped.append, **kwargs)
+    return q, dropped
+
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedPipelineQueue(2, policy="nope")
+
+
+def test_block_waits_and_never_drops():
+    q, dropped = make_queue("block")
+    q.put("a")
+    q.put("b")
+    with pytest.raises(queue.Full):
+        q.put("c", timeout=0.05)
+
+    threading.Timer(0.1, q.get).start()
+    q.put("c", timeout=2)  # Sbloccato dal consumatore
+
+    assert drain(q) == ["b", "c"]
+    assert dropped == []
+    stats = q.stats()
+    assert stats["dropped"] == 0
+    assert stats["blocked_seconds"] > 0
+    assert stats["max_depth"] == 2
+
+
+def test_drop_oldest_discards_the_head():
+    q, dropped = make_queue("drop_oldest")
+    for item in ("a", "b", "c", "d"):
+        q.put(item, timeout=0)
+
+    assert drain(q) == ["c", "d"]
+    assert dropped == ["a", "b"]
+    stats = q.stats()
+    assert stats["put"] == 4
+    assert stats["dropped"] == 2
+    assert stats["dropped_silence"] == 0
+
+
+def test_skip_silence_drops_a_queued_silent_chunk():
+    q, dropped = make_queue("skip_silence")
+    q.put("speech1")
+    q.put("sil1")
+    q.put("speech2", timeout=0)
+
+    assert drain(q) == ["speech1", "speech2"]
+    assert dropped == ["sil1"]
+    assert q.stats()["dropped"] == 1
+    assert q.stats()["dropped_silence"] == 1
+
+
+def test_skip_silence_drops_the_incoming_silent_chunk():
+    q, dropped = make_queue("skip_silence")
+    q.put("speech1")
+    q.put("speech2")
+    q.put("sil1", timeout=0)
+
+    assert drain(q) == ["speech1", "speech2"]
+    assert dropped == ["sil1"]
+    assert q.stats()["dropped_silence"] == 1
+
+
+def test_skip_silence_blocks_instead_of_dropping_speech():
+    q, dropped = make_queue("skip_silence")
+    q.put("speech1")
+    q.put("speech2")
+    with pytest.raises(queue.Full):
+        q.put("speech3", timeout=0.05)
+
+    assert drain(q) == ["speech1", "speech2"]
+    assert dropped == []
+    assert q.stats()["dropped"] == 0
+
+
+def test_degrade_blocks_and_signals_above_the_watermark():
+    q, dropped = make_queue("degrade", degrade_watermark=2)
+    q.put("a")
+    assert not q.should_degrade()
+    q.put("b")
+    assert q.should_degrade()
+    with pytest.raises(queue.Full):
+        q.put("c", timeout=0.05)
+
+    assert dropped == []
+    stats = q.stats()
+    assert stats["dropped"] == 0
+    assert stats["degraded"] == 1
+
+
+def test_should_degrade_is_off_for_other_policies():
+    q, _ = make_queue("block", degrade_watermark=1)
+    q.put("a")
+    q.put("b")
+    assert not q.should_degrade()
+    assert q.stats()["degraded"] == 0
+
+
+def test_timed_out_wait_counts_as_blocked_time():
+    q, dropped = make_queue("block")
+    q.put("a")
+    q.put("b")
+    with pytest.raises(queue.Full):
+        q.put("c", timeout=0.05)
+
+    assert q.stats()["blocked_seconds"] >= 0.05
+    assert q.stats()["put"] == 2
+    assert dropped == []
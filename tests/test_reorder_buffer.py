@@ -0,0 +1,71 @@
+from reorder_buffer import ReorderBuffer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def timeout_lines(chunk_id):
+    return [f"timeout {chunk_id}"]
+
+
+def test_out_of_order_results_are_released_in_order():
+    buf = ReorderBuffer(timeout=10, clock=FakeClock())
+    for cid in range(3):
+        buf.register(cid)
+
+    assert buf.complete(2, ["c"])
+    assert buf.complete(1, ["b"])
+    assert list(buf.pop_ready()) == []  # Manca ancora il chunk 0
+
+    assert buf.complete(0, ["a"])
+    assert list(buf.pop_ready()) == [(0, ["a"]), (1, ["b"]), (2, ["c"])]
+    assert buf.expected == 3
+    assert not buf
+
+
+def test_expired_chunk_is_skipped_and_unblocks_the_rest():
+    clock = FakeClock()
+    buf = ReorderBuffer(timeout=5, clock=clock)
+    buf.register(0)
+    buf.register(1)
+    buf.complete(1, ["b"])
+
+    clock.now = 5.0  # Esattamente alla scadenza: non ancora scaduto
+    assert buf.expire(timeout_lines) is None
+    assert list(buf.pop_ready()) == []
+
+    clock.now = 5.1
+    assert buf.expire(timeout_lines) == 0
+    assert list(buf.pop_ready()) == [(0, ["timeout 0"]), (1, ["b"])]
+    assert not buf
+
+
+def test_late_result_after_expiry_is_ignored():
+    clock = FakeClock()
+    buf = ReorderBuffer(timeout=1, clock=clock)
+    buf.register(0)
+    clock.now = 2.0
+    assert buf.expire(timeout_lines) == 0
+    list(buf.pop_ready())
+
+    assert not buf.complete(0, ["late"])
+    assert buf.ready == {}
+
+
+def test_only_the_expected_chunk_expires():
+    clock = FakeClock()
+    buf = ReorderBuffer(timeout=1, clock=clock)
+    buf.register(0)
+    buf.register(1)
+    buf.complete(0, ["a"])
+    clock.now = 2.0
+
+    assert buf.expire(timeout_lines) is None  # Il chunk atteso (0) è completo
+    assert list(buf.pop_ready()) == [(0, ["a"])]
+    assert buf.expire(timeout_lines) == 1
+    assert list(buf.pop_ready()) == [(1, ["timeout 1"])]
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from transcript_store import TranscriptStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = TranscriptStore(str(tmp_path / "turns.sqlite"))
+    yield s
+    s.close()
+
+
+def fill(store, ids):
+    for turn_id in ids:
+        store.upsert(turn_id, f"text {turn_id}", f"tr {turn_id}")
+
+
+def test_upsert_keeps_fields_that_are_not_given(store):
+    store.upsert(1, text="hello")
+    store.upsert(1, translation="ciao")
+    assert store.get(1) == ("hello", "ciao")
+    store.upsert(1, text="hello!")
+    assert store.get(1) == ("hello!", "ciao")
+    assert store.get(2) is None
+
+
+def test_before_returns_the_previous_page_in_order(store):
+    fill(store, range(0, 100, 2))
+
+    assert [row[0] for row in store.before(50, 3)] == [44, 46, 48]
+    assert store.before(50, 1) == [(48, "text 48", "tr 48")]
+    assert [row[0] for row in store.before(4, 10)] == [0, 2]
+    assert store.before(0, 10) == []
+
+
+def test_after_returns_the_next_page_in_order(store):
+    fill(store, range(0, 100, 2))
+
+    assert [row[0] for row in store.after(50, 3)] == [52, 54, 56]
+    assert [row[0] for row in store.after(94, 10)] == [96, 98]
+    assert store.after(98, 10) == []
+
+
+def test_paging_walks_the_whole_history(store):
+    fill(store, range(1000))
+    seen = []
+    cursor = 1000
+    while True:
+        page = store.before(cursor, 50)
+        if not page:
+            break
+        seen[:0] = [row[0] for row in page]
+        cursor = page[0][0]
+    assert seen == list(range(1000))
+
+
+def test_delete_count_and_transcript_text(store):
+    fill(store, [3, 1, 2])
+    store.delete(2)
+    assert store.count() == 2
+    assert store.transcript_text() == "text 1\ntext 3"  # Ordine dei turni, non di inserimento
+
+
+def test_new_store_on_the_same_file_starts_empty(tmp_path):
+    path = str(tmp_path / "turns.sqlite")
+    first = TranscriptStore(path)
+    fill(first, range(5))
+    first._conn.close()
+
+    second = TranscriptStore(path)
+    assert second.count() == 0
+    second.close()
+    assert not os.path.exists(path)
@@ -0,0 +1,149 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("flet")  # transcript_view importa flet a livello di modulo
+
+import transcript_view
+from transcript_store import TranscriptStore
+from transcript_view import MAX_RENDERED_TURNS, PAGE_TURNS, TranscriptRenderer
+
+
+class FakeText:
+    """ft.Text senza pagina: update() conta soltanto"""
+
+    def __init__(self, value="", key=None, **kwargs):
+        self.value = value
+        self.key = key
+        self.updates = 0
+
+    def update(self):
+        self.updates += 1
+
+
+class FakeList:
+    def __init__(self):
+        self.controls = []
+        self.on_scroll = None
+        self.scrolled_to = []
+
+    def update(self):
+        pass
+
+    def scroll_to(self, **kwargs):
+        self.scrolled_to.append(kwargs)
+
+
+@pytest.fixture
+def renderer(tmp_path, monkeypatch):
+    monkeypatch.setattr(transcript_view, "ft", SimpleNamespace(
+        Text=FakeText, Colors=SimpleNamespace(GREEN_400="green", CYAN_400="cyan"),
+    ))
+    store = TranscriptStore(str(tmp_path / "turns.sqlite"))
+    r = TranscriptRenderer(FakeList(), FakeList(), store)
+    yield r
+    store.close()
+
+
+def scroll(renderer, pixels):
+    renderer.log_list.on_scroll(SimpleNamespace(event_type="end", pixels=pixels, min_scroll_extent=0, max_scroll_extent=1000))
+
+
+def check_aligned(r):
+    assert r.keys == sorted(r.keys)
+    assert [c.key for c in r.log_list.controls] == [f"log_{k}" for k in r.keys]
+    assert [c.key for c in r.translation_list.controls] == [f"tr_{k}" for k in r.keys]
+    assert set(r.rows) == set(r.keys)
+
+
+def test_window_keeps_the_latest_turns(renderer):
+    total = MAX_RENDERED_TURNS + 50
+    for turn_id in range(total):
+        renderer.render(turn_id, f"text {turn_id}")
+
+    assert renderer.keys == list(range(50, total))
+    check_aligned(renderer)
+    assert renderer.store.count() == total  # Lo storico resta completo
+    assert renderer.transcript_text().startswith("text 0\n")
+
+
+def test_update_touches_only_the_changed_row(renderer):
+    for turn_id in range(3):
+        renderer.render(turn_id, f"text {turn_id}")
+    renderer.render(1, translation="traduzione")
+
+    log_text, tr_text = renderer.rows[1]
+    assert (log_text.value, tr_text.value) == ("text 1", "traduzione")
+    assert (log_text.updates, tr_text.updates) == (0, 1)
+    assert renderer.rows[0][1].updates == 0
+
+
+def test_turn_inside_the_window_is_inserted_in_order(renderer):
+    for turn_id in (1, 2, 5):
+        renderer.render(turn_id, "x")
+    renderer.render(3, "late")
+    assert renderer.keys == [1, 2, 3, 5]
+    check_aligned(renderer)
+
+
+def test_turn_older_than_the_window_is_only_stored(renderer):
+    for turn_id in range(10, 10 + MAX_RENDERED_TURNS):
+        renderer.render(turn_id, "x")
+    renderer.render(5, "old")
+
+    assert 5 not in renderer.rows
+    assert renderer.store.get(5) == ("old", "")
+
+
+def test_scrolling_up_loads_older_pages_and_stops_following(renderer):
+    total = MAX_RENDERED_TURNS + 2 * PAGE_TURNS
+    for turn_id in range(total):
+        renderer.render(turn_id, "x")
+
+    scroll(renderer, 0)
+    assert renderer.keys == list(range(PAGE_TURNS, PAGE_TURNS + MAX_RENDERED_TURNS))
+    check_aligned(renderer)
+    assert not renderer.follow_tail
+    assert renderer.log_list.scrolled_to[-1]["key"] == f"log_{2 * PAGE_TURNS}"  # Riga che si stava leggendo
+
+    renderer.render(total, "new")  # Arriva in fondo ma la finestra è sullo storico
+    assert total not in renderer.rows
+    assert renderer.store.get(total) == ("new", "")
+
+
+def test_scrolling_down_reloads_newer_pages_and_resumes_following(renderer):
+    total = MAX_RENDERED_TURNS + 2 * PAGE_TURNS
+    for turn_id in range(total):
+        renderer.render(turn_id, "x")
+    scroll(renderer, 0)
+    scroll(renderer, 0)
+    assert renderer.keys[0] == 0
+
+    scroll(renderer, 1000)
+    assert renderer.keys[-1] == MAX_RENDERED_TURNS + PAGE_TURNS - 1
+    assert not renderer.follow_tail
+    scroll(renderer, 1000)
+    assert renderer.keys[-1] == total - 1
+    assert len(renderer.keys) == MAX_RENDERED_TURNS
+    scroll(renderer, 1000)  # Pagina vuota: in fondo allo storico
+    assert renderer.follow_tail
+    check_aligned(renderer)
+
+
+def test_scrolling_in_the_middle_stops_following(renderer):
+    renderer.render(1, "x")
+    scroll(renderer, 500)
+    assert not renderer.follow_tail
+
+
+def test_remove_and_clear(renderer):
+    for turn_id in range(3):
+        renderer.render(turn_id, "x")
+    renderer.remove(1)
+    assert renderer.keys == [0, 2]
+    assert renderer.store.get(1) is None
+    check_aligned(renderer)
+
+    renderer.clear()
+    assert renderer.keys == [] and renderer.log_list.controls == []
+    assert renderer.store.count() == 0
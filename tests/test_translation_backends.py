@@ -0,0 +1,203 @@
+import importlib.util
+from concurrent.futures import Future
+from types import SimpleNamespace
+
+import pytest
+
+import translation_backends
+from translation_backends import (GoogleBackend, LocalCT2Backend, StubBackend, TranslationBackend,
+                                  _model_layout, create_backend)
+
+
+def argos_model(path):
+    (path / "model").mkdir()
+    (path / "sentencepiece.model").write_text("")
+    return str(path)
+
+
+def opus_model(path):
+    (path / "source.spm").write_text("")
+    (path / "target.spm").write_text("")
+    return str(path)
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        TranslationBackend()
+
+    class Incomplete(TranslationBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_model_layout_argos(tmp_path):
+    path = argos_model(tmp_path)
+    spm = str(tmp_path / "sentencepiece.model")
+    assert _model_layout(path) == (str(tmp_path / "model"), spm, spm)
+
+
+def test_model_layout_opus_mt(tmp_path):
+    path = opus_model(tmp_path)
+    assert _model_layout(path) == (path, str(tmp_path / "source.spm"), str(tmp_path / "target.spm"))
+
+
+def test_model_layout_prefers_argos(tmp_path):
+    argos_model(tmp_path)
+    opus_model(tmp_path)
+    assert _model_layout(str(tmp_path))[0] == str(tmp_path / "model")
+
+
+def test_model_layout_missing(tmp_path):
+    (tmp_path / "source.spm").write_text("")  # Manca target.spm
+    with pytest.raises(FileNotFoundError):
+        _model_layout(str(tmp_path))
+
+
+def test_create_backend_by_name():
+    assert isinstance(create_backend("stub"), StubBackend)
+    assert isinstance(create_backend("google"), GoogleBackend)
+
+
+@pytest.mark.parametrize("missing", ["ctranslate2", "sentencepiece"])
+def test_local_falls_back_to_google_without_the_optional_modules(monkeypatch, capsys, missing):
+    # Solo `missing` manca, l'altro modulo risulta installato
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name, *args: None if name == missing else object())
+    monkeypatch.setattr(translation_backends, "LocalCT2Backend", pytest.fail)  # Non va nemmeno creato
+
+    assert isinstance(create_backend("local"), GoogleBackend)
+    assert f"{missing} not installed" in capsys.readouterr().out
+
+
+def test_local_falls_back_to_google_without_a_model(monkeypatch, capsys):
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name, *args: object())  # Moduli "installati"
+
+    assert isinstance(create_backend("local"), GoogleBackend)  # TRANSLATION_MODEL_PATH vuoto
+    assert "falling back to Google" in capsys.readouterr().out
+
+
+class InlineExecutor:
+    """ProcessPoolExecutor finto: esegue i task nel processo (senza initializer)"""
+
+    instances = []
+
+    def __init__(self, max_workers, initializer=None, initargs=()):
+        self.max_workers = max_workers
+        self.initargs = initargs
+        self.calls = []
+        InlineExecutor.instances.append(self)
+
+    def submit(self, fn, *args):
+        self.calls.append(args)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class FakeTokenizer:
+    def __init__(self, tag):
+        self.tag = tag
+
+    def encode(self, text, out_type=str):
+        return text.split()
+
+    def decode(self, tokens):
+        return f"{self.tag}:{' '.join(tokens)}"
+
+
+class FakeTranslator:
+    """Traduttore CTranslate2 finto: "traduce" invertendo i token"""
+
+    def __init__(self):
+        self.batches = []
+
+    def translate_batch(self, tokens, target_prefix=None, **kwargs):
+        self.batches.append((tokens, target_prefix))
+        hyps = []
+        for i, sentence in enumerate(tokens):
+            prefix = target_prefix[i] if target_prefix else []
+            hyps.append(SimpleNamespace(hypotheses=[prefix + sentence[::-1]]))
+        return hyps
+
+
+@pytest.fixture
+def local_backend(tmp_path, monkeypatch):
+    def make(target_prefix=""):
+        InlineExecutor.instances = []
+        translator = FakeTranslator()
+        monkeypatch.setattr(translation_backends, "ProcessPoolExecutor", InlineExecutor)
+        monkeypatch.setattr(translation_backends, "_translator", translator)
+        monkeypatch.setattr(translation_backends, "_sp_source", FakeTokenizer("src"))
+        monkeypatch.setattr(translation_backends, "_sp_target", FakeTokenizer("tgt"))
+        backend = LocalCT2Backend(argos_model(tmp_path), processes=2, threads=3, target_prefix=target_prefix)
+        return backend, InlineExecutor.instances[0], translator
+    return make
+
+
+def test_local_backend_warms_up_every_process(local_backend):
+    backend, executor, _ = local_backend()
+
+    assert executor.max_workers == 2
+    assert executor.initargs[1] == 3  # Thread CTranslate2 per processo
+    assert executor.calls == [([], ""), ([], "")]
+
+
+def test_local_backend_translates_the_batch_in_one_call(local_backend):
+    backend, executor, translator = local_backend()
+    translator.batches.clear()
+
+    assert backend.translate_batch(["hello world", "good morning"], "it") == ["tgt:world hello", "tgt:morning good"]
+    assert translator.batches == [([["hello", "world"], ["good", "morning"]], None)]
+
+
+def test_local_backend_ignores_the_target_argument(local_backend):
+    backend, _, _ = local_backend()
+    # La lingua è fissata dal modello: target non cambia il risultato
+    assert backend.translate_batch(["a b"], "it") == backend.translate_batch(["a b"], "fr")
+
+
+def test_local_backend_target_prefix_is_forced_and_stripped(local_backend):
+    backend, _, translator = local_backend(target_prefix="ita_Latn")
+    translator.batches.clear()
+
+    assert backend.translate_batch(["a b", "c"], "it") == ["tgt:b a", "tgt:c"]
+    assert translator.batches[0][1] == [["ita_Latn"], ["ita_Latn"]]
+
+
+def test_local_backend_requires_a_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation_backends, "ProcessPoolExecutor", InlineExecutor)
+    with pytest.raises(FileNotFoundError):
+        LocalCT2Backend(str(tmp_path))
+
+
+class FakeGoogleClient:
+    def __init__(self, join_lines=True):
+        self.join_lines = join_lines
+        self.requests = []
+
+    def translate(self, text):
+        self.requests.append(text)
+        lines = [f"<{line}>" for line in text.split("\n")]
+        return "\n".join(lines) if self.join_lines else " ".join(lines)
+
+
+def test_google_batch_is_one_request_per_batch():
+    backend = GoogleBackend()
+    client = FakeGoogleClient()
+    backend._client = lambda target: client
+
+    assert backend.translate_batch(["a", "b"], "it") == ["<a>", "<b>"]
+    assert client.requests == ["a\nb"]
+
+
+def test_google_falls_back_to_one_request_per_sentence():
+    backend = GoogleBackend()
+    client = FakeGoogleClient(join_lines=False)  # Il servizio ha unito le righe
+    backend._client = lambda target: client
+
+    assert backend.translate_batch(["a", "b"], "it") == ["<a>", "<b>"]
+    assert client.requests == ["a\nb", "a", "b"]
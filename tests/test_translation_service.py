@@ -0,0 +1,69 @@
+import queue
+
+import pytest
+
+from translation_backends import StubBackend
+from translation_service import TranslationService
+
+
+class CountingStub(StubBackend):
+    def __init__(self):
+        self.calls = []
+
+    def translate_batch(self, texts, target):
+        self.calls.append(list(texts))
+        return super().translate_batch(texts, target)
+
+
+@pytest.fixture
+def service():
+    svc = TranslationService(backend=CountingStub(), target="it", workers=1)
+    yield svc
+    svc.shutdown()
+
+
+def translate(svc, line):
+    """Traduce una riga e attende il callback del worker"""
+    done = queue.Queue()
+    svc.translate_line(line, done.put)
+    return done.get(timeout=5)
+
+
+def test_line_is_translated_with_its_timestamp(service):
+    assert translate(service, "[10:00:01] hello world") == "[10:00:01] [it] hello world"
+    assert service.backend.calls == [["hello world"]]
+    assert service.stats["sentences"] == 1
+
+
+def test_repeated_sentence_is_served_from_the_cache(service):
+    translate(service, "[10:00:01] hello world")
+    result = []
+    service.translate_line("[10:00:05] hello world", result.append)
+
+    assert result == ["[10:00:05] [it] hello world"]  # Subito, senza passare dal worker
+    assert service.stats["cache_hits"] == 1
+    assert service.backend.calls == [["hello world"]]
+
+
+def test_cache_is_per_target_language(service):
+    translate(service, "[10:00:01] hello")
+    service.target = "fr"
+    assert translate(service, "[10:00:02] hello") == "[10:00:02] [fr] hello"
+    assert service.stats["cache_hits"] == 0
+    assert len(service.backend.calls) == 2
+
+
+@pytest.mark.parametrize("line", [
+    "[10:00:01] >>> Recording started",
+    "[10:00:01] --- Session ---",
+    "ERROR: microphone not found",
+    "[10:00:01] ⚠️ CHUNK 3 TIMEOUT - Skipped",
+    "[10:00:01]",
+])
+def test_system_lines_pass_through_untranslated(service, line):
+    result = []
+    service.translate_line(line, result.append)
+
+    assert result == [line]
+    assert service.stats["system"] == 1
+    assert service.backend.calls == []
@@ -0,0 +1,165 @@
+import numpy as np
+import pytest
+
+from vad import StreamingVAD, to_clip_timestamps
+
+SAMPLE_RATE = 16000
+FRAME = 480  # 30 ms a 16 kHz
+HANGOVER = 13  # 400 ms di hangover in frame da 30 ms
+PAD = 3200  # 200 ms di padding
+
+
+def tone(frames):
+    t = np.arange(frames * FRAME) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(frames):
+    return np.random.default_rng(frames).normal(0, 1e-4, frames * FRAME).astype(np.float32)
+
+
+def signal(*parts):
+    """signal(("s", 10), ("t", 20), ...): silenzio/tono in frame VAD"""
+    return np.concatenate([tone(n) if kind == "t" else silence(n) for kind, n in parts])
+
+
+def test_speech_frames_extend_by_the_hangover():
+    vad = StreamingVAD(SAMPLE_RATE)
+    flags = vad.frame_flags(signal(("s", 10), ("t", 20), ("s", 40)))
+
+    expected = np.zeros(70, dtype=bool)
+    expected[10:30 + HANGOVER] = True
+    np.testing.assert_array_equal(flags, expected)
+    assert not vad.in_speech
+
+
+def test_state_carries_across_calls():
+    audio = signal(("s", 10), ("t", 20), ("s", 40))
+    whole = StreamingVAD(SAMPLE_RATE).frame_flags(audio)
+
+    vad = StreamingVAD(SAMPLE_RATE)
+    split = 32 * FRAME  # Dentro l'hangover
+    parts = np.concatenate([vad.frame_flags(audio[:split]), vad.frame_flags(audio[split:])])
+    np.testing.assert_array_equal(parts, whole)
+
+
+def test_speech_ranges_are_padded_sample_offsets():
+    audio = signal(("s", 20), ("t", 20), ("s", 40))
+    ranges = StreamingVAD(SAMPLE_RATE).process(audio)
+
+    assert ranges == [(20 * FRAME - PAD, (40 + HANGOVER) * FRAME + PAD)]
+    assert to_clip_timestamps(ranges, SAMPLE_RATE) == [
+        (20 * FRAME - PAD) / SAMPLE_RATE, ((40 + HANGOVER) * FRAME + PAD) / SAMPLE_RATE,
+    ]
+
+
+def test_padding_is_clamped_and_close_ranges_merge():
+    vad = StreamingVAD(SAMPLE_RATE, hangover_ms=30)
+    ranges = vad.process(signal(("s", 2), ("t", 10), ("s", 8), ("t", 10), ("s", 3)))
+
+    # Pause di 8 frame (< 2 * padding): un solo intervallo, limitato al chunk
+    assert ranges == [(0, 33 * FRAME)]
+
+
+@pytest.mark.parametrize("run, kept", [(4, False), (5, True)])
+def test_isolated_bursts_shorter_than_min_speech_are_dropped(run, kept):
+    vad = StreamingVAD(SAMPLE_RATE)  # min_speech 150 ms = 5 frame
+    flags = np.zeros(60, dtype=bool)
+    flags[30:30 + run] = True
+    ranges = vad.ranges_from_flags(flags, 60 * FRAME)
+
+    assert ranges == ([(30 * FRAME - PAD, (30 + run) * FRAME + PAD)] if kept else [])
+
+
+def test_short_speech_at_the_chunk_edges_is_kept():
+    vad = StreamingVAD(SAMPLE_RATE)
+    flags = np.zeros(60, dtype=bool)
+    flags[:2] = True  # Continua dal chunk precedente
+    flags[-2:] = True  # Continua nel chunk successivo
+
+    assert vad.ranges_from_flags(flags, 60 * FRAME) == [(0, 2 * FRAME + PAD), (58 * FRAME - PAD, 60 * FRAME)]
+
+
+def test_click_is_dropped_end_to_end():
+    vad = StreamingVAD(SAMPLE_RATE, hangover_ms=30)
+    assert vad.process(signal(("s", 20), ("t", 2), ("s", 30))) == []
+
+
+def make_chunker(min_seconds=1.0, max_seconds=3.0):
+    from audio_buffer import AudioRingBuffer
+    from vad import AdaptiveChunker
+    ring = AudioRingBuffer(SAMPLE_RATE * 10)
+    return ring, AdaptiveChunker(ring, min_seconds, max_seconds, pause_ms=200, sample_rate=SAMPLE_RATE)
+
+
+def feed(ring, chunker, audio, block=1000):
+    """Scrive l'audio a blocchi (non allineati ai frame) come la cattura"""
+    closed = []
+    for pos in range(0, len(audio), block):
+        ring.write(audio[pos:pos + block])
+        closed.extend(chunker.update())
+    return closed
+
+
+def test_chunk_closes_at_the_first_pause_after_min_length():
+    ring, chunker = make_chunker()
+    closed = feed(ring, chunker, signal(("s", 10), ("t", 20), ("s", 60)))
+
+    # Parlato fino al frame 30 + hangover, poi 7 frame (200 ms) di pausa
+    end = (30 + HANGOVER + 7) * FRAME
+    assert closed[0] == (0, end, [(10 * FRAME - PAD, (30 + HANGOVER) * FRAME + PAD)])
+    assert closed[1] == (end, 34 * FRAME, [])  # Il silenzio che segue: chunk senza parlato
+
+
+def test_pause_before_min_length_does_not_close():
+    ring, chunker = make_chunker(min_seconds=2.0)
+    closed = feed(ring, chunker, signal(("s", 5), ("t", 10), ("s", 30), ("t", 40), ("s", 40)))
+
+    assert len(closed) == 1
+    start, frames, ranges = closed[0]
+    assert frames >= 2 * SAMPLE_RATE
+    assert len(ranges) == 2  # Entrambe le frasi nello stesso chunk
+
+
+def test_continuous_speech_is_cut_at_max_length():
+    ring, chunker = make_chunker(max_seconds=3.0)
+    closed = feed(ring, chunker, signal(("s", 10), ("t", 225)))
+
+    max_frames = 3 * SAMPLE_RATE
+    assert [(start, frames) for start, frames, _ in closed] == [(0, max_frames), (max_frames, max_frames)]
+    # Il parlato arriva al bordo del chunk e riparte da 0 (offset relativi al chunk)
+    assert closed[0][2] == [(10 * FRAME - PAD, max_frames)]
+    assert closed[1][2] == [(0, max_frames)]
+
+
+def test_speech_ranges_are_relative_to_the_chunk_start():
+    ring, chunker = make_chunker()
+    closed = feed(ring, chunker, signal(("s", 10), ("t", 20), ("s", 100), ("t", 20), ("s", 60)))
+    with_speech = [chunk for chunk in closed if chunk[2]]
+
+    assert len(with_speech) == 2
+    start, frames, ranges = with_speech[1]
+    assert start > 0
+    # Offset relativi al chunk: riportati in assoluto cadono sul secondo tono
+    assert start + ranges[0][0] == 130 * FRAME - PAD
+    assert to_clip_timestamps(ranges, SAMPLE_RATE, offset=start)[0] == (130 * FRAME - PAD) / SAMPLE_RATE
+
+
+def test_chunks_do_not_depend_on_the_capture_block_size():
+    audio = signal(("s", 10), ("t", 40), ("s", 30), ("t", 120), ("s", 50))
+    results = []
+    for block in (333, 1000, 8000):
+        ring, chunker = make_chunker()
+        results.append(feed(ring, chunker, audio, block) + [chunker.flush()])
+    assert results[0] == results[1] == results[2]
+
+
+def test_flush_returns_the_open_chunk_once():
+    ring, chunker = make_chunker()
+    ring.write(signal(("s", 10), ("t", 20)))
+    assert chunker.update() == []
+
+    start, frames, ranges = chunker.flush()
+    assert (start, frames) == (0, 30 * FRAME)
+    assert ranges == [(10 * FRAME - PAD, 30 * FRAME)]
+    assert chunker.flush() is None
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+import vad
+from whisper_pool import SAMPLE_RATE, transcribe_batch_lines
+
+
+class FakePipeline:
+    """BatchedInferencePipeline finta: registra le clip e ritorna segmenti preparati"""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.kwargs = None
+
+    def transcribe(self, audio, **kwargs):
+        self.kwargs = kwargs
+        for clip in kwargs["clip_timestamps"]:
+            audio[clip["start"]:clip["end"]]  # Come collect_chunks di faster-whisper
+        return iter(self.segments), None
+
+
+def segment(start, text):
+    return SimpleNamespace(start=start, end=start + 0.5, text=text)
+
+
+def test_clips_are_integer_sample_offsets():
+    audio = np.zeros(3 * SAMPLE_RATE, dtype=np.float32)
+    specs = [
+        (0, SAMPLE_RATE, "00:00:01", None),  # Chunk intero
+        (SAMPLE_RATE, 2 * SAMPLE_RATE, "00:00:02", [0.25, 0.5, 1.0, 2.5]),  # Due intervalli VAD
+    ]
+    pipeline = FakePipeline([])
+    transcribe_batch_lines(pipeline, audio, specs, "en")
+
+    clips = pipeline.kwargs["clip_timestamps"]
+    assert clips == [
+        {"start": 0, "end": SAMPLE_RATE},
+        {"start": SAMPLE_RATE + 4000, "end": SAMPLE_RATE + 8000},
+        {"start": 2 * SAMPLE_RATE, "end": 3 * SAMPLE_RATE},  # Fine limitata alla lunghezza del chunk
+    ]
+    assert all(isinstance(c["start"], int) and isinstance(c["end"], int) for c in clips)
+    assert pipeline.kwargs["batch_size"] == 3
+    assert pipeline.kwargs["vad_filter"] is False
+
+
+def test_segments_are_mapped_back_to_their_chunk():
+    audio = np.zeros(3 * SAMPLE_RATE, dtype=np.float32)
+    specs = [
+        (0, SAMPLE_RATE, "t0", None),
+        (SAMPLE_RATE, SAMPLE_RATE, "t1", None),
+        (2 * SAMPLE_RATE, SAMPLE_RATE, "t2", None),
+    ]
+    # I segmenti tornano in secondi sull'audio concatenato
+    pipeline = FakePipeline([
+        segment(0.1, " first"), segment(0.6, " chunk "),
+        segment(1.0, "second"),  # Esattamente all'inizio del chunk 1
+        segment(2.2, "  "),  # Vuoto: ignorato
+    ])
+    lines = transcribe_batch_lines(pipeline, audio, specs, "en")
+
+    assert lines == [["[t0] first chunk"], ["[t1] second"], []]
+
+
+def test_vad_ranges_round_trip_through_clip_timestamps():
+    clip = vad.to_clip_timestamps([(4639, 24000)], SAMPLE_RATE)
+    audio = np.zeros(2 * SAMPLE_RATE, dtype=np.float32)
+    pipeline = FakePipeline([])
+    transcribe_batch_lines(pipeline, audio, [(0, 2 * SAMPLE_RATE, "t", clip)], "en")
+
+    assert pipeline.kwargs["clip_timestamps"] == [{"start": 4639, "end": 24000}]
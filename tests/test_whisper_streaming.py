@@ -0,0 +1,96 @@
+from whisper_streaming import MAX_PROMPT_CHARS, LocalAgreementBuffer
+
+
+def words(*spec):
+    """[(start, end, testo)] da coppie (start, testo), parole da 0.4 s"""
+    return [(start, start + 0.4, f" {text}") for start, text in spec]
+
+
+def test_first_hypothesis_is_only_a_draft():
+    buf = LocalAgreementBuffer()
+    assert buf.insert(words((0.0, "hello"), (0.5, "world"))) == []
+    assert buf.committed_text() == ""
+    assert buf.draft_text() == "hello world"
+
+
+def test_common_prefix_of_two_hypotheses_is_committed():
+    buf = LocalAgreementBuffer()
+    buf.insert(words((0.0, "hello"), (0.5, "word")))
+    commit = buf.insert(words((0.0, "Hello,"), (0.5, "world"), (1.0, "again")))
+
+    assert [w[2] for w in commit] == [" Hello,"]  # Confronto senza punteggiatura e maiuscole
+    assert buf.committed_text() == "Hello,"
+    assert buf.draft_text() == "world again"
+    assert buf.committed_end == 0.4
+
+
+def test_committed_words_repeated_by_the_decoder_are_not_committed_twice():
+    buf = LocalAgreementBuffer()
+    buf.insert(words((0.0, "one"), (0.5, "two")))
+    buf.insert(words((0.0, "one"), (0.5, "two"), (1.0, "three")))
+    assert buf.committed_text() == "one two"
+
+    # Nuova finestra: ripete "two" con timestamp spostati in avanti
+    commit = buf.insert(words((0.95, "two"), (1.4, "three"), (1.9, "four")))
+    assert [w[2] for w in commit] == [" three"]
+    commit = buf.insert(words((0.95, "two"), (1.4, "three"), (1.9, "four")))
+    assert [w[2] for w in commit] == [" four"]
+    assert buf.committed_text() == "one two three four"
+
+
+def test_flush_commits_the_draft():
+    buf = LocalAgreementBuffer()
+    buf.insert(words((0.0, "good"), (0.5, "night.")))
+    buf.flush()
+
+    assert buf.committed_text() == "good night."
+    assert buf.draft_text() == ""
+    assert buf.committed_end == 0.9
+    assert buf.ends_sentence()
+
+
+def test_new_turn_keeps_the_cut_point():
+    buf = LocalAgreementBuffer()
+    buf.insert(words((0.0, "first"), (0.5, "turn")))
+    buf.flush()
+    buf.start_new_turn()
+
+    assert buf.committed_text() == ""
+    # Le parole prima del taglio appartengono al turno precedente
+    buf.insert(words((0.0, "first"), (0.5, "turn"), (1.0, "second")))
+    assert buf.draft_text() == "second"
+
+
+def test_prompt_excludes_words_still_in_the_window():
+    buf = LocalAgreementBuffer()
+    buf.insert(words((0.0, "still"), (0.5, "decoding")))
+    buf.insert(words((0.0, "still"), (0.5, "decoding"), (1.0, "this")))
+
+    assert buf.committed_text() == "still decoding"
+    assert buf.prompt() is None  # Parole confermate ma ancora nell'audio della finestra
+
+
+def test_prompt_is_the_text_of_closed_turns():
+    buf = LocalAgreementBuffer()
+    buf.insert(words((0.0, "first"), (0.5, "turn.")))
+    buf.flush()
+    buf.start_new_turn()
+    buf.insert(words((1.0, "second")))
+
+    assert buf.prompt() == "first turn."
+    buf.flush()
+    buf.start_new_turn()
+    assert buf.prompt() == "first turn. second"
+
+
+def test_prompt_keeps_a_word_aligned_tail():
+    buf = LocalAgreementBuffer()
+    for i in range(60):
+        buf.insert(words((i, f"word{i}")))
+        buf.flush()
+        buf.start_new_turn()
+
+    prompt = buf.prompt()
+    assert len(prompt) <= MAX_PROMPT_CHARS
+    assert prompt.endswith("word59")
+    assert prompt.split()[0] in {f"word{i}" for i in range(60)}  # Nessuna parola tagliata a metà
@@ -0,0 +1,156 @@
+"""
+Tracing a basso overhead delle fasi della pipeline.
+
+Con TRACE=1 span ed eventi finiscono in un ring buffer in memoria (gli ultimi
+TRACE_BUFFER_EVENTS), esportabile on demand in formato Chrome trace
+(chrome://tracing, Perfetto) o JSONL. Disattivato, span() ritorna un
+context manager vuoto condiviso: nessuna allocazione e nessun I/O.
+
+    with tracing.span("whisper.transcribe", chunk=12):
+        ...
+    tracing.event("ui.update", turn=5)
+    tracing.async_begin("chunk", 12) ... tracing.async_end("chunk", 12)  # Anche da thread diversi
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.getenv("TRACE", "") not in ("", "0")
+TRACE_BUFFER_EVENTS = int(os.getenv("TRACE_BUFFER_EVENTS", "200000"))
+
+# Record: (fase, nome, ts_us, dur_us, thread id, args, id async)
+_events = deque(maxlen=TRACE_BUFFER_EVENTS)
+_thread_names = {}
+_pid = os.getpid()
+_t0 = time.perf_counter()
+
+
+def _now_us():
+    return (time.perf_counter() - _t0) * 1e6
+
+
+def _tid():
+    tid = threading.get_ident()
+    if tid not in _thread_names:
+        _thread_names[tid] = threading.current_thread().name
+    return tid
+
+
+class _NullSpan:
+    """Span quando il tracing è disattivato"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = _now_us()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        _events.append(("X", self.name, self.start, end - self.start, _tid(), self.args, None))
+        return False
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def span(name, **args):
+    """Misura la durata del blocco with"""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def event(name, **args):
+    """Evento istantaneo"""
+    if ENABLED:
+        _events.append(("i", name, _now_us(), 0, _tid(), args, None))
+
+
+def counter(name, **values):
+    """Valori numerici nel tempo (es. profondità delle code)"""
+    if ENABLED:
+        _events.append(("C", name, _now_us(), 0, _tid(), values, None))
+
+
+def async_begin(name, span_id, **args):
+    """Inizio di una fase che termina in un altro thread (es. chunk catturato -> mostrato)"""
+    if ENABLED:
+        _events.append(("b", name, _now_us(), 0, _tid(), args, span_id))
+
+
+def async_end(name, span_id, **args):
+    if ENABLED:
+        _events.append(("e", name, _now_us(), 0, _tid(), args, span_id))
+
+
+def snapshot():
+    """Copia degli eventi registrati (il buffer continua a riempirsi)"""
+    return list(_events)
+
+
+def clear():
+    _events.clear()
+
+
+def _chrome_event(record):
+    ph, name, ts, dur, tid, args, span_id = record
+    ev = {"name": name, "ph": ph, "ts": round(ts, 1), "pid": _pid, "tid": tid, "args": args}
+    if ph == "X":
+        ev["dur"] = round(dur, 1)
+    elif ph == "i":
+        ev["s"] = "t"
+    elif ph in ("b", "e"):
+        ev["cat"] = "async"
+        ev["id"] = span_id
+    return ev
+
+
+def export_chrome(path):
+    """Scrive il buffer in formato Chrome trace (JSON); ritorna il numero di eventi"""
+    records = snapshot()
+    trace = [
+        {"name": "thread_name", "ph": "M", "pid": _pid, "tid": tid, "args": {"name": tname}}
+        for tid, tname in list(_thread_names.items())
+    ]
+    trace.extend(_chrome_event(r) for r in records)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, default=str)
+    return len(records)
+
+
+def export_jsonl(path):
+    """Scrive il buffer come una riga JSON per evento; ritorna il numero di eventi"""
+    records = snapshot()
+    with open(path, "w", encoding="utf-8") as f:
+        for r in records:
+            ev = _chrome_event(r)
+            ev["thread"] = _thread_names.get(ev["tid"], "")
+            f.write(json.dumps(ev, default=str) + "\n")
+    return len(records)
@@ -0,0 +1,87 @@
+"""
+Storico completo dei turni (trascrizione + traduzione) su SQLite.
+
+La vista mostra solo una finestra di righe; i turni più vecchi restano qui e
+vengono ricaricati a pagine quando l'utente scorre indietro.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+
+
+class TranscriptStore:
+    """Tabella turn_id -> (testo, traduzione), accesso thread-safe"""
+
+    def __init__(self, path=None):
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="ontheflow_transcript_", suffix=".sqlite")
+            os.close(fd)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA synchronous=OFF")  # Copia di lavoro: il log su file resta la fonte durevole
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "turn_id INTEGER PRIMARY KEY, text TEXT NOT NULL DEFAULT '', translation TEXT NOT NULL DEFAULT '')"
+        )
+        self._conn.execute("DELETE FROM turns")  # Nuova sessione della GUI
+
+    def upsert(self, turn_id, text=None, translation=None):
+        """Crea o aggiorna il turno (None = campo invariato)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO turns (turn_id, text, translation) VALUES (?, COALESCE(?, ''), COALESCE(?, '')) "
+                "ON CONFLICT(turn_id) DO UPDATE SET text = COALESCE(?, text), translation = COALESCE(?, translation)",
+                (turn_id, text, translation, text, translation),
+            )
+
+    def get(self, turn_id):
+        """(testo, traduzione) del turno, None se non esiste"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT text, translation FROM turns WHERE turn_id = ?", (turn_id,)
+            ).fetchone()
+
+    def delete(self, turn_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE turn_id = ?", (turn_id,))
+
+    def before(self, turn_id, limit):
+        """Gli ultimi `limit` turni prima di turn_id, in ordine crescente"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT turn_id, text, translation FROM turns WHERE turn_id < ? ORDER BY turn_id DESC LIMIT ?",
+                (turn_id, limit),
+            ).fetchall()
+        return rows[::-1]
+
+    def after(self, turn_id, limit):
+        """I primi `limit` turni dopo turn_id, in ordine crescente"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT turn_id, text, translation FROM turns WHERE turn_id > ? ORDER BY turn_id LIMIT ?",
+                (turn_id, limit),
+            ).fetchall()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM turns").fetchone()[0]
+
+    def transcript_text(self):
+        """Trascrizione completa della sessione (per Copy All)"""
+        with self._lock:
+            rows = self._conn.execute("SELECT text FROM turns ORDER BY turn_id").fetchall()
+        return "\n".join(text for (text,) in rows)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM turns")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
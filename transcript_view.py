@@ -0,0 +1,205 @@
+"""
+Rendering incrementale e virtualizzato delle colonne trascrizione/traduzione.
+
+Ogni turno ha il proprio controllo ft.Text in entrambe le colonne: un
+aggiornamento modifica solo i controlli del turno cambiato (e inserisce in
+ordine quelli nuovi), invece di ricostruire e rispedire tutto il testo.
+Le ListView contengono solo una finestra di righe: lo storico completo è in
+TranscriptStore e viene ricaricato a pagine quando si scorre verso l'alto.
+
+UpdateCoalescer raccoglie i turni modificati e li passa al rendering al massimo
+UI_MAX_FPS volte al secondo: i parziali superati da uno più recente dello
+stesso turno non arrivano mai alla UI.
+"""
+import bisect
+import os
+import threading
+import time
+
+import flet as ft
+
+MAX_RENDERED_TURNS = 300  # Righe presenti nelle ListView (finestra sullo storico)
+PAGE_TURNS = 50  # Turni caricati dallo storico a ogni arrivo al bordo della lista
+SCROLL_EDGE_PX = 40  # Distanza dal bordo che fa caricare la pagina successiva
+UI_MAX_FPS = float(os.getenv("UI_MAX_FPS", "20"))  # Flush massimi al secondo verso il client
+
+
+class TranscriptRenderer:
+    """Una riga per turno in ciascuna colonna, ordinata per turn id, su una finestra dello storico"""
+
+    def __init__(self, log_list, translation_list, store, window=MAX_RENDERED_TURNS, page_turns=PAGE_TURNS):
+        self.log_list = log_list
+        self.translation_list = translation_list
+        self.store = store
+        self.window = window
+        self.page_turns = page_turns
+        self.keys = []  # Turn id nella finestra, in ordine (stesso ordine dei controlli)
+        self.rows = {}  # turn id -> (Text trascrizione, Text traduzione)
+        self.follow_tail = True  # La finestra segue i turni nuovi (autoscroll)
+        self._lock = threading.RLock()  # Chiamato dal loop della pagina e dagli eventi di scroll
+        for lst in (log_list, translation_list):
+            lst.on_scroll = self._on_scroll
+
+    def _make_row(self, turn_id, text, translation):
+        log_text = ft.Text(value=text, font_family="Consolas", size=14, color=ft.Colors.GREEN_400, key=f"log_{turn_id}")
+        # Colore diverso per traduzione
+        tr_text = ft.Text(value=translation, font_family="Consolas", size=14, color=ft.Colors.CYAN_400, key=f"tr_{turn_id}")
+        self.rows[turn_id] = (log_text, tr_text)
+        return log_text, tr_text
+
+    def _insert_rows(self, pos, rows):
+        """Inserisce [(turn_id, testo, traduzione)] alla posizione pos della finestra"""
+        made = [self._make_row(*row) for row in rows]
+        self.keys[pos:pos] = [row[0] for row in rows]
+        self.log_list.controls[pos:pos] = [m[0] for m in made]
+        self.translation_list.controls[pos:pos] = [m[1] for m in made]
+
+    def _drop_rows(self, start, end):
+        for k in self.keys[start:end]:
+            del self.rows[k]
+        del self.keys[start:end]
+        del self.log_list.controls[start:end]
+        del self.translation_list.controls[start:end]
+
+    def _update_lists(self):
+        self.log_list.update()
+        self.translation_list.update()
+
+    def render(self, turn_id, text=None, translation=None):
+        """Salva il turno nello storico e aggiorna (o crea) la sua riga se è nella finestra.
+        None = campo invariato."""
+        with self._lock:
+            self.store.upsert(turn_id, text, translation)
+            row = self.rows.get(turn_id)
+            if row is not None:
+                for control, value in zip(row, (text, translation)):
+                    if value is not None and control.value != value:
+                        control.value = value
+                        control.update()
+                return
+
+            # Fuori finestra: resta solo nello storico (caricato quando si scorre)
+            if self.keys and (turn_id < self.keys[0] or (turn_id > self.keys[-1] and not self.follow_tail)):
+                return
+
+            # Di solito il turno è l'ultimo: append, altrimenti inserimento ordinato
+            saved_text, saved_translation = self.store.get(turn_id)
+            self._insert_rows(bisect.bisect_left(self.keys, turn_id), [(turn_id, saved_text, saved_translation)])
+            if len(self.keys) > self.window:
+                self._drop_rows(0, len(self.keys) - self.window)
+            self._update_lists()
+
+    def remove(self, turn_id):
+        with self._lock:
+            self.store.delete(turn_id)
+            if turn_id not in self.rows:
+                return
+            pos = self.keys.index(turn_id)
+            self._drop_rows(pos, pos + 1)
+            self._update_lists()
+
+    def clear(self):
+        with self._lock:
+            self.store.clear()
+            self.rows.clear()
+            self.keys.clear()
+            self.log_list.controls.clear()
+            self.translation_list.controls.clear()
+            self.follow_tail = True
+
+    def transcript_text(self):
+        """Testo completo della trascrizione (tutto lo storico, per Copy All)"""
+        return self.store.transcript_text()
+
+    def scroll_to_end(self):
+        """Autoscroll in fondo, solo se l'utente non sta rileggendo lo storico"""
+        if self.follow_tail:
+            for lst in (self.log_list, self.translation_list):
+                lst.scroll_to(offset=-1, duration=10)
+
+    def _on_scroll(self, e):
+        # Solo a scroll concluso: gli eventi intermedi dell'autoscroll non cambiano stato
+        if getattr(e, "event_type", "end") != "end":
+            return
+        if e.pixels <= e.min_scroll_extent + SCROLL_EDGE_PX:
+            self._load_older()
+        elif e.pixels >= e.max_scroll_extent - SCROLL_EDGE_PX:
+            self._load_newer()
+        else:
+            self.follow_tail = False  # L'utente sta leggendo righe vecchie: niente autoscroll
+
+    def _load_older(self):
+        """Bordo superiore: carica la pagina precedente dallo storico"""
+        with self._lock:
+            if not self.keys:
+                return
+            rows = self.store.before(self.keys[0], self.page_turns)
+            if not rows:
+                return
+            first_key = self.keys[0]
+            self._insert_rows(0, rows)
+            if len(self.keys) > self.window:
+                # La coda esce dalla finestra: i turni nuovi si vedranno tornando in fondo
+                self._drop_rows(self.window, len(self.keys))
+                self.follow_tail = False
+            self._update_lists()
+            # Mantiene in vista la riga che l'utente stava guardando
+            self.log_list.scroll_to(key=f"log_{first_key}", duration=0)
+            self.translation_list.scroll_to(key=f"tr_{first_key}", duration=0)
+
+    def _load_newer(self):
+        """Bordo inferiore: ricarica i turni successivi; in fondo allo storico torna l'autoscroll"""
+        with self._lock:
+            if self.follow_tail:
+                return
+            rows = self.store.after(self.keys[-1], self.page_turns) if self.keys else []
+            if rows:
+                self._insert_rows(len(self.keys), rows)
+                if len(self.keys) > self.window:
+                    self._drop_rows(0, len(self.keys) - self.window)
+                self._update_lists()
+            if len(rows) < self.page_turns:
+                self.follow_tail = True
+
+
+class UpdateCoalescer:
+    """Raccoglie i turni "sporchi" e chiama flush(turn_ids) al massimo max_fps volte al secondo"""
+
+    def __init__(self, flush, max_fps=UI_MAX_FPS):
+        self.flush = flush  # flush(set di turn id): può ritornare un Future da attendere
+        self.min_interval = 1.0 / max_fps
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self.marks = 0  # Aggiornamenti ricevuti
+        self.flushes = 0  # Flush effettivi verso la UI
+        threading.Thread(target=self._loop, daemon=True, name="UiCoalescer").start()
+
+    def mark(self, turn_id):
+        """Segna il turno come da ridisegnare (thread-safe, non blocca)"""
+        with self._lock:
+            self._dirty.add(turn_id)
+            self.marks += 1
+        self._wake.set()
+
+    def _loop(self):
+        last_flush = 0.0
+        while True:
+            self._wake.wait()
+            # Limite di frequenza: gli aggiornamenti nel frattempo si accumulano
+            delay = last_flush + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                self._wake.clear()
+                dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                continue
+            last_flush = time.monotonic()
+            self.flushes += 1
+            try:
+                done = self.flush(dirty)
+                if hasattr(done, "result"):
+                    done.result(timeout=1)  # Un solo flush in volo verso la pagina
+            except Exception as e:
+                print(f"UI Coalescer Error: {type(e).__name__}: {e}")
@@ -0,0 +1,161 @@
+"""
+Backend di traduzione per TranslationService.
+
+Tutti espongono translate_batch(texts, target) -> lista di traduzioni:
+  - "google": deep_translator online (un client per thread, frasi unite per riga)
+  - "local":  modello CTranslate2 locale (layout Argos Translate o OPUS-MT
+              convertito) in un pool di processi, senza rete
+  - "stub":   deterministico, senza dipendenze (test e benchmark)
+"""
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+
+TRANSLATION_MODEL_PATH = os.getenv("TRANSLATION_MODEL_PATH", "")
+TRANSLATION_PROCESSES = int(os.getenv("TRANSLATION_PROCESSES", "1"))
+TRANSLATION_THREADS = int(os.getenv("TRANSLATION_THREADS", "2"))  # Thread CTranslate2 per processo
+# Modelli multilingua (es. NLLB): token della lingua di destinazione, es. "ita_Latn"
+TRANSLATION_TARGET_PREFIX = os.getenv("TRANSLATION_TARGET_PREFIX", "")
+
+
+class TranslationBackend(ABC):
+    """Interfaccia comune dei backend di traduzione"""
+
+    name = "base"
+
+    @abstractmethod
+    def translate_batch(self, texts, target):
+        """Traduzioni di texts verso target, nello stesso ordine"""
+
+    def close(self):
+        pass
+
+
+class StubBackend(TranslationBackend):
+    """Traduzione finta e deterministica: "[it] testo" """
+
+    name = "stub"
+
+    def translate_batch(self, texts, target):
+        return [f"[{target}] {text}" for text in texts]
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate via deep_translator (richiede internet)"""
+
+    name = "google"
+
+    def __init__(self):
+        self._local = threading.local()  # Un client per thread (per lingua)
+        self.requests = 0
+
+    def _client(self, target):
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        client = clients.get(target)
+        if client is None:
+            from deep_translator import GoogleTranslator
+            client = clients[target] = GoogleTranslator(source="auto", target=target)
+        return client
+
+    def translate_batch(self, texts, target):
+        """Più frasi in una sola richiesta (una per riga); fallback frase per frase"""
+        client = self._client(target)
+        self.requests += 1
+        if len(texts) == 1:
+            return [client.translate(texts[0])]
+        parts = (client.translate("\n".join(texts)) or "").split("\n")
+        if len(parts) == len(texts):
+            return [p.strip() for p in parts]
+        # Il servizio ha unito o spezzato le righe: niente allineamento sicuro
+        self.requests += len(texts)
+        return [client.translate(t) for t in texts]
+
+
+# --- Backend locale: codice eseguito nei processi worker ---
+_translator = None  # ctranslate2.Translator del processo
+_sp_source = None  # Tokenizer SentencePiece (sorgente)
+_sp_target = None  # Tokenizer SentencePiece (destinazione)
+
+
+def _model_layout(model_path):
+    """(cartella CTranslate2, spm sorgente, spm destinazione) per layout Argos o OPUS-MT"""
+    argos_model = os.path.join(model_path, "model")
+    argos_spm = os.path.join(model_path, "sentencepiece.model")
+    if os.path.isdir(argos_model) and os.path.isfile(argos_spm):
+        return argos_model, argos_spm, argos_spm
+    source_spm = os.path.join(model_path, "source.spm")
+    target_spm = os.path.join(model_path, "target.spm")
+    if os.path.isfile(source_spm) and os.path.isfile(target_spm):
+        return model_path, source_spm, target_spm
+    raise FileNotFoundError(f"No CTranslate2 model (Argos or OPUS-MT layout) in {model_path}")
+
+
+def _init_local_worker(model_path, threads):
+    """Initializer del processo: carica modello e tokenizer una volta sola"""
+    global _translator, _sp_source, _sp_target
+    import ctranslate2
+    import sentencepiece as spm
+    ct2_dir, source_spm, target_spm = _model_layout(model_path)
+    _translator = ctranslate2.Translator(ct2_dir, device="cpu", compute_type="int8", inter_threads=1, intra_threads=threads)
+    _sp_source = spm.SentencePieceProcessor(model_file=source_spm)
+    _sp_target = _sp_source if target_spm == source_spm else spm.SentencePieceProcessor(model_file=target_spm)
+    print(f"DEBUG: Translation worker {os.getpid()} ready ({model_path}, {threads} threads)")
+
+
+def _translate_local(texts, target_prefix):
+    """Task eseguito nel processo worker"""
+    tokens = [_sp_source.encode(text, out_type=str) for text in texts]
+    prefixes = [[target_prefix] for _ in texts] if target_prefix else None
+    results = _translator.translate_batch(tokens, target_prefix=prefixes, beam_size=2, max_batch_size=16)
+    outputs = []
+    for result in results:
+        hyp = result.hypotheses[0]
+        if target_prefix and hyp and hyp[0] == target_prefix:
+            hyp = hyp[1:]
+        outputs.append(_sp_target.decode(hyp))
+    return outputs
+
+
+class LocalCT2Backend(TranslationBackend):
+    """Modello di traduzione locale in un pool di processi (un modello per processo)"""
+
+    name = "local"
+
+    def __init__(self, model_path=TRANSLATION_MODEL_PATH, processes=TRANSLATION_PROCESSES,
+                 threads=TRANSLATION_THREADS, target_prefix=TRANSLATION_TARGET_PREFIX):
+        _model_layout(model_path)  # Errore subito se il modello non c'è
+        self.target_prefix = target_prefix
+        self.executor = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_local_worker,
+            initargs=(model_path, threads),
+        )
+        # Avvia i processi (e carica il modello) subito, non alla prima frase
+        for _ in range(processes):
+            self.executor.submit(_translate_local, [], "")
+
+    def translate_batch(self, texts, target):
+        # La lingua di destinazione è fissata dal modello (coppia Argos/OPUS-MT o target_prefix)
+        return self.executor.submit(_translate_local, texts, self.target_prefix).result()
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_backend(name):
+    """Crea il backend richiesto; se "local" non è disponibile torna a Google"""
+    if name == "stub":
+        return StubBackend()
+    if name == "local":
+        try:
+            import importlib.util
+            for module in ("ctranslate2", "sentencepiece"):
+                if importlib.util.find_spec(module) is None:
+                    raise ImportError(f"{module} not installed (pip install ctranslate2 sentencepiece)")
+            return LocalCT2Backend()
+        except Exception as e:
+            print(f"Local translation unavailable ({e}) - falling back to Google Translate")
+    return GoogleBackend()
@@ -0,0 +1,134 @@
+"""
+Servizio di traduzione per la colonna Italiano.
+
+Un pool fisso di worker (niente thread per ogni frase) che passa al backend
+(translation_backends: Google, modello locale o stub) le frasi in coda come un
+unico batch. Le traduzioni restano in una cache LRU (testo, lingua): frasi
+ripetute non rifanno la chiamata.
+"""
+import queue
+import threading
+from collections import OrderedDict
+
+import tracing
+from translation_backends import GoogleBackend
+
+TRANSLATION_WORKERS = 2
+TRANSLATION_BATCH_MAX = 8  # Frasi massime in una singola richiesta
+TRANSLATION_BATCH_CHARS = 4500  # Google Translate accetta al massimo 5000 caratteri
+TRANSLATION_CACHE_SIZE = 2048
+SYSTEM_PREFIXES = (">>>", "---", "ERROR", "⚠️")
+
+
+def split_line(line):
+    """Separa il prefisso "[timestamp]" dal testo da tradurre"""
+    if "]" in line:
+        prefix, body = line.split("]", 1)
+        return prefix + "]", body.strip()
+    return "", line.strip()
+
+
+def is_system_text(body):
+    """Messaggi di sistema: copiati così come sono, senza traduzione"""
+    return body.startswith(SYSTEM_PREFIXES)
+
+
+class TranslationService:
+    """Pool di worker con batching e cache LRU; il risultato arriva via callback"""
+
+    def __init__(self, backend=None, target="it", workers=TRANSLATION_WORKERS, batch_max=TRANSLATION_BATCH_MAX,
+                 cache_size=TRANSLATION_CACHE_SIZE):
+        self.backend = backend or GoogleBackend()
+        self.target = target
+        self.batch_max = batch_max
+        self.cache_size = cache_size
+        self._queue = queue.Queue()
+        self._cache = OrderedDict()  # (testo, lingua) -> traduzione
+        self._cache_lock = threading.Lock()
+        self.stats = {"batches": 0, "sentences": 0, "cache_hits": 0, "system": 0, "errors": 0}
+        self._threads = [
+            threading.Thread(target=self._worker, daemon=True, name=f"Translator_{i}")
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def translate_line(self, line, on_done):
+        """Traduce una riga "[timestamp] testo"; on_done(riga tradotta) dal worker (o subito)"""
+        prefix, body = split_line(line)
+        body = body.replace("\n", " ")  # Il batch usa una riga per frase
+        if not body or is_system_text(body):
+            self.stats["system"] += 1
+            on_done(line)  # Copia i messaggi di sistema così come sono
+            return
+        cached = self._cache_get(body)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            on_done(f"{prefix} {cached}".strip())
+            return
+        self._queue.put((body, prefix, on_done))
+
+    def _cache_get(self, body):
+        with self._cache_lock:
+            value = self._cache.get((body, self.target))
+            if value is not None:
+                self._cache.move_to_end((body, self.target))
+            return value
+
+    def _cache_put(self, body, translation):
+        with self._cache_lock:
+            self._cache[(body, self.target)] = translation
+            self._cache.move_to_end((body, self.target))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _worker(self):
+        carry = None  # Elemento che non stava nel batch precedente
+        while True:
+            item = carry if carry is not None else self._queue.get()
+            carry = None
+            if item is None:
+                break
+
+            # Accoda al batch ciò che è già in attesa (senza aspettare)
+            batch = [item]
+            chars = len(item[0])
+            while len(batch) < self.batch_max:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)  # Lo stop resta per il giro successivo
+                    break
+                if chars + len(nxt[0]) > TRANSLATION_BATCH_CHARS:
+                    carry = nxt
+                    break
+                batch.append(nxt)
+                chars += len(nxt[0])
+
+            # Frasi identiche nel batch: una sola traduzione
+            texts = list(dict.fromkeys(body for body, _, _ in batch))
+            self.stats["sentences"] += len(batch)
+            self.stats["batches"] += 1
+            try:
+                with tracing.span("translate.batch", backend=self.backend.name, sentences=len(texts)):
+                    translations = dict(zip(texts, self.backend.translate_batch(texts, self.target)))
+                for text, translated in translations.items():
+                    self._cache_put(text, translated)
+            except Exception as e:
+                print(f"Translation Error: {e}")
+                self.stats["errors"] += 1
+                translations = {}
+
+            for body, prefix, on_done in batch:
+                translated = translations.get(body, "[Translation Error]")
+                try:
+                    on_done(f"{prefix} {translated}".strip())
+                except Exception as e:
+                    print(f"Translation Callback Error: {e}")
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        self.backend.close()
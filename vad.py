@@ -0,0 +1,144 @@
+"""
+VAD in streaming e chunking adattivo per la pipeline di cattura.
+
+Un solo rilevatore con stato (rumore di fondo adattivo + hangover) che gira sui
+frame man mano che arrivano, anche a cavallo tra chunk diversi. Gli intervalli
+di parlato trovati vengono passati a Whisper come clip_timestamps.
+
+AdaptiveChunker usa lo stesso VAD per chiudere i chunk sulle pause naturali
+invece che ogni buffer_seconds.
+"""
+import numpy as np
+
+
+def to_clip_timestamps(ranges, sample_rate=16000, offset=0):
+    """Converte gli intervalli di parlato in clip_timestamps di faster-whisper (secondi, piatti)"""
+    clips = []
+    for s, e in ranges:
+        clips.extend([(s + offset) / sample_rate, (e + offset) / sample_rate])
+    return clips
+
+
+class StreamingVAD:
+    """VAD a energia con stato persistente tra un chunk e l'altro"""
+
+    def __init__(self, sample_rate=16000, frame_ms=30, threshold_db=12.0, min_level_db=-55.0,
+                 hangover_ms=400, pad_ms=200, min_speech_ms=150):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db  # dB sopra il rumore di fondo
+        self.min_level_db = min_level_db  # Sotto questo livello è sempre silenzio
+        self.hangover_frames = max(1, int(hangover_ms / frame_ms))
+        self.pad = int(sample_rate * pad_ms / 1000)
+        self.min_speech = int(sample_rate * min_speech_ms / 1000)
+        self.reset()
+
+    def reset(self):
+        self.noise_db = None  # Stima adattiva del rumore di fondo
+        self.hang = 0  # Frame di hangover rimanenti
+        self.in_speech = False
+
+    def frame_flags(self, audio):
+        """Classifica ogni frame (parlato/silenzio) aggiornando lo stato interno"""
+        n = len(audio) // self.frame
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        frames = audio[:n * self.frame].reshape(n, self.frame)
+        energy = np.einsum("ij,ij->i", frames, frames) / self.frame
+        levels = 10.0 * np.log10(energy + 1e-10)
+
+        flags = np.zeros(n, dtype=bool)
+        for i, level in enumerate(levels):
+            if self.noise_db is None:
+                self.noise_db = level
+            is_loud = level > max(self.noise_db + self.threshold_db, self.min_level_db)
+            if is_loud:
+                self.hang = self.hangover_frames
+            self.in_speech = is_loud or self.hang > 0
+            if not is_loud and self.hang > 0:
+                self.hang -= 1  # Dopo il controllo: hangover_frames frame pieni di hangover
+
+            if not is_loud:
+                # Il rumore scende subito, sale lentamente
+                if level < self.noise_db:
+                    self.noise_db = level
+                else:
+                    self.noise_db = 0.95 * self.noise_db + 0.05 * level
+            flags[i] = self.in_speech
+        return flags
+
+    def process(self, audio):
+        """Ritorna gli intervalli di parlato [(start, end)] in campioni, relativi al chunk"""
+        return self.ranges_from_flags(self.frame_flags(audio), len(audio))
+
+    def ranges_from_flags(self, flags, total):
+        """Converte i flag per frame in intervalli di parlato con padding"""
+        ranges = []
+        start = None
+        for i, speech in enumerate(flags):
+            if speech and start is None:
+                start = i * self.frame
+            elif not speech and start is not None:
+                ranges.append([start, i * self.frame])
+                start = None
+        if start is not None:
+            ranges.append([start, total])  # Il parlato continua nel prossimo chunk
+
+        # Padding e fusione degli intervalli vicini
+        padded = []
+        for s, e in ranges:
+            touches_edge = s == 0 or e == total
+            if e - s < self.min_speech and not touches_edge:
+                continue  # Click/rumore isolato
+            s, e = max(0, s - self.pad), min(total, e + self.pad)
+            if padded and s <= padded[-1][1]:
+                padded[-1][1] = e
+            else:
+                padded.append([s, e])
+        return [(s, e) for s, e in padded]
+
+class AdaptiveChunker:
+    """Chiude il chunk alla prima pausa dopo min_seconds (taglio forzato a max_seconds)"""
+
+    def __init__(self, ring, min_seconds, max_seconds, pause_ms=200, sample_rate=16000, vad=None):
+        self.ring = ring
+        self.vad = vad or StreamingVAD(sample_rate)
+        self.min_frames = int(sample_rate * min_seconds)
+        self.max_frames = int(sample_rate * max_seconds)
+        self.pause_vad_frames = max(1, int(round(pause_ms * sample_rate / 1000 / self.vad.frame)))
+        self.reset(ring.write_pos)
+
+    def reset(self, pos):
+        self.chunk_start = pos  # Inizio del chunk aperto (campione assoluto nel ring)
+        self.classified = pos  # Fin dove il VAD ha già classificato
+        self.flags = []  # Flag VAD del chunk aperto
+        self.silence_run = 0  # Frame di silenzio consecutivi in coda
+
+    def update(self):
+        """Classifica i nuovi frame del ring e ritorna i chunk chiusi [(start, frames, speech_ranges)]"""
+        closed = []
+        frame = self.vad.frame
+        available = (self.ring.write_pos - self.classified) // frame
+        if available <= 0:
+            return closed
+
+        for speech in self.vad.frame_flags(self.ring.view(self.classified, available * frame)):
+            self.flags.append(speech)
+            self.classified += frame
+            self.silence_run = 0 if speech else self.silence_run + 1
+
+            length = self.classified - self.chunk_start
+            at_pause = length >= self.min_frames and self.silence_run >= self.pause_vad_frames
+            if at_pause or length >= self.max_frames:
+                closed.append((self.chunk_start, length, self.vad.ranges_from_flags(self.flags, length)))
+                self.reset(self.classified)
+        return closed
+
+    def flush(self):
+        """Chiude il chunk aperto (fine sessione); None se vuoto"""
+        length = self.classified - self.chunk_start
+        if length <= 0:
+            return None
+        chunk = (self.chunk_start, length, self.vad.ranges_from_flags(self.flags, length))
+        self.reset(self.classified)
+        return chunk
@@ -0,0 +1,181 @@
+"""
+Backend Whisper multi-processo.
+
+Ogni processo carica il proprio WhisperModel una sola volta (con un numero fisso
+di thread CTranslate2); l'audio viaggia in shared memory invece che via pickle.
+I future restituiti rispettano lo stesso contratto del ThreadPoolExecutor usato
+da dispatcher_thread / result_collector_thread (risultato = lista di righe).
+
+transcribe_batch_lines decodifica più chunk in un solo passaggio batched
+(BatchedInferencePipeline di faster-whisper) quando i worker sono in ritardo.
+"""
+import bisect
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+_model = None  # WhisperModel del processo worker (caricato dall'initializer)
+_pipeline = None  # BatchedInferencePipeline del processo worker (creata al primo batch)
+
+
+def transcribe_lines(model, audio_data, lang_code, timestamp, clip_timestamps=None, beam_size=5):
+    """Trascrive un chunk e ritorna le righe da mostrare (stesso formato dei worker)"""
+    if clip_timestamps:
+        segments, _ = model.transcribe(audio_data, beam_size=beam_size, language=lang_code, vad_filter=False, clip_timestamps=clip_timestamps)
+    else:
+        segments, _ = model.transcribe(audio_data, beam_size=beam_size, language=lang_code, vad_filter=True)
+    parts = [s.text.strip() for s in segments if s.text.strip()]
+    text = " ".join(parts)
+    if text:
+        return [f"[{timestamp}] {text}"]
+    return []
+
+
+def transcribe_batch_lines(pipeline, audio, chunk_specs, lang_code, beam_size=5):
+    """Trascrive più chunk concatenati in un unico passaggio batched.
+
+    chunk_specs: [(inizio_campione, num_frames, timestamp, clip_timestamps)] dentro audio.
+    Ritorna una lista di righe per ogni chunk, nello stesso ordine.
+    """
+    clips = []  # Indici di campione in audio (collect_chunks fa audio[start:end])
+    chunk_starts = []  # Inizio di ogni chunk in secondi: i segmenti tornano in secondi
+    for start, num_frames, _timestamp, clip_timestamps in chunk_specs:
+        chunk_starts.append(start / SAMPLE_RATE)
+        pairs = clip_timestamps or [0.0, num_frames / SAMPLE_RATE]
+        for clip_start, clip_end in zip(pairs[0::2], pairs[1::2]):
+            clips.append({
+                "start": start + round(clip_start * SAMPLE_RATE),
+                "end": start + min(num_frames, round(clip_end * SAMPLE_RATE)),
+            })
+
+    segments, _ = pipeline.transcribe(
+        audio, language=lang_code, beam_size=beam_size, vad_filter=False,
+        clip_timestamps=clips, batch_size=len(clips),
+    )
+
+    # Ogni segmento appartiene al chunk in cui inizia
+    parts = [[] for _ in chunk_specs]
+    for seg in segments:
+        text = seg.text.strip()
+        if text:
+            idx = max(0, bisect.bisect_right(chunk_starts, seg.start + 1e-3) - 1)
+            parts[idx].append(text)
+
+    return [[f"[{spec[2]}] {' '.join(p)}"] if p else [] for spec, p in zip(chunk_specs, parts)]
+
+
+def _init_worker(model_name, device, compute_type, cpu_threads):
+    """Initializer del processo: carica il modello una volta sola"""
+    global _model
+    from faster_whisper import WhisperModel
+    _model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+    print(f"DEBUG: Whisper worker {os.getpid()} ready ({model_name}, {cpu_threads} threads)")
+
+
+def _attach(name):
+    """Apre un blocco di shared memory creato dal processo principale"""
+    if sys.version_info >= (3, 13):
+        # Il blocco appartiene al processo principale (che fa unlink)
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _transcribe_shared(shm_name, num_frames, lang_code, timestamp, clip_timestamps, beam_size):
+    """Task eseguito nel processo worker"""
+    shm = _attach(shm_name)
+    try:
+        audio = np.ndarray((num_frames,), dtype=np.float32, buffer=shm.buf)
+        try:
+            return transcribe_lines(_model, audio, lang_code, timestamp, clip_timestamps, beam_size)
+        except Exception as e:
+            print(f"Whisper Worker Error: {type(e).__name__}: {e}")
+            return [f"[❌ Whisper Processing Failed]"]
+        finally:
+            del audio  # Rilascia la view prima di chiudere la shared memory
+    finally:
+        shm.close()
+
+
+def _transcribe_batch_shared(shm_name, num_frames, chunk_specs, lang_code, beam_size):
+    """Task batched eseguito nel processo worker"""
+    global _pipeline
+    shm = _attach(shm_name)
+    try:
+        audio = np.ndarray((num_frames,), dtype=np.float32, buffer=shm.buf)
+        try:
+            if _pipeline is None:
+                from faster_whisper import BatchedInferencePipeline
+                _pipeline = BatchedInferencePipeline(model=_model)
+            return transcribe_batch_lines(_pipeline, audio, chunk_specs, lang_code, beam_size)
+        except Exception as e:
+            print(f"Whisper Batch Worker Error: {type(e).__name__}: {e}")
+            return [[f"[❌ Whisper Processing Failed]"] for _ in chunk_specs]
+        finally:
+            del audio
+    finally:
+        shm.close()
+
+
+def _release(shm):
+    try:
+        shm.close()
+        shm.unlink()
+    except Exception as e:
+        print(f"Shared memory release error: {e}")
+
+
+class WhisperProcessPool:
+    """Pool di processi Whisper con un modello per processo"""
+
+    def __init__(self, model_name, num_processes, cpu_threads, device="cpu", compute_type="int8"):
+        self.model_name = model_name
+        self.num_processes = num_processes
+        self.executor = ProcessPoolExecutor(
+            max_workers=num_processes,
+            initializer=_init_worker,
+            initargs=(model_name, device, compute_type, cpu_threads),
+        )
+
+    def submit(self, audio_data, lang_code, timestamp, clip_timestamps=None, beam_size=5):
+        """Copia il chunk in shared memory e lo sottomette; ritorna un Future"""
+        num_frames = len(audio_data)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, num_frames * 4))
+        shared = np.ndarray((num_frames,), dtype=np.float32, buffer=shm.buf)
+        shared[:] = audio_data
+        del shared
+        try:
+            future = self.executor.submit(_transcribe_shared, shm.name, num_frames, lang_code, timestamp, clip_timestamps, beam_size)
+        except Exception:
+            _release(shm)
+            raise
+        future.add_done_callback(lambda _f: _release(shm))
+        return future
+
+    def submit_batch(self, chunks, lang_code, beam_size=5):
+        """Sottomette più chunk [(audio, timestamp, clip_timestamps)] come un solo batch.
+        Il Future ritorna una lista di righe per ogni chunk."""
+        total = sum(len(audio) for audio, _, _ in chunks)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, total * 4))
+        shared = np.ndarray((total,), dtype=np.float32, buffer=shm.buf)
+        chunk_specs = []
+        pos = 0
+        for audio, timestamp, clip_timestamps in chunks:
+            shared[pos:pos + len(audio)] = audio  # Scrittura diretta, niente concatenate
+            chunk_specs.append((pos, len(audio), timestamp, clip_timestamps))
+            pos += len(audio)
+        del shared
+        try:
+            future = self.executor.submit(_transcribe_batch_shared, shm.name, total, chunk_specs, lang_code, beam_size)
+        except Exception:
+            _release(shm)
+            raise
+        future.add_done_callback(lambda _f: _release(shm))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
@@ -0,0 +1,86 @@
+"""
+Streaming Whisper: finestra scorrevole + conferma "local agreement".
+
+La finestra audio viene ridecodificata ogni poche centinaia di ms; una parola
+viene confermata solo quando due decodifiche consecutive sono d'accordo sul
+prefisso che la contiene (LocalAgreement-2). Il resto è testo "bozza".
+"""
+import string
+
+# Parole confermate già emesse e ripetute all'inizio di una nuova ipotesi
+MAX_OVERLAP_WORDS = 5
+# Coda del testo dei turni chiusi passata come initial_prompt
+MAX_PROMPT_CHARS = 200
+
+
+def _normalize(word):
+    return word.strip().strip(string.punctuation).lower()
+
+
+class LocalAgreementBuffer:
+    """Mantiene parole confermate e bozza per il turno corrente"""
+
+    def __init__(self):
+        self.committed = []  # [(start, end, testo)] confermate nel turno corrente
+        self.draft = []  # Ultima ipotesi non ancora confermata
+        self.committed_end = 0.0  # Fine (assoluta, s) dell'ultima parola confermata
+        self.context = ""  # Testo dei turni chiusi, ormai fuori dalla finestra audio
+
+    def insert(self, words):
+        """Aggiunge una nuova ipotesi [(start, end, testo)] e ritorna le parole confermate ora"""
+        # Scarta ciò che è già stato confermato (con un po' di tolleranza sui timestamp)
+        new = [w for w in words if w[0] > self.committed_end - 0.1]
+
+        # Whisper tende a ripetere le ultime parole confermate: rimuovi il duplicato
+        tail = [_normalize(w[2]) for w in self.committed[-MAX_OVERLAP_WORDS:]]
+        for n in range(min(len(tail), len(new)), 0, -1):
+            if tail[-n:] == [_normalize(w[2]) for w in new[:n]]:
+                new = new[n:]
+                break
+
+        # Prefisso comune tra ipotesi precedente e nuova = parole stabili
+        commit = []
+        for old_word, new_word in zip(self.draft, new):
+            if _normalize(old_word[2]) != _normalize(new_word[2]):
+                break
+            commit.append(new_word)
+
+        if commit:
+            self.committed.extend(commit)
+            self.committed_end = commit[-1][1]
+        self.draft = new[len(commit):]
+        return commit
+
+    def flush(self):
+        """Conferma forzatamente anche la bozza (fine turno o fine sessione)"""
+        if self.draft:
+            self.committed.extend(self.draft)
+            self.committed_end = self.draft[-1][1]
+            self.draft = []
+
+    def start_new_turn(self):
+        """Svuota il turno corrente mantenendo il punto di taglio temporale;
+        il testo del turno passa nel contesto del prompt"""
+        context = f"{self.context} {self.committed_text()}".strip()
+        if len(context) > MAX_PROMPT_CHARS:
+            # Taglio su un confine di parola
+            context = context[-MAX_PROMPT_CHARS:].partition(" ")[2]
+        self.context = context
+        self.committed = []
+        self.draft = []
+
+    def prompt(self):
+        """initial_prompt per la prossima decodifica: solo testo già uscito dalla finestra
+        (le parole confermate del turno sono ancora nell'audio e verrebbero ripetute)"""
+        return self.context or None
+
+    def committed_text(self):
+        return "".join(w[2] for w in self.committed).strip()
+
+    def draft_text(self):
+        return "".join(w[2] for w in self.draft).strip()
+
+    def ends_sentence(self):
+        """True se il turno confermato termina con punteggiatura di fine frase"""
+        text = self.committed_text()
+        return bool(text) and text[-1] in ".?!"